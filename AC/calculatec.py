@@ -1,30 +1,26 @@
-import pandas as pd
+import os
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
 
-# Percorso del file
-file_path = "input_Cdiode_constF_27770kHz"  # Sostituisci con il path corretto se non nella stessa directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nanolab.impedance import convert_batch, save_converted
 
-# Leggi il file CSV con separatore di virgola
-df = pd.read_csv(file_path)
+# File grezzi del lock-in (Vin/Voff, Frequency, Vout, Gain) nella cartella corrente
+INPUT_DIR = "."
 
-# Estrai le colonne
-voff = df["Voff"]
-vout = df["Vout"]
-gain = df["Gain"]
-freq = 1000  # Frequenza in Hz
+# Salvataggio opzionale in formato binario compresso (.npz); None = nessun file scritto
+OUTPUT_PATH = None  # es. "converted_C.npz"
 
-# Calcolo Z e C
-z = (0.01 / vout) * gain
-c = 1 / (2 * np.pi * freq * z)
+# Calcolo Z e C in memoria, con la frequenza di ogni file (colonna o nome del file)
+conv = convert_batch(INPUT_DIR)
 
-# Salva i dati Voff e Capacitance su file di testo separato da tabulazioni
-output_df = pd.DataFrame({
-    "Voff (V)": voff,
-    "Capacitance (F)": c
-})
+for i, path in enumerate(conv['file']):
+    n = int(np.isfinite(conv['Vout'][i]).sum())
+    freq = conv['freq_Hz'][i, :n]
+    cap = conv['C'][i, :n]
+    print(f"{os.path.basename(path)}: {n} punti, f = {freq.min():g}-{freq.max():g} Hz, "
+          f"C = {cap.min():.3e}-{cap.max():.3e} F")
 
-# Percorso di salvataggio (modifica se salvi localmente)
-output_path = "output_Cdiode_constF_27770kHz"
-output_df.to_csv(output_path, sep='\t', index=False)
-print(f"File salvato: {output_path}")
\ No newline at end of file
+if OUTPUT_PATH:
+    save_converted(conv, OUTPUT_PATH)
+    print(f"File salvato: {OUTPUT_PATH}")
@@ -1,95 +1,108 @@
+import glob
+import os
+import sys
+from functools import partial
 import numpy as np
-import matplotlib.pyplot as plt
 
-# --- Costanti fisiche ---
-epsilon_0 = 8.854e-12  # F/m
-epsilon_si = 11.7      # costante dielettrica silicio
-q = 1.602e-19           # C
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nanolab.mott_schottky import analyze_frequency_series, load_data
+from nanolab.plotting import plots_enabled, pyplot, show, write_summary, write_table
+from nanolab.uncertainty import mott_schottky_statistic, resample
+
+# --- Parametri del dispositivo ---
 A = 2.89e-6             # m²
-k_B = 1.380649e-23      # J/K
 T = 293                 # Temperatura in K
-thermal_term = k_B * T / q  # kT/q ~ 0.0253 V
-
-# --- Funzioni ---
-def load_data(file_path):
-    data = np.loadtxt(file_path, delimiter='\t', skiprows=1)
-    voff = data[:, 0]
-    capacitance = data[:, 1]
-    inv_c2 = 1 / (capacitance ** 2)
-    inv_c2_err = np.maximum(0.02 * inv_c2, 1e16)  # 2% o minimo assoluto
-    return voff, capacitance, inv_c2, inv_c2_err
-
-def weighted_linear_fit(x, y, y_err):
-    coeffs, cov = np.polyfit(x, y, 1, w=1/y_err, cov=True)
-    m, b = coeffs
-    m_err, b_err = np.sqrt(np.diag(cov))
-    return m, b, m_err, b_err
-
-def extract_Nd_cm3(m, m_err):
-    nd_m3 = 2 / (q * epsilon_si * epsilon_0 * A**2 * m)
-    nd_m3_err = abs(nd_m3 * m_err / m)
-    return nd_m3 / 1e6, nd_m3_err / 1e6  # cm^-3
-
-def extract_flatband(m, b, m_err, b_err):
-    vfb = -b / m - thermal_term
-    vfb_err = np.sqrt((b_err/m)**2 + (b * m_err / m**2)**2)
-    return vfb, vfb_err
 
-# --- Caricamento dati ---
-voff_1k, cap_1k, invc2_1k, invc2_err_1k = load_data("output_Cdiode_constF_1kHz")
-voff_27k, cap_27k, invc2_27k, invc2_err_27k = load_data("output_Cdiode_constF_27770kHz")
+# --- File a frequenza costante (uno per frequenza) ---
+FILE_PATTERN = "input_Cdiode_constF_*"
+FIT_WINDOW = 'auto'     # regione di svuotamento automatica; None = tutti i punti, oppure (V_lo, V_hi)
+# Frequenza (Hz) dei file il cui nome non la riporta alla lettera: "27770kHz" è 27.770 kHz
+FILE_FREQUENCIES = {'input_Cdiode_constF_27770kHz': 27770.0}
 
-# --- Fit lineare ponderato ---
-m1k, b1k, m1k_err, b1k_err = weighted_linear_fit(voff_1k, invc2_1k, invc2_err_1k)
-m27k, b27k, m27k_err, b27k_err = weighted_linear_fit(voff_27k, invc2_27k, invc2_err_27k)
+# --- Fit lineare ponderato di tutte le frequenze ---
+table = analyze_frequency_series(sorted(glob.glob(FILE_PATTERN)), FIT_WINDOW, area=A, T=T,
+                                 freq=FILE_FREQUENCIES)
+labels = [f"{f / 1e3:g} kHz" if np.isfinite(f) else os.path.basename(path)
+          for path, f in zip(table['file'], table['freq_Hz'])]
+curves = [load_data(path, freq) for path, freq in zip(table['file'], table['freq_Hz'])]
 
-# --- Estrazione parametri fisici ---
-nd1k, nd1k_err = extract_Nd_cm3(m1k, m1k_err)
-vfb1k, vfb1k_err = extract_flatband(m1k, b1k, m1k_err, b1k_err)
+# --- Verifica bootstrap degli errori linearizzati ---
+N_RESAMPLES = 0  # opzionale: es. 10000 per confrontare con gli errori linearizzati
+boot = {}
+if N_RESAMPLES:
+    for label, (voff, _, invc2, invc2_err), lo, hi in zip(labels, curves, table['window_lo'],
+                                                          table['window_hi']):
+        sel = (voff >= lo) & (voff <= hi)
+        boot[label] = resample(partial(mott_schottky_statistic, area=A, T=T),
+                               (voff[sel], invc2[sel], invc2_err[sel]), N_RESAMPLES, seed=0)
 
-nd27k, nd27k_err = extract_Nd_cm3(m27k, m27k_err)
-vfb27k, vfb27k_err = extract_flatband(m27k, b27k, m27k_err, b27k_err)
+if plots_enabled():
+    plt = pyplot()
 
-# --- Plot: Capacità vs Voff ---
-plt.figure(figsize=(8, 5))
-plt.plot(voff_1k, cap_1k, 'o-', label='1 kHz')
-plt.plot(voff_27k, cap_27k, 's-', label='27.770 kHz')
-plt.xlabel("Voff (V)", fontsize=14)
-plt.ylabel("Capacitance (F)", fontsize=14)
-plt.title("Capacitance vs Voff", fontsize=16)
-plt.xticks(fontsize=12)
-plt.yticks(fontsize=12)
-plt.grid(True)
-plt.legend(fontsize=12)
-plt.tight_layout()
-plt.show()
+    # --- Plot: Capacità vs Voff ---
+    plt.figure(figsize=(8, 5))
+    for label, (voff, cap, _, _) in zip(labels, curves):
+        plt.plot(voff, cap, 'o-', label=label)
+    plt.xlabel("Voff (V)", fontsize=14)
+    plt.ylabel("Capacitance (F)", fontsize=14)
+    plt.title("Capacitance vs Voff", fontsize=16)
+    plt.xticks(fontsize=12)
+    plt.yticks(fontsize=12)
+    plt.grid(True)
+    plt.legend(fontsize=12)
+    plt.tight_layout()
+    show()
 
-# --- Plot: 1/C² vs Voff con errori e fit ---
-plt.figure(figsize=(8, 5))
-plt.errorbar(voff_1k, invc2_1k, yerr=invc2_err_1k, fmt='.', label=(
-    f"1 kHz\nNₑ = ({nd1k:.2e} ± {nd1k_err:.2e}) cm⁻³\nV_fb = ({vfb1k:.2f} ± {vfb1k_err:.2f}) V"),
-    capsize=3)
-plt.errorbar(voff_27k, invc2_27k, yerr=invc2_err_27k, fmt='.', label=(
-    f"27.770 kHz\nNₑ = ({nd27k:.2e} ± {nd27k_err:.2e}) cm⁻³\nV_fb = ({vfb27k:.2f} ± {vfb27k_err:.2f}) V"),
-    capsize=3)
+    # --- Plot: 1/C² vs Voff con errori e fit ---
+    plt.figure(figsize=(8, 5))
+    for i, (label, (voff, _, invc2, invc2_err)) in enumerate(zip(labels, curves)):
+        line = plt.errorbar(voff, invc2, yerr=invc2_err, fmt='.', capsize=3, label=(
+            f"{label}\nNₑ = ({table['Nd_cm3'][i]:.2e} ± {table['Nd_err'][i]:.2e}) cm⁻³\n"
+            f"V_fb = ({table['Vfb'][i]:.2f} ± {table['Vfb_err'][i]:.2f}) V"))[0]
+        x_fit = np.linspace(voff.min(), voff.max(), 300)
+        plt.plot(x_fit, table['m'][i] * x_fit + table['b'][i], '--', color=line.get_color(),
+                 label=f'Fit {label}')
+        plt.axvspan(table['window_lo'][i], table['window_hi'][i], color=line.get_color(), alpha=0.08)
 
-x_fit = np.linspace(min(voff_1k.min(), voff_27k.min()), max(voff_1k.max(), voff_27k.max()), 300)
-plt.plot(x_fit, m1k * x_fit + b1k, '--', label='Fit 1 kHz', color='blue')
-plt.plot(x_fit, m27k * x_fit + b27k, '--', label='Fit 27.770 kHz', color='orange')
+    plt.xlabel("Voff (V)", fontsize=14)
+    plt.ylabel("1 / C² (1/F²)", fontsize=14)
+    plt.title("1/C² vs Voff (con fit)", fontsize=16)
+    plt.xticks(fontsize=12)
+    plt.yticks(fontsize=12)
+    plt.grid(True)
+    plt.legend(fontsize=11)
+    plt.tight_layout()
+    show()
 
-plt.xlabel("Voff (V)", fontsize=14)
-plt.ylabel("1 / C² (1/F²)", fontsize=14)
-plt.title("1/C² vs Voff (con fit)", fontsize=16)
-plt.xticks(fontsize=12)
-plt.yticks(fontsize=12)
-plt.grid(True)
-plt.legend(fontsize=11)
-plt.tight_layout()
-plt.show()
+    # --- Plot: N_d e V_fb in funzione della frequenza ---
+    if np.isfinite(table['freq_Hz']).sum() > 1:
+        fig, (ax_nd, ax_vfb) = plt.subplots(2, 1, sharex=True, figsize=(8, 7))
+        ax_nd.errorbar(table['freq_Hz'], table['Nd_cm3'], yerr=table['Nd_err'], fmt='o', capsize=3)
+        ax_nd.set_ylabel("Nₑ (cm⁻³)", fontsize=14)
+        ax_vfb.errorbar(table['freq_Hz'], table['Vfb'], yerr=table['Vfb_err'], fmt='o', capsize=3)
+        ax_vfb.set_ylabel("V_fb (V)", fontsize=14)
+        ax_vfb.set_xlabel("Frequency (Hz)", fontsize=14)
+        ax_vfb.set_xscale('log')
+        for ax in (ax_nd, ax_vfb):
+            ax.grid(True)
+        fig.tight_layout()
+        show()
 
 # --- Output su console ---
-print(f"[1 kHz] Doping Density: ({nd1k:.2e} ± {nd1k_err:.2e}) cm⁻³")
-print(f"[1 kHz] Flatband Potential: ({vfb1k:.3f} ± {vfb1k_err:.3f}) V\n")
+for i, label in enumerate(labels):
+    print(f"[{label}] Fit window: {table['window_lo'][i]:.2f} ≤ Voff ≤ {table['window_hi'][i]:.2f} V")
+    print(f"[{label}] Doping Density: ({table['Nd_cm3'][i]:.2e} ± {table['Nd_err'][i]:.2e}) cm⁻³")
+    print(f"[{label}] Flatband Potential: ({table['Vfb'][i]:.3f} ± {table['Vfb_err'][i]:.3f}) V")
+    if label in boot:
+        print(f"[{label}] Bootstrap: N_d ± {boot[label]['Nd_cm3']['std']:.2e} cm⁻³, "
+              f"V_fb ± {boot[label]['Vfb']['std']:.3f} V")
+    print()
 
-print(f"[27.770 kHz] Doping Density: ({nd27k:.2e} ± {nd27k_err:.2e}) cm⁻³")
-print(f"[27.770 kHz] Flatband Potential: ({vfb27k:.3f} ± {vfb27k_err:.3f}) V")
+write_table(table)
+write_summary({label: {'freq_Hz': table['freq_Hz'][i],
+                       'Nd_cm3': table['Nd_cm3'][i], 'Nd_err': table['Nd_err'][i],
+                       'Vfb_V': table['Vfb'][i], 'Vfb_err': table['Vfb_err'][i],
+                       'window_V': (table['window_lo'][i], table['window_hi'][i]),
+                       'Nd_err_bootstrap': boot[label]['Nd_cm3']['std'] if label in boot else None,
+                       'Vfb_err_bootstrap': boot[label]['Vfb']['std'] if label in boot else None}
+               for i, label in enumerate(labels)})
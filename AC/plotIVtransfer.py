@@ -1,4 +1,8 @@
-import matplotlib.pyplot as plt
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nanolab.plotting import plots_enabled, pyplot, show
 
 # Dati da IVtransfer.txt (Vin e Corrente)
 vin_values = [-0.8, -0.7, -0.6, -0.5, -0.4, -0.3, -0.2, -0.1, 0.1, 0.2, 0.3,
@@ -29,14 +33,17 @@ current_values = [
     0.00000000068
 ]
 
-# Creazione del grafico
-plt.figure(figsize=(8, 5))
-plt.plot(vin_values, current_values, marker='o', linestyle='-', color='blue')
-plt.xlabel("Vin (V)", fontsize=14)
-plt.ylabel("Current (A)", fontsize=14)
-plt.title("IV characteristics of diode", fontsize=16)
-plt.xticks(fontsize=14)
-plt.yticks(fontsize=14)
-plt.grid(True)
-plt.tight_layout()
-plt.show()
+if plots_enabled():
+    plt = pyplot()
+
+    # Creazione del grafico
+    plt.figure(figsize=(8, 5))
+    plt.plot(vin_values, current_values, marker='o', linestyle='-', color='blue')
+    plt.xlabel("Vin (V)", fontsize=14)
+    plt.ylabel("Current (A)", fontsize=14)
+    plt.title("IV characteristics of diode", fontsize=16)
+    plt.xticks(fontsize=14)
+    plt.yticks(fontsize=14)
+    plt.grid(True)
+    plt.tight_layout()
+    show()
@@ -1,22 +1,34 @@
-import matplotlib.pyplot as plt
-import pandas as pd
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nanolab.impedance import convert_input
+from nanolab.plotting import plots_enabled, pyplot, show
 
 # Percorso del file
-file_path = "output_C_constV"  # Se è nella stessa cartella dello script, altrimenti usa il path completo
-
-# Legge il file CSV in un DataFrame
-df = pd.read_csv(file_path)
-
-# Crea il grafico
-plt.figure(figsize=(8, 5))
-plt.plot(df["Frequency (Hz)"], df["Capacitance (F)"], marker='o', linestyle='-', color='purple')
-plt.xlabel("Frequency (Hz)", fontsize=14)
-plt.ylabel("Capacitance (F)", fontsize=14)
-plt.title("Capacitance vs Frequency", fontsize=16)
-plt.xticks(fontsize=14)
-plt.yticks(fontsize=14)
-plt.grid(True)
-plt.tight_layout()
-plt.show()
+file_path = "input_C_constV"  # Se è nella stessa cartella dello script, altrimenti usa il path completo
+
+# Converte Vin/Vout/Gain in Z e C in memoria, alla frequenza di ogni riga
+conv = convert_input(file_path)
+
+# Le righe non sono in ordine di frequenza: ordina prima di tracciare la linea
+order = np.argsort(conv['freq_Hz'])
+freq, capacitance = conv['freq_Hz'][order], conv['C'][order]
+
+if plots_enabled():
+    plt = pyplot()
+
+    # Crea il grafico
+    plt.figure(figsize=(8, 5))
+    plt.plot(freq, capacitance, marker='o', linestyle='-', color='purple')
+    plt.xlabel("Frequency (Hz)", fontsize=14)
+    plt.ylabel("Capacitance (F)", fontsize=14)
+    plt.title("Capacitance vs Frequency", fontsize=16)
+    plt.xticks(fontsize=14)
+    plt.yticks(fontsize=14)
+    plt.grid(True)
+    plt.tight_layout()
+    show()
 
 
@@ -0,0 +1,52 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nanolab.mott_schottky import analyze_doping_profiles
+from nanolab.plotting import plots_enabled, pyplot, show, write_table
+
+# --- Parametri del dispositivo ---
+A = 2.89e-6             # m²
+EPS_R = 11.7            # costante dielettrica silicio
+
+# --- Punti dei fit locali per d(1/C²)/dV (dispari) ---
+PROFILE_POINTS = 5
+
+# Frequenza (Hz) dei file il cui nome non la riporta alla lettera: "27770kHz" è 27.770 kHz
+FILE_FREQUENCIES = {'input_Cdiode_constF_27770kHz': 27770.0}
+
+# --- Profilo N(W) di tutti i file a frequenza costante nella cartella ---
+prof = analyze_doping_profiles('.', PROFILE_POINTS, area=A, eps_r=EPS_R, freq=FILE_FREQUENCIES)
+labels = [f"{f / 1e3:g} kHz" if np.isfinite(f) else os.path.basename(path)
+          for path, f in zip(prof['file'], prof['freq_Hz'])]
+
+if plots_enabled():
+    plt = pyplot()
+    plt.figure(figsize=(8, 5))
+    for label, W, N in zip(labels, prof['W_m'], prof['N_cm3']):
+        plt.plot(W * 1e6, N, 'o-', label=label)
+    plt.xlabel("Depletion width W (µm)", fontsize=14)
+    plt.ylabel("N(W) (cm⁻³)", fontsize=14)
+    plt.title("Doping profile from d(1/C²)/dV", fontsize=16)
+    plt.yscale('log')
+    plt.grid(True)
+    plt.legend(fontsize=12)
+    plt.tight_layout()
+    show()
+
+# --- Output su console ---
+table = {'file': [], 'freq_Hz': [], 'Voff_V': [], 'W_um': [], 'N_cm3': []}
+for label, path, freq, voff, W, N in zip(labels, prof['file'], prof['freq_Hz'], prof['Voff'],
+                                         prof['W_m'], prof['N_cm3']):
+    print(f"[{label}]")
+    for v, w, n in zip(voff, W, N):
+        if np.isfinite(v):
+            print(f"  Voff = {v:6.2f} V   W = {w * 1e6:7.3f} µm   N = {n:.3e} cm⁻³")
+            table['file'].append(path)
+            table['freq_Hz'].append(freq)
+            table['Voff_V'].append(v)
+            table['W_um'].append(w * 1e6)
+            table['N_cm3'].append(n)
+
+write_table(table)
@@ -1,38 +1,53 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+import os
+import sys
 import numpy as np
 
-plt.rcParams.update({'font.size': 20})
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nanolab.afm import RESULT_KEYS, analyze_curves, load_curve
+from nanolab.plotting import plots_enabled, pyplot, show, write_summary
+from nanolab.sweeps import iter_branches
 
 file_name = 'h-Amp.txt'
 
-data = pd.read_csv(file_name, skiprows=8, header=None, usecols=[1, 2], sep='\s+')
-data.columns = ['Height', 'Amplitude']
-
-data['Height'] = pd.to_numeric(data['Height'])
-data['Amplitude'] = pd.to_numeric(data['Amplitude'])
-data.dropna(inplace=True)
-
-min_height_idx = data['Height'].idxmin()
-
-forward_sweep_data = data.iloc[:min_height_idx + 1].copy()
-backward_sweep_data = data.iloc[min_height_idx:].copy()
-is_two_sweeps = True
-
-fig, ax1 = plt.subplots(figsize=(10, 6))
-ax1.set_xlabel(r'Height ($\mu$m)')
-ax1.set_ylabel('Amplitude (nm)')
-if is_two_sweeps:
-    ax1.plot(forward_sweep_data['Height'], forward_sweep_data['Amplitude'], marker='.', linestyle='-', color='blue', label='Approach Sweep')
-    ax1.plot(backward_sweep_data['Height'], backward_sweep_data['Amplitude'], marker='.', linestyle='-', color='steelblue', label='Retract Sweep')
-else:
-    ax1.plot(data['Height'], data['Amplitude'], marker='.', linestyle='-', color='blue')
-ax1.tick_params(axis='y')
-ax1.grid(True)
-
-lines, labels = ax1.get_legend_handles_labels()
-
-plt.title(r"Amplitude vs Distance")
-
-plt.legend()
-plt.show()
+height, amplitude = load_curve(file_name)
+
+# Approach (Height decreasing) and retract branches of every cycle, split at the
+# turning points of Height; each branch keeps the turning point
+HEIGHT_TOL = 0.0  # alzare se la quota del piezo e' rumorosa
+branches = list(iter_branches(height, amplitude, tol=HEIGHT_TOL, include_turn=True, min_points=2))
+is_two_sweeps = len(branches) > 1
+
+# Contact point, set-point crossing and approach/retract offsets (see nanolab.afm)
+result = {key: value[0] for key, value in analyze_curves(height, amplitude, tol=HEIGHT_TOL).items()}
+for key in RESULT_KEYS:
+    print(f"{key}: {result[key]:.4g}")
+
+if plots_enabled():
+    plt = pyplot()
+    plt.rcParams.update({'font.size': 20})
+
+    fig, ax1 = plt.subplots(figsize=(10, 6))
+    ax1.set_xlabel(r'Height ($\mu$m)')
+    ax1.set_ylabel('Amplitude (nm)')
+    if is_two_sweeps:
+        for seg, h, amp in branches:
+            approach = seg.direction < 0
+            label = ('Approach Sweep' if approach else 'Retract Sweep') if seg.cycle == 0 else None
+            ax1.plot(h, amp, marker='.', linestyle='-', color='blue' if approach else 'steelblue', label=label)
+    else:
+        ax1.plot(height, amplitude, marker='.', linestyle='-', color='blue')
+    if np.isfinite(result['contact_approach']):
+        ax1.axvline(result['contact_approach'], color='red', linestyle='--', label='Contact point')
+    if np.isfinite(result['setpoint_approach']):
+        ax1.axvline(result['setpoint_approach'], color='orange', linestyle=':', label='Set-point crossing')
+    ax1.tick_params(axis='y')
+    ax1.grid(True)
+
+    lines, labels = ax1.get_legend_handles_labels()
+
+    plt.title(r"Amplitude vs Distance")
+
+    plt.legend()
+    show()
+
+write_summary(result)
@@ -1,72 +1,63 @@
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
-import re
+import sys
 
-parent_path = os.listdir("./")
-datafiles = []
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nanolab.output import first_quadrant, load_output_family, output_parameters
+from nanolab.plotting import plots_enabled, pyplot, show, write_table
 
-for file in parent_path:
-    if file.startswith("scan_output") and file.endswith(".dat"):
-        datafiles.append(file)
+WORKERS = None  # processi per la lettura dei file (None = uno per CPU)
 
-# Store data and labels for sorting entries in legend
-plot_data = []
 
-def draw_output(f):
-    data = pd.read_csv(f, skiprows=2, sep=r'\s+')
-    voltage = data.iloc[:, 3]
-    current = data.iloc[:, 4]
-    match = re.search(r"scan_output_(\d+)_", f)  # regex to target the number between underscores
-    if match:
-        label = int(match.group(1))  # convert label to int for sorting
-        plot_data.append((voltage, current, label))
-    else:
-        print(f"Filename: {f}, No label found with the new regex")
+def main():
+    # Whole V_G family as 2-D arrays (one row per gate voltage, sorted)
+    V_G, voltage, current = load_output_family("./", workers=WORKERS)
+    if V_G.size == 0:
+        print("No scan_output_*.dat files found")
+        return
 
-for df in datafiles:
-    draw_output(df)
+    # Primo quadrante (Voltage >= 0 e Current >= 0), tutto in una volta
+    voltage_q1, current_q1 = first_quadrant(voltage, current)
+    params = output_parameters(voltage_q1, current_q1)
 
-# Sort the plot data based on the label (Gate Voltage)
-plot_data.sort(key=lambda item: item[2])
+    print(f"{'V_G (V)':>8s} {'g_out (S)':>22s} {'I_sat (A)':>11s} {'V_D,sat (V)':>11s}")
+    for row in zip(V_G, params['g_out'], params['g_out_err'], params['I_sat'], params['V_Dsat']):
+        vg, g_out, g_out_err, I_sat, V_Dsat = row
+        print(f"{vg:8.2f} {g_out:10.3e} ± {g_out_err:9.2e} {I_sat:11.3e} {V_Dsat:11.3f}")
+    write_table({'V_G': V_G, **params})
 
-# Plot all data
-plt.figure(figsize=(10, 6)) # Crea una nuova figura per il primo grafico
-for voltage, current, label in plot_data:
-    plt.plot(voltage, current, label=label)
+    if plots_enabled():
+        plt = pyplot()
+        labels = [f"{vg:g}" for vg in V_G]
 
-plt.xlabel("Voltage [V]")
-plt.ylabel("Current [A]")
-plt.title("Output Characteristics for Different Gate Voltages")
-plt.legend(title="Gate Voltages [V]")
-plt.grid(True)
-plt.show()
+        # Plot all data
+        plt.figure(figsize=(10, 6)) # Crea una nuova figura per il primo grafico
+        for v, i, label in zip(voltage, current, labels):
+            plt.plot(v, i, label=label)
 
+        plt.xlabel("Voltage [V]")
+        plt.ylabel("Current [A]")
+        plt.title("Output Characteristics for Different Gate Voltages")
+        plt.legend(title="Gate Voltages [V]")
+        plt.grid(True)
+        show()
 
-# Plot del primo quadrante
 
-plt.figure(figsize=(10, 6)) # Crea una nuova figura per il secondo grafico
-for voltage, current, label in plot_data:
-    # Filtra i dati per includere solo quelli nel primo quadrante (Voltage >= 0 e Current >= 0)
-    positive_voltage = voltage[voltage >= 0]
-    positive_current = current[current >= 0]
+        # Plot del primo quadrante
 
-    # Assicurati che le lunghezze siano uguali dopo il filtraggio
-    filtered_voltage = []
-    filtered_current = []
-    for v, i in zip(positive_voltage, positive_current):
-        if v >= 0 and i >= 0:
-            filtered_voltage.append(v)
-            filtered_current.append(i)
+        plt.figure(figsize=(10, 6)) # Crea una nuova figura per il secondo grafico
+        for v, i, label in zip(voltage_q1, current_q1, labels):
+            if (i >= 0).any(): # Plotta solo se ci sono dati nel primo quadrante
+                plt.plot(v, i, label=label)
 
-    if filtered_voltage and filtered_current: # Plotta solo se ci sono dati nel primo quadrante
-        plt.plot(filtered_voltage, filtered_current, label=label)
+        plt.xlabel("Voltage [V]")
+        plt.ylabel("Current [A]")
+        plt.title("Output Characteristics")
+        plt.legend(title="Gate Voltages [V]")
+        plt.grid(True)
+        plt.xlim(left=0) # Imposta il limite inferiore dell'asse X a 0
+        plt.ylim(bottom=0) # Imposta il limite inferiore dell'asse Y a 0
+        show()
 
-plt.xlabel("Voltage [V]")
-plt.ylabel("Current [A]")
-plt.title("Output Characteristics")
-plt.legend(title="Gate Voltages [V]")
-plt.grid(True)
-plt.xlim(left=0) # Imposta il limite inferiore dell'asse X a 0
-plt.ylim(bottom=0) # Imposta il limite inferiore dell'asse Y a 0
-plt.show()
\ No newline at end of file
+
+if __name__ == '__main__':
+    main()
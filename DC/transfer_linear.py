@@ -1,11 +1,18 @@
+import os
+import sys
+from functools import partial
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.optimize import curve_fit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nanolab.fits import linear_fit, linear_model
+from nanolab.plotting import plots_enabled, pyplot, show, write_summary
+from nanolab.transfer import (find_linear_window, hysteresis_loop, linear_mobility, load_transfer, split_sweep,
+                              threshold_voltage)
+from nanolab.uncertainty import resample, transfer_statistic
 
 # ---- LOAD DATA ----
-data_01 = np.loadtxt("scan_transfer_0.1_25927953.dat")
-V_SG = data_01[:, 0]
-I_D_01 = data_01[:, 4] * 1e6  # µA
+V_SG, I_D_01 = load_transfer("scan_transfer_0.1_25927953.dat")
+I_D_01 = I_D_01 * 1e6  # µA
 
 # ---- PARAMETRI FISICI ----
 L = 15 * 500e-6
@@ -13,14 +20,23 @@ W = 9.5 * 500e-6
 C = 54e-9
 V_SD = 0.1
 
-# ---- SPLIT FORWARD / BACKWARD ----
-midpoint = len(V_SG) // 2
-V_SG_fwd, V_SG_bwd = V_SG[:midpoint], V_SG[midpoint:]
-I_D_01_fwd, I_D_01_bwd = I_D_01[:midpoint], I_D_01[midpoint:]
+# ---- SPLIT FORWARD / BACKWARD (primo ciclo, al punto di inversione di V_SG) ----
+(V_SG_fwd, I_D_01_fwd), (V_SG_bwd, I_D_01_bwd) = split_sweep(V_SG, I_D_01)
 
 # ---- FIT MASK ----
-mask_fwd = (V_SG_fwd > 3) & (V_SG_fwd < 9)
-mask_bwd = (V_SG_bwd > 3) & (V_SG_bwd < 9)
+# AUTO_WINDOW = True lascia scegliere la finestra a find_linear_window
+AUTO_WINDOW = False
+FIT_WINDOW = (3, 9)
+if AUTO_WINDOW:
+    window_fwd = find_linear_window(V_SG_fwd, I_D_01_fwd)
+    window_bwd = find_linear_window(V_SG_bwd, I_D_01_bwd)
+else:
+    window_fwd = window_bwd = FIT_WINDOW
+print(f"Fit window: forward {window_fwd[0]:.2f} < V_SG < {window_fwd[1]:.2f} V, "
+      f"backward {window_bwd[0]:.2f} < V_SG < {window_bwd[1]:.2f} V")
+
+mask_fwd = (V_SG_fwd > window_fwd[0]) & (V_SG_fwd < window_fwd[1])
+mask_bwd = (V_SG_bwd > window_bwd[0]) & (V_SG_bwd < window_bwd[1])
 
 V_fit_fwd = V_SG_fwd[mask_fwd]
 I_fit_fwd = I_D_01_fwd[mask_fwd]
@@ -28,9 +44,6 @@ I_fit_fwd = I_D_01_fwd[mask_fwd]
 V_fit_bwd = V_SG_bwd[mask_bwd]
 I_fit_bwd = I_D_01_bwd[mask_bwd]
 
-def linear_model(Vsg, m, q):
-    return m * Vsg + q
-
 def format_with_error(val, err, digits=2):
     if val == 0:
         return r"$0 \pm " + f"{err:.{digits}g}" + r"$"
@@ -42,104 +55,120 @@ def format_with_error(val, err, digits=2):
     return fr"$({val_fmt} \pm {err_fmt}) \times 10^{{{exp}}}$"
 
 # ---- FIT CON ERRORI ----
-popt_fwd, pcov_fwd = curve_fit(linear_model, V_fit_fwd, I_fit_fwd)
-popt_bwd, pcov_bwd = curve_fit(linear_model, V_fit_bwd, I_fit_bwd)
-
-m_fwd, q_fwd = popt_fwd
-m_bwd, q_bwd = popt_bwd
+m_fwd, q_fwd, dm_fwd, dq_fwd = linear_fit(V_fit_fwd, I_fit_fwd)
+m_bwd, q_bwd, dm_bwd, dq_bwd = linear_fit(V_fit_bwd, I_fit_bwd)
 
-dm_fwd, dq_fwd = np.sqrt(np.diag(pcov_fwd))
-dm_bwd, dq_bwd = np.sqrt(np.diag(pcov_bwd))
+popt_fwd = (m_fwd, q_fwd)
+popt_bwd = (m_bwd, q_bwd)
 
 # ---- MOBILITÀ e Vt CON ERRORI ----
-m_fwd_amp = m_fwd * 1e-6
-m_bwd_amp = m_bwd * 1e-6
-dm_fwd_amp = dm_fwd * 1e-6
-dm_bwd_amp = dm_bwd * 1e-6
-
-Vt_fwd = -q_fwd / m_fwd
-Vt_bwd = -q_bwd / m_bwd
-dVt_fwd = np.sqrt((dq_fwd / m_fwd)**2 + (q_fwd * dm_fwd / m_fwd**2)**2)
-dVt_bwd = np.sqrt((dq_bwd / m_bwd)**2 + (q_bwd * dm_bwd / m_bwd**2)**2)
-
-mu_fwd = m_fwd_amp * L / (W * C * V_SD)
-mu_bwd = m_bwd_amp * L / (W * C * V_SD)
-dmu_fwd = dm_fwd_amp * L / (W * C * V_SD)
-dmu_bwd = dm_bwd_amp * L / (W * C * V_SD)
+Vt_fwd, dVt_fwd = threshold_voltage(m_fwd, q_fwd, dm_fwd, dq_fwd)
+Vt_bwd, dVt_bwd = threshold_voltage(m_bwd, q_bwd, dm_bwd, dq_bwd)
+
+# Slopes from µA/V to A/V
+mu_fwd, dmu_fwd = linear_mobility(m_fwd * 1e-6, dm_fwd * 1e-6, L, W, C, V_SD)
+mu_bwd, dmu_bwd = linear_mobility(m_bwd * 1e-6, dm_bwd * 1e-6, L, W, C, V_SD)
+
+# ---- ISTERESI ----
+dVt = Vt_bwd - Vt_fwd
+ddVt = np.hypot(dVt_fwd, dVt_bwd)
+loop = hysteresis_loop(V_SG_fwd, I_D_01_fwd * 1e-6, V_SG_bwd, I_D_01_bwd * 1e-6)
+print(f"Hysteresis: dV_t = {dVt:.3f} ± {ddVt:.3f} V, loop area = {loop['loop_area']:.3e} A·V, "
+      f"max |dI| = {loop['max_dI']:.3e} A at V_SG = {loop['V_max_dI']:.2f} V")
+
+# ---- VERIFICA BOOTSTRAP DEGLI ERRORI LINEARIZZATI ----
+N_RESAMPLES = 0  # opzionale: es. 10000 per confrontare con gli errori linearizzati
+boot_err = {}
+if N_RESAMPLES:
+    for name, V_fit, I_fit, window, dmu, dVt_lin in (
+            ('fwd', V_fit_fwd, I_fit_fwd, window_fwd, dmu_fwd, dVt_fwd),
+            ('bwd', V_fit_bwd, I_fit_bwd, window_bwd, dmu_bwd, dVt_bwd)):
+        stat = partial(transfer_statistic, window=window, L=L, W=W, C=C, V_SD=V_SD)
+        boot = resample(stat, (V_fit, I_fit * 1e-6), N_RESAMPLES, seed=0)
+        boot_err[name] = (boot['mu']['std'], boot['Vt']['std'])
+        print(f"[{name}] bootstrap: dmu = {boot['mu']['std']:.2e} (linearized {dmu:.2e}) cm^2/Vs, "
+              f"dVt = {boot['Vt']['std']:.3f} (linearized {dVt_lin:.3f}) V")
 
 mu_fwd_str = format_with_error(mu_fwd, dmu_fwd)
 mu_bwd_str = format_with_error(mu_bwd, dmu_bwd)
 Vt_fwd_str = format_with_error(Vt_fwd, dVt_fwd)
 Vt_bwd_str = format_with_error(Vt_bwd, dVt_bwd)
 
-# ========== GRAFICO COMPLETO ==========
-plt.figure(figsize=(6, 5))
-plt.plot(V_SG_fwd, I_D_01_fwd, '.', color='blue', label='Forward')
-plt.plot(V_SG_bwd, I_D_01_bwd, '.', color='red', label='Backward')
-plt.title(r'$I_D$ vs $V_{SG}$  ($V_{SD} = 0.1$ V)', fontsize=18)
-plt.xlabel(r'$V_{SG}$ (V)', fontsize=16)
-plt.ylabel(r'$I_D$ ($\mu$A)', fontsize=16)
-plt.xticks(fontsize=14)
-plt.yticks(fontsize=14)
-plt.grid(True)
-plt.legend(loc='upper left', fontsize=14)
-plt.tight_layout()
-plt.savefig("raw_transfer.png", dpi=300)
-plt.show()
-
-# ========== GRAFICO FORWARD ==========
-V_ext = np.linspace(-2, 5, 300)
-V_in = np.linspace(1, 4, 100)
-
-fig, axs = plt.subplots(2, 1, figsize=(7, 8), gridspec_kw={'height_ratios': [3, 1]})
-axs[0].plot(V_SG_fwd, I_D_01_fwd, '.', color='blue', label='Forward')
-axs[0].plot(V_ext, linear_model(V_ext, *popt_fwd), '--', color='green', linewidth=1)
-axs[0].plot(V_in, linear_model(V_in, *popt_fwd), '-', color='green', linewidth=2,
-            label=fr'Fit : $\mu$ = {mu_fwd_str} cm$^2$/Vs')
-axs[0].axvline(Vt_fwd, color='gray', linestyle='--', label=fr'$V_t$ = {Vt_fwd_str} V')
-axs[0].set_title('Forward Sweep ($V_{SD} = 0.1$ V)', fontsize=20)
-axs[0].set_ylabel(r'$I_D$ ($\mu$A)', fontsize=18)
-axs[0].tick_params(axis='both', labelsize=14)
-axs[0].grid(True)
-axs[0].legend(loc='upper left', fontsize=12)
-axs[0].set_xlim([-2, 5])
-axs[0].set_ylim([-25, 100])
-
-residui_fwd = I_fit_fwd - linear_model(V_fit_fwd, *popt_fwd)
-axs[1].plot(V_fit_fwd, residui_fwd, '.', color='blue')
-axs[1].axhline(0, color='gray', linestyle='--')
-axs[1].set_xlabel(r'$V_{SG}$ (V)', fontsize=18)
-axs[1].set_ylabel('Residuals', fontsize=18)
-axs[1].tick_params(axis='both', labelsize=14)
-axs[1].grid(True)
-
-plt.tight_layout()
-plt.savefig("fit_forward.png", dpi=300)
-plt.show()
-
-# ========== GRAFICO BACKWARD ==========
-fig, axs = plt.subplots(2, 1, figsize=(7, 8), gridspec_kw={'height_ratios': [3, 1]})
-axs[0].plot(V_SG_bwd, I_D_01_bwd, '.', color='red', label='Backward')
-axs[0].plot(V_ext, linear_model(V_ext, *popt_bwd), '--', color='green', linewidth=1)
-axs[0].plot(V_in, linear_model(V_in, *popt_bwd), '-', color='green', linewidth=2,
-            label=fr'Fit : $\mu$ = {mu_bwd_str} cm$^2$/Vs')
-axs[0].axvline(Vt_bwd, color='gray', linestyle='--', label=fr'$V_t$ = {Vt_bwd_str} V')
-axs[0].set_title('Backward Sweep ($V_{SD} = 0.1$ V)', fontsize=20)
-axs[0].set_ylabel(r'$I_D$ ($\mu$A)', fontsize=18)
-axs[0].tick_params(axis='both', labelsize=14)
-axs[0].grid(True)
-axs[0].legend(loc='upper left', fontsize=12)
-axs[0].set_xlim([-2, 5])
-axs[0].set_ylim([-25, 100])
-
-residui_bwd = I_fit_bwd - linear_model(V_fit_bwd, *popt_bwd)
-axs[1].plot(V_fit_bwd, residui_bwd, '.', color='red')
-axs[1].axhline(0, color='gray', linestyle='--')
-axs[1].set_xlabel(r'$V_{SG}$ (V)', fontsize=18)
-axs[1].set_ylabel('Residuals', fontsize=18)
-axs[1].tick_params(axis='both', labelsize=14)
-axs[1].grid(True)
-
-plt.tight_layout()
-plt.savefig("fit_backward.png", dpi=300)
-plt.show()
+write_summary({'mu_fwd_cm2_Vs': mu_fwd, 'dmu_fwd': dmu_fwd, 'Vt_fwd_V': Vt_fwd, 'dVt_fwd': dVt_fwd,
+               'mu_bwd_cm2_Vs': mu_bwd, 'dmu_bwd': dmu_bwd, 'Vt_bwd_V': Vt_bwd, 'dVt_bwd': dVt_bwd,
+               'window_fwd_V': window_fwd, 'window_bwd_V': window_bwd,
+               'dVt_V': dVt, 'ddVt': ddVt, 'loop_area_AV': loop['loop_area'],
+               'max_dI_A': loop['max_dI'], 'V_max_dI_V': loop['V_max_dI'],
+               'bootstrap_dmu_dVt': boot_err})
+
+if plots_enabled():
+    plt = pyplot()
+
+    # ========== GRAFICO COMPLETO ==========
+    plt.figure(figsize=(6, 5))
+    plt.plot(V_SG_fwd, I_D_01_fwd, '.', color='blue', label='Forward')
+    plt.plot(V_SG_bwd, I_D_01_bwd, '.', color='red', label='Backward')
+    plt.title(r'$I_D$ vs $V_{SG}$  ($V_{SD} = 0.1$ V)', fontsize=18)
+    plt.xlabel(r'$V_{SG}$ (V)', fontsize=16)
+    plt.ylabel(r'$I_D$ ($\mu$A)', fontsize=16)
+    plt.xticks(fontsize=14)
+    plt.yticks(fontsize=14)
+    plt.grid(True)
+    plt.legend(loc='upper left', fontsize=14)
+    plt.tight_layout()
+    show(dpi=300)
+
+    # ========== GRAFICO FORWARD ==========
+    V_ext = np.linspace(-2, 5, 300)
+    V_in = np.linspace(1, 4, 100)
+
+    fig, axs = plt.subplots(2, 1, figsize=(7, 8), gridspec_kw={'height_ratios': [3, 1]})
+    axs[0].plot(V_SG_fwd, I_D_01_fwd, '.', color='blue', label='Forward')
+    axs[0].plot(V_ext, linear_model(V_ext, *popt_fwd), '--', color='green', linewidth=1)
+    axs[0].plot(V_in, linear_model(V_in, *popt_fwd), '-', color='green', linewidth=2,
+                label=fr'Fit : $\mu$ = {mu_fwd_str} cm$^2$/Vs')
+    axs[0].axvline(Vt_fwd, color='gray', linestyle='--', label=fr'$V_t$ = {Vt_fwd_str} V')
+    axs[0].set_title('Forward Sweep ($V_{SD} = 0.1$ V)', fontsize=20)
+    axs[0].set_ylabel(r'$I_D$ ($\mu$A)', fontsize=18)
+    axs[0].tick_params(axis='both', labelsize=14)
+    axs[0].grid(True)
+    axs[0].legend(loc='upper left', fontsize=12)
+    axs[0].set_xlim([-2, 5])
+    axs[0].set_ylim([-25, 100])
+
+    residui_fwd = I_fit_fwd - linear_model(V_fit_fwd, *popt_fwd)
+    axs[1].plot(V_fit_fwd, residui_fwd, '.', color='blue')
+    axs[1].axhline(0, color='gray', linestyle='--')
+    axs[1].set_xlabel(r'$V_{SG}$ (V)', fontsize=18)
+    axs[1].set_ylabel('Residuals', fontsize=18)
+    axs[1].tick_params(axis='both', labelsize=14)
+    axs[1].grid(True)
+
+    plt.tight_layout()
+    show(dpi=300)
+
+    # ========== GRAFICO BACKWARD ==========
+    fig, axs = plt.subplots(2, 1, figsize=(7, 8), gridspec_kw={'height_ratios': [3, 1]})
+    axs[0].plot(V_SG_bwd, I_D_01_bwd, '.', color='red', label='Backward')
+    axs[0].plot(V_ext, linear_model(V_ext, *popt_bwd), '--', color='green', linewidth=1)
+    axs[0].plot(V_in, linear_model(V_in, *popt_bwd), '-', color='green', linewidth=2,
+                label=fr'Fit : $\mu$ = {mu_bwd_str} cm$^2$/Vs')
+    axs[0].axvline(Vt_bwd, color='gray', linestyle='--', label=fr'$V_t$ = {Vt_bwd_str} V')
+    axs[0].set_title('Backward Sweep ($V_{SD} = 0.1$ V)', fontsize=20)
+    axs[0].set_ylabel(r'$I_D$ ($\mu$A)', fontsize=18)
+    axs[0].tick_params(axis='both', labelsize=14)
+    axs[0].grid(True)
+    axs[0].legend(loc='upper left', fontsize=12)
+    axs[0].set_xlim([-2, 5])
+    axs[0].set_ylim([-25, 100])
+
+    residui_bwd = I_fit_bwd - linear_model(V_fit_bwd, *popt_bwd)
+    axs[1].plot(V_fit_bwd, residui_bwd, '.', color='red')
+    axs[1].axhline(0, color='gray', linestyle='--')
+    axs[1].set_xlabel(r'$V_{SG}$ (V)', fontsize=18)
+    axs[1].set_ylabel('Residuals', fontsize=18)
+    axs[1].tick_params(axis='both', labelsize=14)
+    axs[1].grid(True)
+
+    plt.tight_layout()
+    show(dpi=300)
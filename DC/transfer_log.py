@@ -1,130 +1,105 @@
+import os
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.optimize import curve_fit
 
-# Load data
-data = np.loadtxt("scan_transfer_5_25953812.dat")
-V_SG = data[:, 0]
-I_D = data[:, 4]
-
-# Split forward and reverse sweep
-midpoint = len(V_SG) // 2
-V_SG_forward = V_SG[:midpoint]
-I_D_forward = I_D[:midpoint]
-V_SG_reverse = V_SG[midpoint:]
-I_D_reverse = I_D[midpoint:]
-
-log_ID_forward = np.log10(I_D_forward)
-log_ID_reverse = np.log10(I_D_reverse)
-
-# Fit ranges
-fit_mask_fwd = (V_SG_forward >= -6) & (V_SG_forward <= -3)
-fit_mask_bwd = (V_SG_reverse >= -4.6) & (V_SG_reverse <= -2.8)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nanolab.fits import linear_model
+from nanolab.plotting import plots_enabled, pyplot, show, write_summary
+from nanolab.transfer import load_transfer, log_current, split_sweep, stack_curves, subthreshold_parameters
 
-V_ext = np.linspace(-7.5, 5, 300)
+# Load data
+V_SG, I_D = load_transfer("scan_transfer_5_25953812.dat")
 
-def linear_model(V, m, q):
-    return m * V + q
+# Split forward and reverse sweep at the V_SG turning point
+(V_SG_forward, I_D_forward), (V_SG_reverse, I_D_reverse) = split_sweep(V_SG, I_D)
 
-# ===== Sweep completo (scala lineare) =====
-plt.figure(figsize=(7, 5))
-plt.plot(V_SG_forward, I_D_forward, 'b.-', label='Forward Sweep')
-plt.plot(V_SG_reverse, I_D_reverse, 'r.-', label='Backward Sweep')
-plt.xlabel(r'$V_{SG}$ (V)')
-plt.ylabel(r'$I_D$ (A)')
-plt.title('Forward and Backward Sweep')
-plt.grid(True)
-plt.legend()
-plt.tight_layout()
-plt.show()
+# Parametri sottosoglia di entrambi gli sweep in un solo passaggio
+V_sweeps = stack_curves([V_SG_forward, V_SG_reverse])
+I_sweeps = stack_curves([I_D_forward, I_D_reverse])
+log_ID = log_current(I_sweeps)
 
-# ===== Sweep completo (log scale) =====
-plt.figure(figsize=(7, 5))
-plt.plot(V_SG_forward, log_ID_forward, 'b.-', label='Forward Sweep')
-plt.plot(V_SG_reverse, log_ID_reverse, 'r.-', label='Backward Sweep')
-plt.xlabel(r'$V_{SG}$ (V)')
-plt.ylabel(r'$\log_{10}(I_D)$ (A)')
-plt.title('$log(I_D)$ vs $V_{SG}$')
-plt.grid(True)
-plt.legend()
-plt.xlim([-10, 10])
-plt.ylim([-12, -2])
-plt.tight_layout()
-plt.show()
+# Fit ranges (AUTO_WINDOW = True: steepest decade from find_subthreshold_window)
+AUTO_WINDOW = False
+if AUTO_WINDOW:
+    fit_window = 'auto'
+else:
+    fit_window = ((-6, -4.6), (-3, -2.8))  # (lower, upper) for forward, backward
+# Regione per Von (modifica se necessario)
+von_window = ((-7.5, -4.7), (-5, -2))
 
-# ===== FORWARD: Subthreshold fit =====
-if np.any(fit_mask_fwd):
-    V_fit = V_SG_forward[fit_mask_fwd]
-    log_ID_fit = log_ID_forward[fit_mask_fwd]
-    popt, pcov = curve_fit(linear_model, V_fit, log_ID_fit)
-    m, q = popt
-    m_err, q_err = np.sqrt(np.diag(pcov))
-    S = 1 / m
-    S_err = m_err / m**2
+params = subthreshold_parameters(V_sweeps, I_sweeps, window=fit_window, von_window=von_window,
+                                 off_below=-8)
 
-    fit_line = linear_model(V_ext, m, q)
-    I_on = np.max(I_D_forward)
-    I_off = np.mean(I_D_forward[V_SG_forward < -8])
-# Regione lineare per Von: da -4 V in poi (modifica se necessario)
-    von_mask_fwd = (V_SG_forward >= -7.5) & (V_SG_forward <= -5)
-    Von = V_SG_forward[von_mask_fwd][np.argmax(np.gradient(log_ID_forward[von_mask_fwd]))]
+V_ext = np.linspace(-7.5, 5, 300)
 
+if plots_enabled():
+    plt = pyplot()
 
+    # ===== Sweep completo (scala lineare) =====
     plt.figure(figsize=(7, 5))
-    plt.plot(V_SG_forward, log_ID_forward, '.-', color='blue', label='Forward Sweep')
-    plt.plot(V_ext, fit_line, '--', linewidth=2, color='green',
-             label=fr'Fit ($S$ = {S*1000:.0f} ± {S_err*1000:.0f} mV/dec)')
-    plt.axvline(x=Von, color='purple', linestyle='--', label=fr'$V_{{on}}$ = {Von:.2f} V')
-    plt.axhline(y=np.log10(I_on), color='orange', linestyle='--', label=fr'$I_{{on}}$ = {I_on:.1e} A')
-    plt.axhline(y=np.log10(I_off), color='gray', linestyle='--', label=fr'$I_{{off}}$ = {I_off:.1e} A')
+    plt.plot(V_SG_forward, I_D_forward, 'b.-', label='Forward Sweep')
+    plt.plot(V_SG_reverse, I_D_reverse, 'r.-', label='Backward Sweep')
     plt.xlabel(r'$V_{SG}$ (V)')
-    plt.ylabel(r'$\log_{10}(I_D)$ (A)')
-    plt.title('Forward Sweep')
+    plt.ylabel(r'$I_D$ (A)')
+    plt.title('Forward and Backward Sweep')
     plt.grid(True)
-    plt.legend(loc='lower right')
-    plt.xlim([-10, 10])
-    plt.ylim([-11.5, -2])
+    plt.legend()
     plt.tight_layout()
-    plt.show()
-
-    print(f"[FORWARD] S = {S*1000:.1f} ± {S_err*1000:.1f} mV/dec")
-    print(f"[FORWARD] Slope = {m:.3e} ± {m_err:.1e}, Intercept = {q:.3f} ± {q_err:.3f}")
-    print(f"[FORWARD] I_on = {I_on:.2e}, I_off = {I_off:.2e}, Von = {Von:.2f} V")
-
-# ===== BACKWARD: Subthreshold fit =====
-if np.any(fit_mask_bwd):
-    V_fit = V_SG_reverse[fit_mask_bwd]
-    log_ID_fit = log_ID_reverse[fit_mask_bwd]
-    popt, pcov = curve_fit(linear_model, V_fit, log_ID_fit)
-    m, q = popt
-    m_err, q_err = np.sqrt(np.diag(pcov))
-    S = 1 / m
-    S_err = m_err / m**2
-
-    fit_line = linear_model(V_ext, m, q)
-    I_on = np.max(I_D_reverse)
-    I_off = np.mean(I_D_reverse[V_SG_reverse < -8])
-    von_mask_bwd = (V_SG_reverse >= -4.7) & (V_SG_reverse <= -2)
-    Von = V_SG_reverse[von_mask_bwd][np.argmax(np.gradient(log_ID_reverse[von_mask_bwd]))]
-
+    show()
 
+    # ===== Sweep completo (log scale) =====
     plt.figure(figsize=(7, 5))
-    plt.plot(V_SG_reverse, log_ID_reverse, '.-', color='red', label='Backward Sweep')
-    plt.plot(V_ext, fit_line, '--', linewidth=2, color='green',
-             label=fr'Fit ($S$ = {S*1000:.0f} ± {S_err*1000:.0f} mV/dec)')
-    plt.axvline(x=Von, color='purple', linestyle='--', label=fr'$V_{{on}}$ = {Von:.2f} V')
-    plt.axhline(y=np.log10(I_on), color='orange', linestyle='--', label=fr'$I_{{on}}$ = {I_on:.1e} A')
-    plt.axhline(y=np.log10(I_off), color='gray', linestyle='--', label=fr'$I_{{off}}$ = {I_off:.1e} A')
+    plt.plot(V_SG_forward, log_ID[0, :len(V_SG_forward)], 'b.-', label='Forward Sweep')
+    plt.plot(V_SG_reverse, log_ID[1, :len(V_SG_reverse)], 'r.-', label='Backward Sweep')
     plt.xlabel(r'$V_{SG}$ (V)')
     plt.ylabel(r'$\log_{10}(I_D)$ (A)')
-    plt.title('Backward Sweep')
+    plt.title('$log(I_D)$ vs $V_{SG}$')
     plt.grid(True)
-    plt.legend(loc='lower right')
+    plt.legend()
     plt.xlim([-10, 10])
-    plt.ylim([-8.2, -2])
+    plt.ylim([-12, -2])
     plt.tight_layout()
-    plt.show()
-
-    print(f"[BACKWARD] S = {S*1000:.1f} ± {S_err*1000:.1f} mV/dec")
-    print(f"[BACKWARD] Slope = {m:.3e} ± {m_err:.1e}, Intercept = {q:.3f} ± {q_err:.3f}")
-    print(f"[BACKWARD] I_on = {I_on:.2e}, I_off = {I_off:.2e}, Von = {Von:.2f} V")
+    show()
+
+summary = {}
+sweeps = (('forward', 'FORWARD', 'Forward Sweep', 'blue', -11.5),
+          ('backward', 'BACKWARD', 'Backward Sweep', 'red', -8.2))
+for i, (key, tag, title, color, y_min) in enumerate(sweeps):
+    if params['n_points'][i] < 3:
+        print(f"[{tag}] Not enough points in the fit window")
+        continue
+    S, S_err = params['S'][i], params['S_err'][i]
+    m, m_err = params['slope'][i], params['slope_err'][i]
+    q, q_err = params['intercept'][i], params['intercept_err'][i]
+    I_on, I_off, Von = params['I_on'][i], params['I_off'][i], params['V_on'][i]
+    window = (params['window_lo'][i], params['window_hi'][i])
+
+    if plots_enabled():
+        n = np.count_nonzero(np.isfinite(V_sweeps[i]))
+        plt.figure(figsize=(7, 5))
+        plt.plot(V_sweeps[i, :n], log_ID[i, :n], '.-', color=color, label=title)
+        plt.plot(V_ext, linear_model(V_ext, m, q), '--', linewidth=2, color='green',
+                 label=fr'Fit ($S$ = {S*1000:.0f} ± {S_err*1000:.0f} mV/dec)')
+        plt.axvline(x=Von, color='purple', linestyle='--', label=fr'$V_{{on}}$ = {Von:.2f} V')
+        plt.axhline(y=np.log10(I_on), color='orange', linestyle='--', label=fr'$I_{{on}}$ = {I_on:.1e} A')
+        plt.axhline(y=np.log10(I_off), color='gray', linestyle='--', label=fr'$I_{{off}}$ = {I_off:.1e} A')
+        plt.xlabel(r'$V_{SG}$ (V)')
+        plt.ylabel(r'$\log_{10}(I_D)$ (A)')
+        plt.title(title)
+        plt.grid(True)
+        plt.legend(loc='lower right')
+        plt.xlim([-10, 10])
+        plt.ylim([y_min, -2])
+        plt.tight_layout()
+        show()
+
+    print(f"[{tag}] Fit window: {window[0]:.2f} V to {window[1]:.2f} V")
+    print(f"[{tag}] S = {S*1000:.1f} ± {S_err*1000:.1f} mV/dec")
+    print(f"[{tag}] Slope = {m:.3e} ± {m_err:.1e}, Intercept = {q:.3f} ± {q_err:.3f}")
+    print(f"[{tag}] I_on = {I_on:.2e}, I_off = {I_off:.2e}, on/off = {params['on_off'][i]:.1e}, Von = {Von:.2f} V")
+    summary[key] = {'S_V_per_dec': S, 'S_err': S_err, 'slope': m, 'slope_err': m_err,
+                    'intercept': q, 'intercept_err': q_err,
+                    'I_on_A': I_on, 'I_off_A': I_off, 'on_off': params['on_off'][i],
+                    'V_on_V': Von, 'window_V': window}
+
+write_summary(summary)
@@ -0,0 +1,54 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nanolab.fits import linear_model
+from nanolab.plotting import plots_enabled, pyplot, show, write_summary
+from nanolab.transfer import batch_fit_saturation_regime, load_transfer, split_sweep, sqrt_current, stack_curves
+
+# ---- LOAD DATA (regime di saturazione, V_SD = 5 V) ----
+V_SG, I_D = load_transfer("scan_transfer_5_25953812.dat")
+
+# ---- PARAMETRI FISICI ----
+L = 15 * 500e-6
+W = 9.5 * 500e-6
+C = 54e-9
+
+# ---- FIT WINDOW ('auto' = tratto rettilineo più ripido di sqrt(I_D)) ----
+FIT_WINDOW = (3, 9)
+
+# ---- SPLIT FORWARD / BACKWARD ----
+branches = split_sweep(V_SG, I_D)
+V_sweeps = stack_curves([V for V, _ in branches])
+I_sweeps = stack_curves([I for _, I in branches])
+
+# ---- FIT sqrt(I_D) vs V_SG, entrambi gli sweep insieme ----
+fit = batch_fit_saturation_regime(V_sweeps, I_sweeps, FIT_WINDOW, L, W, C)
+
+summary = {}
+for i, sweep in enumerate(('forward', 'backward')):
+    print(f"[{sweep.upper()}] mu_sat = {fit['mu'][i]:.3e} ± {fit['mu_err'][i]:.1e} cm^2/Vs, "
+          f"V_t = {fit['Vt'][i]:.3f} ± {fit['Vt_err'][i]:.3f} V "
+          f"(window {fit['window_lo'][i]:.2f} to {fit['window_hi'][i]:.2f} V)")
+    summary[sweep] = {'mu_sat_cm2_Vs': fit['mu'][i], 'dmu_sat': fit['mu_err'][i],
+                      'Vt_V': fit['Vt'][i], 'dVt': fit['Vt_err'][i],
+                      'window_V': (fit['window_lo'][i], fit['window_hi'][i])}
+write_summary(summary)
+
+if plots_enabled():
+    plt = pyplot()
+    plt.figure(figsize=(7, 5))
+    for i, (sweep, color) in enumerate((('Forward', 'blue'), ('Backward', 'red'))):
+        V, I = branches[i]
+        V_line = np.linspace(fit['Vt'][i], np.max(V), 100)
+        plt.plot(V, sqrt_current(I), '.', color=color, label=sweep)
+        plt.plot(V_line, linear_model(V_line, fit['m'][i], fit['q'][i]), '--', color=color,
+                 label=fr"Fit: $\mu_{{sat}}$ = {fit['mu'][i]:.2e} cm$^2$/Vs, $V_t$ = {fit['Vt'][i]:.2f} V")
+    plt.xlabel(r'$V_{SG}$ (V)')
+    plt.ylabel(r'$\sqrt{I_D}$ (A$^{1/2}$)')
+    plt.title(r'$\sqrt{I_D}$ vs $V_{SG}$')
+    plt.grid(True)
+    plt.legend(loc='upper left')
+    plt.tight_layout()
+    show()
@@ -1,16 +1,10 @@
+import os
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.ticker import ScalarFormatter
-
-# Set global font styles for readability
-plt.rcParams.update({
-    'font.size': 18,
-    'axes.labelsize': 20,
-    'axes.titlesize': 22,
-    'legend.fontsize': 18,
-    'xtick.labelsize': 16,
-    'ytick.labelsize': 16
-})
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nanolab.plotting import plots_enabled, pyplot, show, write_summary
+from nanolab.uncertainty import resample
 
 # === Known constants ===
 Rt = 100 + 100           # R2 + R4 [Ohm]
@@ -54,28 +48,63 @@ dkb_dVrms = (2 * Vrms) / (4 * T * Req * fb)
 dkb_dReq = -Vrms**2 / (4 * T * Req**2 * fb)
 delta_kb = np.sqrt((dkb_dVrms * delta_Vrms_corr)**2 + (dkb_dReq * delta_Req)**2)
 
+# === Monte-Carlo check of the propagated errors ===
+N_RESAMPLES = 0  # opt-in: e.g. 10000 to compare with the linearized errors
+
+
+def kb_from(Ri, Vrms):
+    Req = ((Ri + Rt) * Rbias) / (Ri + Rt + Rbias)
+    return Vrms**2 / (4 * T * Req * fb)
+
+
+if N_RESAMPLES:
+    mc = resample(kb_from, (Ri, Vrms), N_RESAMPLES, 'montecarlo', sigma=(delta_R, delta_Vrms_corr), seed=0)
+    delta_kb_mc = mc['std']
+    print("\nk_B uncertainties, linearized vs Monte Carlo:\n")
+    for i in range(len(kb_values)):
+        print(f"k_B[{i}] = {kb_values[i]:.3e} ± {delta_kb[i]:.2e} (MC ± {delta_kb_mc[i]:.2e}) J/K")
+else:
+    delta_kb_mc = None
+
 # === Plot with error bars ===
-plt.figure(figsize=(10, 6))
-plt.errorbar(Req, kb_values, xerr=delta_Req, yerr=delta_kb,
-             fmt='o', color='blue', ecolor='black', capsize=5,
-             label='Estimated $k_B$')
-plt.axhline(1.380649e-23, color='red', linestyle='--', label='Theoretical $k_B$')
+if plots_enabled():
+    plt = pyplot()
+    from matplotlib.ticker import ScalarFormatter
+
+    # Set global font styles for readability
+    plt.rcParams.update({
+        'font.size': 18,
+        'axes.labelsize': 20,
+        'axes.titlesize': 22,
+        'legend.fontsize': 18,
+        'xtick.labelsize': 16,
+        'ytick.labelsize': 16
+    })
 
-plt.xlabel(r'Equivalent Resistance $R_{\mathrm{eq}}$ (Ohm)')
-plt.ylabel(r'Estimated $k_B$ (J/K)')
-plt.title(r'Estimation of Boltzmann Constant')
-plt.grid(True, which='both', linestyle='--', linewidth=0.6)
-plt.legend()
+    plt.figure(figsize=(10, 6))
+    plt.errorbar(Req, kb_values, xerr=delta_Req, yerr=delta_kb,
+                 fmt='o', color='blue', ecolor='black', capsize=5,
+                 label='Estimated $k_B$')
+    plt.axhline(1.380649e-23, color='red', linestyle='--', label='Theoretical $k_B$')
 
-# Scientific formatting for x-axis
-plt.gca().xaxis.set_major_formatter(ScalarFormatter(useMathText=True))
-plt.ticklabel_format(axis='x', style='sci', scilimits=(3, 3))
+    plt.xlabel(r'Equivalent Resistance $R_{\mathrm{eq}}$ (Ohm)')
+    plt.ylabel(r'Estimated $k_B$ (J/K)')
+    plt.title(r'Estimation of Boltzmann Constant')
+    plt.grid(True, which='both', linestyle='--', linewidth=0.6)
+    plt.legend()
 
-plt.tight_layout()
-plt.show()
+    # Scientific formatting for x-axis
+    plt.gca().xaxis.set_major_formatter(ScalarFormatter(useMathText=True))
+    plt.ticklabel_format(axis='x', style='sci', scilimits=(3, 3))
+
+    plt.tight_layout()
+    show()
 
 # === Print Req and Vrms (corrected) with uncertainties ===
 print("\nReq and Vrms values (corrected) with uncertainties:\n")
 for i in range(len(Req)):
     print(f"Req[{i}] = {Req[i]:.2f} ± {delta_Req[i]:.2f} Ohm\t"
-          f"Vrms[{i}] = {Vrms[i]:.6f} ± {delta_Vrms_corr[i]:.6f} V")
\ No newline at end of file
+          f"Vrms[{i}] = {Vrms[i]:.6f} ± {delta_Vrms_corr[i]:.6f} V")
+
+write_summary({'Req_ohm': Req, 'delta_Req_ohm': delta_Req, 'Vrms_V': Vrms, 'delta_Vrms_V': delta_Vrms_corr,
+               'k_B': kb_values, 'delta_k_B': delta_kb, 'delta_k_B_mc': delta_kb_mc})
\ No newline at end of file
@@ -1,12 +1,22 @@
+import os
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
-import re
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nanolab.noise import equivalent_resistance, file_spectrum, resistance_from_name, run_batch
+from nanolab.plotting import plots_enabled, pyplot, show
 
 # === Physical and instrumental constants ===
 G0 = 964      # Measured gain
 Rt = 200.0    # Ohms (R2 + R4)
 Rbias = 200000.0  # Ohms (R3 + R5)
 
+# === Welch PSD settings ===
+NPERSEG = 4096   # Samples per segment
+NOVERLAP = 2048  # Overlap between segments
+WINDOW = 'hann'
+WORKERS = None   # Processes for the per-file analysis (None = one per CPU, 1 = serial)
+
 # === Data files ===
 fs = [
     "FFT_220.9kohm_noise_filter.txt",
@@ -17,60 +27,40 @@ fs = [
     "FFT_0.998kohm_noise_filter.txt"
 ]
 
-# === Extract resistances from file names ===
-r_kohms = []
-for f_name in fs:
-    match = re.search(r'(\d+\.?\d*)kohm', f_name)
-    if match:
-        r_kohms.append(float(match.group(1)))
-r_ohms = np.array(r_kohms) * 1e3
-r_eq_ohms = ((r_ohms + Rt) * Rbias) / (r_ohms + Rt + Rbias)
-print(f"Equivalent Resistances (Ohm): {r_eq_ohms}")
-
-def compute_power_spectrum(v_sig, dt):
-    n_pts = len(v_sig)
-    fft_v = np.fft.rfft(v_sig)
-    psd = (2.0 / (n_pts * (1 / dt))) * np.abs(fft_v)**2
-    psd[0] /= 2  # DC component
-    if n_pts % 2 == 0:
-        psd[-1] /= 2  # Nyquist frequency component
-    return psd
-
-fig_psd = plt.figure(figsize=(20, 10))
-r_psd, c_psd = 2, 3
-
-for idx, f_path in enumerate(fs):
-    r_k = r_kohms[idx]
-
-    with open(f_path, 'r') as f:
-        lines = f.readlines()[2:]
+def main():
+    # === Extract resistances from file names ===
+    r_ohms = np.array([resistance_from_name(f_name) for f_name in fs])
+    r_kohms = r_ohms / 1e3
+    r_eq_ohms = equivalent_resistance(r_ohms, Rt, Rbias)
+    print(f"Equivalent Resistances (Ohm): {r_eq_ohms}")
 
-    t = []
-    v = []
+    # === Spectra of all files, computed in parallel ===
+    if not plots_enabled():
+        return
+    spectra = run_batch(file_spectrum, fs, workers=WORKERS, G0=G0,
+                        nperseg=NPERSEG, noverlap=NOVERLAP, window=WINDOW)
 
-    for line in lines:
-        values = line.strip().split()
-        t.append(float(values[0]))
-        v.append(float(values[1]))
+    plt = pyplot()
+    fig_psd = plt.figure(figsize=(20, 10))
+    r_psd, c_psd = 2, 3
 
-    t = np.array(t) - float(t[0])
-    v = np.array(v) / G0
+    for idx, (freqs, psd) in enumerate(spectra):
+        r_k = r_kohms[idx]
 
-    dt = t[1] - t[0]
-    psd = compute_power_spectrum(v, dt)
-    freqs = np.fft.rfftfreq(len(v), dt)
+        mask = (freqs >= 1000) & (freqs <= 9000)
+        freqs_m = freqs[mask]
+        psd_m = psd[mask]
 
-    mask = (freqs >= 1000) & (freqs <= 9000)
-    freqs_m = freqs[mask]
-    psd_m = psd[mask]
+        plt.figure(fig_psd.number)
+        plt.subplot(r_psd, c_psd, idx + 1)
+        plt.plot(freqs_m, psd_m)
+        plt.xlabel("Frequency (Hz)")
+        plt.ylabel("Power Density (V$^2$/Hz)")
+        plt.title(f"Noise Power Spectrum - {r_k} kOhm")
+        plt.grid()
 
-    plt.figure(fig_psd.number)
-    plt.subplot(r_psd, c_psd, idx + 1)
-    plt.plot(freqs_m, psd_m)
-    plt.xlabel("Frequency (Hz)")
-    plt.ylabel("Power Density (V$^2$/Hz)")
-    plt.title(f"Noise Power Spectrum - {r_k} kOhm")
-    plt.grid()
+    plt.tight_layout() # Adjust subplots to prevent overlapping
+    show()
 
-plt.tight_layout() # Adjust subplots to prevent overlapping
-plt.show()
+if __name__ == "__main__":
+    main()
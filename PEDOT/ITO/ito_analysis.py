@@ -1,58 +1,64 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+import os
+import sys
 import numpy as np
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from nanolab.eis import CIRCUITS, circuit_impedance, fit_spectra, load_spectrum
+from nanolab.plotting import plots_enabled, pyplot, show, write_summary
 
-plt.rcParams.update({'font.size': 20})
+# Point files of the spectrum (|Z| and -phase vs frequency)
+z_path = 'z-freq_ITO_points.txt'
+phase_path = 'phase-freq_ITO_points.txt'
 
+# Equivalent circuit fitted to the points (see nanolab.eis.CIRCUITS)
+circuit = 'simplified_rc'
 
-# Load the data from the files
-file_paths = {
-    'phase_points': 'phase-freq_ITO_points.txt',
-    'phase_fit': 'phase-freq_ITO_fit.txt',
-    'z_points': 'z-freq_ITO_points.txt',
-    'z_fit': 'z-freq_ITO_fit.txt'
-}
+freq, Z = load_spectrum(z_path, phase_path)
+fit = fit_spectra(freq, Z, circuit)
+params = np.stack([fit[name] for name in CIRCUITS[circuit]], axis=-1)
 
-data = {}
-for key, path in file_paths.items():
-    # Read the data, handling comma as decimal separator and semicolon as delimiter
-    data[key] = pd.read_csv(path, sep=';', decimal=',')
+for name in CIRCUITS[circuit]:
+    print(f"{name} = {fit[name][0]:.4e} ± {fit[name + '_err'][0]:.2e}")
+print(f"reduced chi2 = {fit['chi2_red'][0]:.3e}")
 
 # Define column names based on the file content (exact names from inspection)
 phase_col = '-Phase (°)'
 z_col = 'Z (Ω)'
 freq_col = 'Frequency (Hz)'
 
+if plots_enabled():
+    plt = pyplot()
+    plt.rcParams.update({'font.size': 20})
 
-# Create the plots
-fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 12))
-
-# Plot Phase vs. Frequency
-ax1.scatter(data['phase_points'][freq_col], data['phase_points'][phase_col],
-            label='Points', color='blue', marker='o', s=10)
-ax1.plot(data['phase_fit'][freq_col], data['phase_fit'][phase_col],
-         label='Fit', color='red', linestyle='--')
-
-ax1.set_xscale('log')
-ax1.set_xlabel(freq_col)
-ax1.set_ylabel(phase_col)
-ax1.set_title('Phase vs. Frequency')
-ax1.legend()
-ax1.grid(True, which="both", ls="-")
-
-# Plot Z vs. Frequency
-ax2.scatter(data['z_points'][freq_col], data['z_points'][z_col],
-            label='Points', color='green', marker='x', s=10)
-ax2.plot(data['z_fit'][freq_col], data['z_fit'][z_col],
-         label='Fit', color='purple', linestyle='-.')
-
-ax2.set_xscale('log')
-ax2.set_xlabel(freq_col)
-ax2.set_ylabel(z_col)
-ax2.set_title('Impedance vs. Frequency')
-ax2.legend()
-ax2.grid(True, which="both", ls="-")
-
-plt.tight_layout()
-plt.show()
+    f_fit = np.geomspace(freq.min(), freq.max(), 400)
+    Z_fit = circuit_impedance(circuit, f_fit, params)[0]
+
+    # Create the plots
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 12))
+
+    # Plot Phase vs. Frequency
+    ax1.scatter(freq, -np.angle(Z, deg=True), label='Points', color='blue', marker='o', s=10)
+    ax1.plot(f_fit, -np.angle(Z_fit, deg=True), label='Fit', color='red', linestyle='--')
+
+    ax1.set_xscale('log')
+    ax1.set_xlabel(freq_col)
+    ax1.set_ylabel(phase_col)
+    ax1.set_title('Phase vs. Frequency')
+    ax1.legend()
+    ax1.grid(True, which="both", ls="-")
+
+    # Plot Z vs. Frequency
+    ax2.scatter(freq, np.abs(Z), label='Points', color='green', marker='x', s=10)
+    ax2.plot(f_fit, np.abs(Z_fit), label='Fit', color='purple', linestyle='-.')
+
+    ax2.set_xscale('log')
+    ax2.set_xlabel(freq_col)
+    ax2.set_ylabel(z_col)
+    ax2.set_title('Impedance vs. Frequency')
+    ax2.legend()
+    ax2.grid(True, which="both", ls="-")
+
+    plt.tight_layout()
+    show()
+
+write_summary({'circuit': circuit, **{key: value[0] for key, value in fit.items()}})
@@ -1,42 +1,50 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+import os
+import sys
 import numpy as np
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nanolab.cv import analyze_cycles, cycle_slice, group_cycles, index_cycles, load_cv
+from nanolab.plotting import plots_enabled, pyplot, show, write_table
 
-plt.rcParams.update({'font.size': 20})
-
-# Load the ITO_cyclicVoltammetry.txt file
-# Assuming semicolon as delimiter and comma as decimal separator
-try:
-    df_cv = pd.read_csv('ITO_cyclicVoltammetry.txt', sep=';', decimal=',')
-except Exception as e:
-    print(f"Error reading file: {e}")
-    # Fallback if the first attempt fails (e.g., different delimiter/decimal)
-    # This might not be necessary if the first attempt consistently works
-    df_cv = pd.read_csv('ITO_cyclicVoltammetry.txt', sep=',', decimal='.')
+# Load the ITO_cyclicVoltammetry.txt file (delimiter and decimal mark are sniffed)
+df_cv = load_cv('ITO_cyclicVoltammetry.txt')
 
 # Identify the columns
 potential_col = 'Potential applied (V)'
 current_col = 'WE(1).Current (A)'
 scan_col = 'Scan'
-
-# Get unique scan numbers (cycles)
-unique_scans = df_cv[scan_col].unique()
-
-# Create the plot for cyclic voltammetry
-plt.figure(figsize=(10, 6))
-
-# Define a colormap to get different colors for each cycle
-colors = plt.cm.jet(np.linspace(0, 1, len(unique_scans)))
-
-# Plot each cycle with a different color
-for i, scan in enumerate(unique_scans):
-    cycle_data = df_cv[df_cv[scan_col] == scan]
-    plt.plot(cycle_data[potential_col], cycle_data[current_col], color=colors[i], label=f'Cycle {scan}')
-
-plt.xlabel(potential_col)
-plt.ylabel("Current (A)")
-plt.title('Cyclic Voltammetry of ITO')
-plt.legend(title='Scan Number')
-plt.grid(True)
-plt.show()
+time_col = 'Time (s)'
+
+# Index the cycles once: each cycle is then a slice of the data
+index = index_cycles(df_cv[scan_col])
+potential, current = group_cycles(index, df_cv[potential_col], df_cv[current_col])
+
+# Per-cycle peaks, peak separation and charge
+cycles = analyze_cycles(df_cv[potential_col], df_cv[current_col], df_cv[scan_col], df_cv.get(time_col))
+print(f"{'scan':>6s} {'E_pa (V)':>10s} {'I_pa (A)':>11s} {'E_pc (V)':>10s} {'I_pc (A)':>11s} {'dE_p (V)':>10s}")
+for i, scan in enumerate(cycles['scan']):
+    print(f"{scan:6g} {cycles['E_pa'][i]:10.4f} {cycles['I_pa'][i]:11.4e} "
+          f"{cycles['E_pc'][i]:10.4f} {cycles['I_pc'][i]:11.4e} {cycles['dE_p'][i]:10.4f}")
+write_table(cycles)
+
+if plots_enabled():
+    plt = pyplot()
+    plt.rcParams.update({'font.size': 20})
+
+    # Create the plot for cyclic voltammetry
+    plt.figure(figsize=(10, 6))
+
+    # Define a colormap to get different colors for each cycle
+    colors = plt.cm.jet(np.linspace(0, 1, len(index.scans)))
+
+    # Plot each cycle with a different color
+    for i, scan in enumerate(index.scans):
+        rows = cycle_slice(index, i)
+        plt.plot(potential[rows], current[rows], color=colors[i], label=f'Cycle {scan:g}')
+
+    plt.xlabel(potential_col)
+    plt.ylabel("Current (A)")
+    plt.title('Cyclic Voltammetry of ITO')
+    plt.legend(title='Scan Number')
+    plt.grid(True)
+    show()
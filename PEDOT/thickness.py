@@ -1,21 +1,14 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
+import os
+import sys
 
-plt.rcParams.update({'font.size': 20})
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nanolab.cv import (CHARGE_CHUNK, current_col, deposition_profile, film_thickness_nm, load_cv, monomer_units,
+                        scan_col, time_col, total_charge)
+from nanolab.plotting import write_summary, write_table
 
-# Load the ITO_cyclicVoltammetry.txt file
-try:
-    df_cv = pd.read_csv('ITO_cyclicVoltammetry.txt', sep=';', decimal=',')
-except Exception as e:
-    print(f"Error reading file: {e}")
-    df_cv = pd.read_csv('ITO_cyclicVoltammetry.txt', sep=',', decimal='.')
-
-# Identify columns
-potential_col = 'Potential applied (V)'
-current_col = 'WE(1).Current (A)'
-scan_col = 'Scan'
-time_col = 'Time (s)'
+# Load the ITO_cyclicVoltammetry.txt file; the parsed columns are kept in a sidecar
+# (.nlcsv) that later runs memory-map, so the integrals below stream from disk
+df_cv = load_cv('ITO_cyclicVoltammetry.txt', cache=True)
 
 # --- Calculate PEDOT:PSS film thickness ---
 print("\nCalculating PEDOT:PSS film thickness")
@@ -23,25 +16,31 @@ print("\nCalculating PEDOT:PSS film thickness")
 # Provided parameters
 M = 142.19  # g/mol (molar mass of EDOT)
 rho = 1.3   # g/cm^3 (density of PEDOT:PSS)
-N_A = 6.022e23 # mol^-1 (Avogadro's number)
-e = 1.602e-19  # C (elementary charge)
 A = 1       # cm^2 (exposed electrode area)
 
-# Calculate total charge Q by integrating current over time
-current_data = df_cv[current_col].values
-time_data = df_cv[time_col].values
+# Calculate total charge Q by integrating current over time, block by block
+current_data = df_cv[current_col]
+time_data = df_cv[time_col]
 
-Q = np.trapz(current_data, time_data)
+Q = total_charge(current_data, time_data, chunk=CHARGE_CHUNK)
 print(f"Total charge transferred (Q): {Q:.4e} C")
 
+# Charge and thickness deposited in each cycle (oxidative and reductive charge separated)
+cycles = deposition_profile(current_data, time_data, df_cv[scan_col], M, rho, A)
+print(f"{'scan':>6s} {'Q_ox (C)':>11s} {'Q_red (C)':>11s} {'Q_net (C)':>11s} {'l (nm)':>8s} {'l_cum (nm)':>10s}")
+for i, scan in enumerate(cycles['scan']):
+    print(f"{scan:6g} {cycles['Q_ox'][i]:11.4e} {cycles['Q_red'][i]:11.4e} {cycles['Q_net'][i]:11.4e} "
+          f"{cycles['thickness_nm'][i]:8.2f} {cycles['thickness_cum_nm'][i]:10.2f}")
+write_table(cycles)
+
 # Calculate number of deposited monomer units (Nm)
-N_m = Q / e
+N_m = monomer_units(Q)
 print(f"Number of deposited monomer units (Nm): {N_m:.4e}")
 
-# Calculate film thickness (l)
-l = (M * N_m) / (rho * N_A * A)
-
-# Convert thickness from cm to nanometers
-l_nm = l * 1e7
+# Calculate film thickness (l) in nanometers
+l_nm = film_thickness_nm(Q, M, rho, A)
 
 print(f"Estimated film thickness (l): {l_nm:.2f} nm")
+
+write_summary({'Q_C': Q, 'Q_ox_C': cycles['Q_ox'].sum(), 'Q_red_C': cycles['Q_red'].sum(),
+               'N_m': N_m, 'thickness_nm': l_nm})
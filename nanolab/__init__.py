@@ -0,0 +1,65 @@
+"""Shared numerical routines for the NanoLab analysis scripts.
+
+Submodules are imported on first attribute access, so ``import nanolab``
+costs nothing beyond the interpreter itself; matplotlib, scipy and pandas are
+in turn only imported inside the functions that need them.
+
+    >>> import nanolab
+    >>> nanolab.analyze_kb('NOISE/')['k_B']
+"""
+import importlib
+
+_SUBMODULES = {'traces', 'psd', 'fits', 'sweeps', 'noise', 'transfer', 'output', 'exports',
+               'impedance', 'eis', 'mott_schottky', 'cv', 'afm', 'uncertainty', 'plotting', 'cli'}
+
+_EXPORTS = {
+    'traces': ('load_trace', 'open_trace', 'stream_trace', 'build_cache'),
+    'psd': ('compute_power_spectrum', 'welch_psd', 'welch_psd_stream', 'band_average'),
+    'fits': ('line_regression', 'linear_fit', 'proportional_fit', 'weighted_linear_fit',
+             'batch_linear_fit', 'sliding_linear_fit'),
+    'sweeps': ('turning_points', 'sweep_segments', 'iter_branches'),
+    'noise': ('resistance_from_name', 'equivalent_resistance', 'file_spectrum', 'file_vn2',
+              'run_batch', 'batch_vn2', 'fit_boltzmann', 'analyze_kb'),
+    'transfer': ('load_transfer', 'iter_sweeps', 'split_sweep', 'threshold_voltage', 'linear_mobility',
+                 'fit_linear_regime', 'analyze_transfer_file', 'stack_curves',
+                 'batch_fit_linear_regime', 'analyze_transfer_batch', 'find_linear_window',
+                 'find_subthreshold_window', 'clip_current', 'log_current',
+                 'subthreshold_parameters', 'hysteresis_loop', 'analyze_hysteresis_batch',
+                 'sqrt_current', 'saturation_mobility', 'fit_saturation_regime',
+                 'batch_fit_saturation_regime'),
+    'output': ('load_output', 'load_output_family', 'first_quadrant', 'output_parameters',
+               'analyze_output_family'),
+    'impedance': ('frequency_from_name', 'read_columns', 'impedance_from_gain',
+                  'capacitance_from_impedance', 'convert_input', 'convert_batch', 'save_converted',
+                  'load_converted'),
+    'eis': ('load_spectrum', 'circuit_impedance', 'initial_guess', 'fit_spectra', 'load_spectra',
+            'analyze_spectra'),
+    'mott_schottky': ('extract_Nd_cm3', 'extract_flatband', 'analyze_cv_file', 'file_frequency', 'load_frequency_series', 'find_depletion_window', 'fit_mott_schottky',
+                      'analyze_frequency_series', 'depletion_width', 'local_slope', 'doping_profile',
+                      'analyze_doping_profiles'),
+    'exports': ('sniff_dialect', 'read_export'),
+    'cv': ('load_cv', 'iter_cycles', 'index_cycles', 'cycle_slice', 'group_cycles', 'analyze_cycles', 'analyze_cv',
+           'iter_potential_sweeps', 'total_charge', 'cumulative_charge', 'deposition_charge',
+           'deposition_profile', 'film_thickness_nm'),
+    'afm': ('load_curve', 'load_curves', 'analyze_curves', 'to_map', 'analyze_map'),
+    'uncertainty': ('resample', 'transfer_statistic', 'boltzmann_statistic', 'mott_schottky_statistic',
+                    'thickness_statistic'),
+}
+_ATTR_TO_MODULE = {name: mod for mod, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_ATTR_TO_MODULE)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    mod = _ATTR_TO_MODULE.get(name)
+    if mod is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'{__name__}.{mod}'), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | _SUBMODULES)
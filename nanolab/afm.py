@@ -0,0 +1,223 @@
+"""Batch analysis of AFM amplitude-distance spectroscopy curves (force volume).
+
+Each curve is an approach (Height decreasing) followed by a retract; only the
+first approach/retract pair is analyzed.  A set of curves -- one text export
+per pixel, or one stacked array file -- is held as NaN-padded (N, n_max)
+Height/Amplitude arrays; :func:`analyze_curves` walks both branches of every
+curve from the far end towards the surface in single NumPy calls and finds,
+per curve:
+
+    free amplitude     median amplitude of the first FREE_FRACTION of the approach
+    contact point      height where the amplitude first drops CONTACT_SIGMA noise
+                       standard deviations (at least CONTACT_DROP of the free
+                       amplitude) below the free amplitude
+    set-point crossing height where the amplitude reaches SETPOINT times the free
+                       amplitude
+
+Crossing heights are interpolated linearly between the two points around
+them; the approach/retract offsets are retract minus approach.
+:func:`to_map` lays any per-curve result out as the 2-D map of the scan.
+"""
+import glob
+import os
+
+import numpy as np
+
+from nanolab.transfer import stack_curves
+
+CURVE_GLOB = '*h-Amp*.txt'
+# Header lines of the spectroscopy export; columns are index, Height, Amplitude
+SKIPROWS = 8
+
+FREE_FRACTION = 0.1
+FREE_MIN_POINTS = 3
+CONTACT_SIGMA = 3.0
+CONTACT_DROP = 0.01
+SETPOINT = 0.9
+# Height steps up to this size keep the sweep direction (noisy piezo readout)
+HEIGHT_TOL = 0.0
+
+RESULT_KEYS = ('free_amplitude', 'noise', 'turn_height',
+               'contact_approach', 'contact_retract', 'contact_offset',
+               'setpoint_approach', 'setpoint_retract', 'setpoint_offset')
+
+
+def curve_files(directory, pattern=CURVE_GLOB):
+    """Sorted spectroscopy exports in ``directory``."""
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+
+def load_curve(path, skiprows=SKIPROWS):
+    """``(height, amplitude)`` of one spectroscopy export, rows with NaN dropped."""
+    data = np.loadtxt(path, skiprows=skiprows, usecols=(1, 2), dtype=np.float64, ndmin=2)
+    data = data[np.isfinite(data).all(axis=1)]
+    return data[:, 0], data[:, 1]
+
+
+def load_curves(source, skiprows=SKIPROWS):
+    """Height and amplitude of many curves as NaN-padded (N, n_max) arrays.
+
+    ``source`` is a list of exports, a directory (searched for
+    :data:`CURVE_GLOB`) or a stacked array file: a ``.npz`` with 'height'
+    and 'amplitude' arrays of shape (..., n), or a ``.npy`` of shape
+    (..., 2, n).  Returns ``(names, height, amplitude, shape)`` where
+    ``shape`` is the leading shape of a stacked file (the map, e.g.
+    (rows, cols)) and ``(N,)`` for a list of exports; unreadable exports
+    are reported and skipped.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        source = os.fspath(source)
+        if os.path.isdir(source):
+            source = curve_files(source)
+        elif source.endswith('.npz'):
+            with np.load(source) as data:
+                height, amplitude = data['height'], data['amplitude']
+            return _stacked(source, height, amplitude)
+        elif source.endswith('.npy'):
+            data = np.load(source)
+            if data.ndim < 2 or data.shape[-2] != 2:
+                raise ValueError(f"{source}: expected an array of shape (..., 2, n), got {data.shape}")
+            return _stacked(source, data[..., 0, :], data[..., 1, :])
+        else:
+            source = [source]
+    names, heights, amplitudes = [], [], []
+    for path in source:
+        try:
+            h, a = load_curve(path, skiprows)
+        except (OSError, ValueError) as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        names.append(os.fspath(path))
+        heights.append(h)
+        amplitudes.append(a)
+    return names, stack_curves(heights), stack_curves(amplitudes), (len(names),)
+
+
+def _stacked(path, height, amplitude):
+    if height.shape != amplitude.shape:
+        raise ValueError(f"{path}: height {height.shape} and amplitude {amplitude.shape} differ")
+    shape = height.shape[:-1]
+    n = int(np.prod(shape))
+    names = [f"{path}[{i}]" for i in range(n)]
+    return (names, np.asarray(height, dtype=np.float64).reshape(n, -1),
+            np.asarray(amplitude, dtype=np.float64).reshape(n, -1), shape)
+
+
+def _branches(height, amplitude, tol=HEIGHT_TOL):
+    """First approach and retract of every curve, each ordered from the far end to the turn.
+
+    The approach runs from the first point to the first rising step of
+    Height (steps within ``tol`` do not count), the retract from there to
+    the next falling step.  Returns ``(turn, approach, retract)`` where each
+    branch is ``(h, a, valid)`` of shape (N, n_max) and ``turn`` is the
+    column of the turning point.
+    """
+    n_curves, n_max = height.shape
+    finite = np.isfinite(height) & np.isfinite(amplitude)
+    last = np.where(finite.any(axis=1), n_max - 1 - np.argmax(finite[:, ::-1], axis=1), 0)
+    turn, end = last.copy(), last.copy()
+    if n_max > 1:
+        step_h = np.diff(height, axis=1)  # NaN (never a step) in the padding
+        rising = step_h > tol
+        turn = np.where(rising.any(axis=1), np.argmax(rising, axis=1), last)
+        falling = (step_h < -tol) & (np.arange(n_max - 1)[None, :] >= turn[:, None])
+        end = np.where(falling.any(axis=1), np.argmax(falling, axis=1), last)
+    rows = np.arange(n_curves)[:, None]
+    step = np.arange(n_max)[None, :]
+
+    branches = []
+    for idx, valid in ((np.broadcast_to(step, height.shape), step <= turn[:, None]),
+                       (end[:, None] - step, end[:, None] - step >= turn[:, None])):
+        idx = np.clip(idx, 0, n_max - 1)
+        branches.append((height[rows, idx], amplitude[rows, idx], valid & finite[rows, idx]))
+    return turn, branches[0], branches[1]
+
+
+def _first_crossing(h, a, valid, level):
+    """Height where ``a`` first falls to ``level`` along each branch (NaN if never)."""
+    below = valid & (a <= level[:, None])
+    i = np.argmax(below, axis=1)
+    found = below.any(axis=1)
+    rows = np.arange(h.shape[0])
+    prev = np.maximum(i - 1, 0)
+    h0, h1, a0, a1 = h[rows, prev], h[rows, i], a[rows, prev], a[rows, i]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        frac = np.where(a1 != a0, (level - a0) / (a1 - a0), 1.0)
+    crossing = np.where(i > 0, h0 + np.clip(frac, 0, 1) * (h1 - h0), h1)
+    return np.where(found, crossing, np.nan)
+
+
+def analyze_curves(height, amplitude, setpoint=SETPOINT, contact_sigma=CONTACT_SIGMA,
+                   contact_drop=CONTACT_DROP, free_fraction=FREE_FRACTION, tol=HEIGHT_TOL):
+    """Contact point, set-point crossing and approach/retract offsets of every curve.
+
+    ``height`` and ``amplitude`` are (N, n_max) arrays (NaN padded) or one
+    curve.  Returns a dict of (N,) arrays with the keys of
+    :data:`RESULT_KEYS` (heights in the units of ``height``).
+    """
+    height = np.atleast_2d(np.asarray(height, dtype=np.float64))
+    amplitude = np.atleast_2d(np.asarray(amplitude, dtype=np.float64))
+    turn, approach, retract = _branches(height, amplitude, tol)
+    h_app, a_app, valid_app = approach
+
+    # Free amplitude and its noise from the far end of the approach
+    n_free = np.maximum(np.ceil(free_fraction * valid_app.sum(axis=1)), FREE_MIN_POINTS)
+    free = valid_app & (np.cumsum(valid_app, axis=1) <= n_free[:, None])
+    a_free = np.where(free, a_app, np.nan)
+    with np.errstate(invalid='ignore'):
+        empty = ~free.any(axis=1)
+        a_free[empty] = 0.0  # all-NaN rows would warn; their results are NaN below
+        free_amplitude = np.where(empty, np.nan, np.nanmedian(a_free, axis=1))
+        noise = np.where(empty, np.nan, np.nanstd(a_free, axis=1))
+
+    contact_level = free_amplitude - np.maximum(contact_sigma * noise, contact_drop * np.abs(free_amplitude))
+    setpoint_level = setpoint * free_amplitude
+    out = {'free_amplitude': free_amplitude, 'noise': noise,
+           'turn_height': np.where(empty, np.nan, height[np.arange(height.shape[0]), turn])}
+    for name, level in (('contact', contact_level), ('setpoint', setpoint_level)):
+        out[f'{name}_approach'] = _first_crossing(*approach, level)
+        out[f'{name}_retract'] = _first_crossing(*retract, level)
+        out[f'{name}_offset'] = out[f'{name}_retract'] - out[f'{name}_approach']
+    return {key: out[key] for key in RESULT_KEYS}
+
+
+def to_map(values, shape, serpentine=False):
+    """Per-curve values laid out as a 2-D (rows, cols) map, NaN-filled.
+
+    ``shape`` is (rows, cols); missing curves at the end are NaN.  With
+    ``serpentine=True`` every other row is reversed, for maps acquired
+    back and forth.
+    """
+    rows, cols = shape
+    values = np.asarray(values, dtype=np.float64).ravel()
+    out = np.full(rows * cols, np.nan)
+    n = min(values.size, out.size)
+    out[:n] = values[:n]
+    out = out.reshape(rows, cols)
+    if serpentine:
+        out[1::2] = out[1::2, ::-1]
+    return out
+
+
+def map_shape(shape):
+    """2-D map shape for a curve set: a stacked file's (rows, cols), else a square or one row."""
+    shape = tuple(int(s) for s in shape)
+    if len(shape) == 2:
+        return shape
+    n = int(np.prod(shape))
+    side = int(round(np.sqrt(n)))
+    return (side, side) if side * side == n else (1, n)
+
+
+def analyze_map(source, shape=None, serpentine=False, skiprows=SKIPROWS, **kwargs):
+    """:func:`analyze_curves` over a set of curves, every result as a 2-D map.
+
+    ``shape`` (rows, cols) defaults to :func:`map_shape` of the source.
+    Returns ``file`` (list, curve order), the per-curve results as (N,)
+    arrays and, under ``'maps'``, the same results as (rows, cols) arrays.
+    """
+    names, height, amplitude, source_shape = load_curves(source, skiprows)
+    results = analyze_curves(height, amplitude, **kwargs)
+    shape = tuple(shape) if shape is not None else map_shape(source_shape)
+    maps = {key: to_map(value, shape, serpentine) for key, value in results.items()}
+    return {'file': names, **results, 'maps': maps}
@@ -0,0 +1,533 @@
+"""Command-line entry point: ``python -m nanolab <area> <analysis> PATHS...``.
+
+Every PATH may be a file, a glob or a directory (searched with the default
+pattern of the analysis); all matches are processed in this one interpreter.
+
+    python -m nanolab dc transfer  DIR --window 3 9 --L 7.5e-3 --W 4.75e-3 --C 54e-9 --vsd 0.1
+    python -m nanolab dc transfer  DIR --auto-window --saturation
+    python -m nanolab dc hysteresis DIR --window 3 9 --grid 200
+    python -m nanolab noise kb     DIR --G0 964 --T 297 --workers 8
+    python -m nanolab ac mott-schottky 'output_Cdiode_constF_*' --vrange 0.5 5
+    python -m nanolab ac mott-schottky DIR --auto-window --freq input_Cdiode_constF_27770kHz 27770
+    python -m nanolab ac doping-profile DIR --points 5
+    python -m nanolab ac convert DIR --save converted.npz
+    python -m nanolab ac eis DIR --circuit randles
+    python -m nanolab pedot cv DIR
+    python -m nanolab afm map DIR --shape 64 64 --setpoint 0.9 --save maps.npz
+    python -m nanolab afm map force_volume.npz
+"""
+import argparse
+import glob
+import os
+import sys
+
+import numpy as np
+
+from nanolab.afm import CURVE_GLOB
+from nanolab.cv import CV_EXPORT_GLOB
+from nanolab.eis import CIRCUITS, Z_GLOB
+from nanolab.impedance import INPUT_GLOB
+from nanolab.mott_schottky import CV_GLOB
+from nanolab.noise import NOISE_GLOB
+from nanolab.plotting import plots_enabled, pyplot, set_plot_mode, show, write_summary, write_table
+
+TRANSFER_GLOB = 'scan_transfer_*.dat'
+
+
+def expand_paths(patterns, default_glob):
+    """Expand files, globs and directories into a sorted, de-duplicated list."""
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, default_glob)))
+        else:
+            matches = sorted(glob.glob(pattern))
+        if not matches:
+            print(f"No files match {pattern}", file=sys.stderr)
+        for path in matches:
+            if path not in seen:
+                seen.add(path)
+                paths.append(path)
+    return paths
+
+
+def _analyze_each(func, paths, **kwargs):
+    results = []
+    for path in paths:
+        try:
+            results.append(func(path, **kwargs))
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"Skipping {path}: {e}", file=sys.stderr)
+    return results
+
+
+# ---- dc transfer ----
+
+def cmd_dc_transfer(args):
+    from nanolab.transfer import analyze_transfer_batch, iter_sweeps, load_transfer
+
+    paths = expand_paths(args.paths, TRANSFER_GLOB)
+    window = 'auto' if args.auto_window else tuple(args.window)
+    table = analyze_transfer_batch(paths, window=window,
+                                   L=args.L, W=args.W, C=args.C, V_SD=args.vsd,
+                                   sat_window=window if args.saturation else None)
+
+    print(f"{'file':40s} {'sweep':8s} {'cycle':>5s} {'mu (cm2/Vs)':>24s} {'V_t (V)':>20s} {'window (V)':>16s}")
+    for row in zip(table['file'], table['sweep'], table['cycle'], table['mu'], table['mu_err'],
+                   table['Vt'], table['Vt_err'], table['window_lo'], table['window_hi']):
+        path, sweep, cycle, mu, mu_err, Vt, Vt_err, lo, hi = row
+        print(f"{os.path.basename(path):40s} {sweep:8s} {cycle:5d} "
+              f"{mu:12.4e} ± {mu_err:9.2e} {Vt:9.3f} ± {Vt_err:8.3f} {lo:7.2f} {hi:7.2f}")
+    if args.saturation:
+        print("\nSaturation regime (sqrt(I_D) vs V_SG)")
+        print(f"{'file':40s} {'sweep':8s} {'cycle':>5s} {'mu_sat (cm2/Vs)':>24s} {'V_t (V)':>20s} {'window (V)':>16s}")
+        for row in zip(table['file'], table['sweep'], table['cycle'], table['sat_mu'], table['sat_mu_err'],
+                       table['sat_Vt'], table['sat_Vt_err'], table['sat_window_lo'], table['sat_window_hi']):
+            path, sweep, cycle, mu, mu_err, Vt, Vt_err, lo, hi = row
+            print(f"{os.path.basename(path):40s} {sweep:8s} {cycle:5d} "
+                  f"{mu:12.4e} ± {mu_err:9.2e} {Vt:9.3f} ± {Vt_err:8.3f} {lo:7.2f} {hi:7.2f}")
+    write_table(table, name='dc_transfer')
+
+    if plots_enabled():
+        plt = pyplot()
+        fits = {key[:3]: key[3:] for key in zip(table['file'], table['sweep'], table['cycle'],
+                                                table['m'], table['q'])}
+        colors = {'forward': 'blue', 'backward': 'red'}
+        for path in dict.fromkeys(table['file']):
+            V_SG, I_D = load_transfer(path)
+            plt.figure(figsize=(7, 5))
+            for sweep, cycle, V, I in iter_sweeps(V_SG, I_D):
+                m, q = fits[path, sweep, cycle]
+                label = sweep.capitalize() if cycle == 0 else None
+                plt.plot(V, I, '.', color=colors[sweep], label=label)
+                plt.plot(V, m * V + q, '--', color=colors[sweep], linewidth=1)
+            plt.xlabel(r'$V_{SG}$ (V)')
+            plt.ylabel(r'$I_D$ (A)')
+            plt.title(os.path.basename(path))
+            plt.grid(True)
+            plt.legend(loc='upper left')
+            plt.tight_layout()
+        show('dc_transfer')
+    return 0 if table['file'] else 1
+
+
+# ---- dc hysteresis ----
+
+def cmd_dc_hysteresis(args):
+    from nanolab.transfer import analyze_hysteresis_batch
+
+    paths = expand_paths(args.paths, TRANSFER_GLOB)
+    window = 'auto' if args.auto_window else tuple(args.window)
+    table = analyze_hysteresis_batch(paths, window=window, n_grid=args.grid,
+                                     L=args.L, W=args.W, C=args.C, V_SD=args.vsd)
+
+    print(f"{'file':40s} {'cycle':>5s} {'dV_t (V)':>20s} {'loop area (A V)':>16s} {'max dI (A)':>11s} {'at V':>7s}")
+    for row in zip(table['file'], table['cycle'], table['dVt'], table['dVt_err'],
+                   table['loop_area'], table['max_dI'], table['V_max_dI']):
+        path, cycle, dVt, dVt_err, area, max_dI, V_max = row
+        print(f"{os.path.basename(path):40s} {cycle:5d} {dVt:9.3f} ± {dVt_err:8.3f} "
+              f"{area:16.4e} {max_dI:11.3e} {V_max:7.2f}")
+    write_table(table, name='dc_hysteresis')
+    return 0 if table['file'] else 1
+
+
+# ---- noise kb ----
+
+def cmd_noise_kb(args):
+    from nanolab.noise import analyze_kb
+
+    paths = expand_paths(args.paths, NOISE_GLOB)
+    if len(paths) < 2:
+        print("Need at least two noise traces for the k_B fit", file=sys.stderr)
+        return 1
+    res = analyze_kb(paths, T=args.T, Rt=args.Rt, Rbias=args.Rbias, workers=args.workers, weights=args.weights,
+                     G0=args.G0, band=tuple(args.band), nperseg=args.nperseg,
+                     noverlap=args.noverlap, window=args.window, stream=args.stream)
+    r_eq, vn2, vn2_err, slope = res['R_eq_ohm'], res['vn2_V2_per_Hz'], res['vn2_err'], res['slope']
+
+    print(f"{'file':40s} {'R_eq (Ohm)':>12s} {'v_n^2 (V^2/Hz)':>26s}")
+    for path, r, v, e in zip(paths, r_eq, vn2, vn2_err):
+        print(f"{os.path.basename(path):40s} {r:12.2f} {v:12.4e} ± {e:10.2e}")
+    print(f"\nk_B (from FFT fit): ({res['k_B']:.2e} ± {res['k_B_err']:.2e}) J/K")
+    write_summary(res, name='noise_kb')
+
+    if plots_enabled():
+        plt = pyplot()
+        plt.figure(figsize=(10, 6))
+        plt.errorbar(r_eq, vn2, yerr=vn2_err, fmt='o', label="Data ($v_n^2$)")
+        x_fit = np.linspace(r_eq.min(), r_eq.max(), 200)
+        plt.plot(x_fit, slope * x_fit, '-', label=f'Fit: $v_n^2 = ({slope:.2e}) R$')
+        plt.xlabel("Equivalent Resistance $R_{eq}$ (Ohm)")
+        plt.ylabel("Spectral Density $v_n^2$ (V$^2$/Hz)")
+        plt.grid(True)
+        plt.legend()
+        plt.tight_layout()
+        show('noise_kb')
+    return 0
+
+
+# ---- ac mott-schottky ----
+
+def _file_frequencies(pairs):
+    """``--freq NAME HZ`` options as the ``{file name: Hz}`` dict of the C-V loaders."""
+    return {os.path.basename(name): float(hz) for name, hz in pairs or ()}
+
+
+def cmd_ac_mott_schottky(args):
+    from nanolab.mott_schottky import analyze_frequency_series, load_data
+
+    paths = expand_paths(args.paths, CV_GLOB)
+    window = 'auto' if args.auto_window else args.vrange
+    table = analyze_frequency_series(paths, window=window, area=args.area, eps_r=args.eps_r, T=args.T,
+                                     freq=_file_frequencies(args.freq))
+
+    print(f"{'file':40s} {'f (Hz)':>10s} {'N_d (cm^-3)':>24s} {'V_fb (V)':>20s} {'window (V)':>16s}")
+    for row in zip(table['file'], table['freq_Hz'], table['Nd_cm3'], table['Nd_err'],
+                   table['Vfb'], table['Vfb_err'], table['window_lo'], table['window_hi']):
+        path, freq, nd, nd_err, vfb, vfb_err, lo, hi = row
+        print(f"{os.path.basename(path):40s} {freq:10.4g} {nd:11.3e} ± {nd_err:9.2e} "
+              f"{vfb:9.3f} ± {vfb_err:8.3f} {lo:7.2f} {hi:7.2f}")
+    write_table(table, name='ac_mott_schottky')
+
+    if plots_enabled():
+        plt = pyplot()
+        plt.figure(figsize=(8, 5))
+        for path, freq, m, b, lo, hi in zip(table['file'], table['freq_Hz'], table['m'], table['b'],
+                                            table['window_lo'], table['window_hi']):
+            voff, _, inv_c2, inv_c2_err = load_data(path, freq)
+            line = plt.errorbar(voff, inv_c2, yerr=inv_c2_err, fmt='.', capsize=3,
+                                label=os.path.basename(path))[0]
+            v_fit = np.linspace(lo, hi, 50)
+            plt.plot(v_fit, m * v_fit + b, '--', color=line.get_color())
+        plt.xlabel("Voff (V)")
+        plt.ylabel("1 / C² (1/F²)")
+        plt.grid(True)
+        if len(table['file']) <= 10:
+            plt.legend()
+        plt.tight_layout()
+
+        if np.isfinite(table['freq_Hz']).sum() > 1:
+            fig, (ax_nd, ax_vfb) = plt.subplots(2, 1, sharex=True, figsize=(7, 7))
+            ax_nd.errorbar(table['freq_Hz'], table['Nd_cm3'], yerr=table['Nd_err'], fmt='o', capsize=3)
+            ax_nd.set_ylabel(r"$N_d$ (cm$^{-3}$)")
+            ax_vfb.errorbar(table['freq_Hz'], table['Vfb'], yerr=table['Vfb_err'], fmt='o', capsize=3)
+            ax_vfb.set_ylabel(r"$V_{fb}$ (V)")
+            ax_vfb.set_xlabel("Frequency (Hz)")
+            ax_vfb.set_xscale('log')
+            for ax in (ax_nd, ax_vfb):
+                ax.grid(True)
+            fig.tight_layout()
+        show('ac_mott_schottky')
+    return 0 if table['file'] else 1
+
+
+# ---- ac doping-profile ----
+
+def cmd_ac_doping_profile(args):
+    from nanolab.mott_schottky import analyze_doping_profiles
+
+    paths = expand_paths(args.paths, CV_GLOB)
+    prof = analyze_doping_profiles(paths, window=args.points, area=args.area, eps_r=args.eps_r,
+                                   freq=_file_frequencies(args.freq))
+
+    rows = {'file': [], 'freq_Hz': [], 'Voff': [], 'W_um': [], 'N_cm3': []}
+    print(f"{'file':40s} {'f (Hz)':>10s} {'W range (um)':>20s} {'N range (cm^-3)':>24s}")
+    for path, freq, voff, W, N in zip(prof['file'], prof['freq_Hz'], prof['Voff'],
+                                      prof['W_m'], prof['N_cm3']):
+        keep = np.isfinite(voff)
+        rows['file'] += [path] * int(keep.sum())
+        rows['freq_Hz'] += [freq] * int(keep.sum())
+        rows['Voff'] += list(voff[keep])
+        rows['W_um'] += list(W[keep] * 1e6)
+        rows['N_cm3'] += list(N[keep])
+        with np.errstate(invalid='ignore'):
+            print(f"{os.path.basename(path):40s} {freq:10.4g} {np.nanmin(W) * 1e6:9.3f} {np.nanmax(W) * 1e6:9.3f} "
+                  f"{np.nanmin(N):11.3e} {np.nanmax(N):11.3e}")
+    write_table(rows, name='ac_doping_profile')
+
+    if plots_enabled():
+        plt = pyplot()
+        plt.figure(figsize=(8, 5))
+        for path, W, N in zip(prof['file'], prof['W_m'], prof['N_cm3']):
+            plt.plot(W * 1e6, N, '.-', label=os.path.basename(path))
+        plt.xlabel("Depletion width W (µm)")
+        plt.ylabel(r"$N(W)$ (cm$^{-3}$)")
+        plt.yscale('log')
+        plt.grid(True)
+        if len(prof['file']) <= 10:
+            plt.legend()
+        plt.tight_layout()
+        show('ac_doping_profile')
+    return 0 if prof['file'] else 1
+
+
+# ---- ac convert ----
+
+def cmd_ac_convert(args):
+    from nanolab.impedance import convert_batch, save_converted
+
+    paths = expand_paths(args.paths, INPUT_GLOB)
+    conv = convert_batch(paths, freq=args.freq, vin=args.vin)
+
+    print(f"{'file':40s} {'points':>6s} {'f (Hz)':>21s} {'C (F)':>23s}")
+    for path, freq, cap in zip(conv['file'], conv['freq_Hz'], conv['C']):
+        keep = np.isfinite(cap)
+        print(f"{os.path.basename(path):40s} {int(keep.sum()):6d} {freq[keep].min():10.4g} {freq[keep].max():10.4g} "
+              f"{cap[keep].min():11.3e} {cap[keep].max():11.3e}")
+    if args.save:
+        print(f"Saved {save_converted(conv, args.save)}")
+    return 0 if conv['file'] else 1
+
+
+# ---- ac eis ----
+
+def cmd_ac_eis(args):
+    from nanolab.eis import analyze_spectra, circuit_impedance, load_spectrum
+
+    paths = expand_paths(args.paths, Z_GLOB)
+    table = analyze_spectra(paths, circuit=args.circuit)
+    names = CIRCUITS[args.circuit]
+
+    print(f"{'file':40s} " + " ".join(f"{name:>21s}" for name in names) + f" {'chi2_red':>10s}")
+    for i, path in enumerate(table['file']):
+        values = " ".join(f"{table[name][i]:10.4e} ± {table[name + '_err'][i]:8.2e}" for name in names)
+        flag = '' if table['converged'][i] else '  (not converged)'
+        print(f"{os.path.basename(path):40s} {values} {table['chi2_red'][i]:10.3e}{flag}")
+    write_table(table, name='ac_eis')
+
+    if plots_enabled():
+        plt = pyplot()
+        for i, path in enumerate(table['file']):
+            freq, Z = load_spectrum(path)
+            f_fit = np.geomspace(freq.min(), freq.max(), 400)
+            Z_fit = circuit_impedance(args.circuit, f_fit, [table[name][i] for name in names])
+            fig, (ax_z, ax_phase) = plt.subplots(2, 1, sharex=True, figsize=(7, 7))
+            ax_z.loglog(freq, np.abs(Z), 'o', markersize=3, label='Points')
+            ax_z.loglog(f_fit, np.abs(Z_fit), '-', label=f'Fit ({args.circuit})')
+            ax_z.set_ylabel("|Z| (Ω)")
+            ax_z.legend()
+            ax_phase.semilogx(freq, -np.angle(Z, deg=True), 'o', markersize=3)
+            ax_phase.semilogx(f_fit, -np.angle(Z_fit, deg=True), '-')
+            ax_phase.set_ylabel("-Phase (°)")
+            ax_phase.set_xlabel("Frequency (Hz)")
+            ax_z.set_title(os.path.basename(path))
+            for ax in (ax_z, ax_phase):
+                ax.grid(True, which='both')
+            fig.tight_layout()
+        show('ac_eis')
+    return 0 if table['file'] else 1
+
+
+# ---- pedot cv ----
+def cmd_pedot_cv(args):
+    from nanolab.cv import analyze_cv
+
+    paths = expand_paths(args.paths, CV_EXPORT_GLOB)
+    results = _analyze_each(analyze_cv, paths, tol=args.tol)
+
+    print(f"{'file':40s} {'cycles':>6s} {'E_pa (V)':>10s} {'E_pc (V)':>10s} {'dE_p (V)':>10s} {'Q/cycle (C)':>12s}")
+    table = {}
+    for r in results:
+        q = np.nanmean(r['Q_C']) if 'Q_C' in r and r['Q_C'].size else np.nan
+        print(f"{os.path.basename(r['file']):40s} {r['scan'].size:6d} {np.nanmean(r['E_pa']):10.4f} "
+              f"{np.nanmean(r['E_pc']):10.4f} {np.nanmean(r['dE_p']):10.4f} {q:12.4e}")
+        for key, value in r.items():
+            column = np.full(r['scan'].size, value, dtype=object) if key == 'file' else value
+            table.setdefault(key, []).append(column)
+    if results:
+        write_table({key: np.concatenate(columns) for key, columns in table.items()}, name='pedot_cv')
+
+    if plots_enabled():
+        plt = pyplot()
+        fig, (ax_e, ax_i) = plt.subplots(2, 1, sharex=True, figsize=(7, 7))
+        for r in results:
+            label = os.path.basename(r['file'])
+            ax_e.plot(r['scan'], r['E_pa'], 'o-', markersize=3, label=f'{label} E_pa')
+            ax_e.plot(r['scan'], r['E_pc'], 's-', markersize=3, label=f'{label} E_pc')
+            ax_i.plot(r['scan'], r['I_pa'], 'o-', markersize=3)
+            ax_i.plot(r['scan'], r['I_pc'], 's-', markersize=3)
+        ax_e.set_ylabel("Peak potential (V)")
+        ax_e.legend(fontsize='small')
+        ax_i.set_ylabel("Peak current (A)")
+        ax_i.set_xlabel("Scan")
+        for ax in (ax_e, ax_i):
+            ax.grid(True)
+        fig.tight_layout()
+        show('pedot_cv')
+    return 0 if results else 1
+
+
+# ---- afm map ----
+def cmd_afm_map(args):
+    from nanolab.afm import RESULT_KEYS, analyze_map
+
+    paths = []
+    for pattern in args.paths:
+        if pattern.endswith(('.npz', '.npy')) and os.path.isfile(pattern):
+            paths.append(pattern)
+        else:
+            paths.extend(expand_paths([pattern], CURVE_GLOB))
+    # One stacked array file keeps its own map shape; exports are analyzed together
+    source = paths[0] if len(paths) == 1 and paths[0].endswith(('.npz', '.npy')) else paths
+    if not source:
+        return 1
+    try:
+        result = analyze_map(source, shape=args.shape, serpentine=args.serpentine, setpoint=args.setpoint,
+                             tol=args.tol)
+    except (OSError, ValueError) as e:
+        print(f"Skipping {source}: {e}", file=sys.stderr)
+        return 1
+    maps = result['maps']
+
+    n_curves = len(result['file'])
+    print(f"{n_curves} curves, map {maps['contact_approach'].shape[0]} x {maps['contact_approach'].shape[1]}")
+    for key in RESULT_KEYS:
+        values = result[key]
+        n_ok = int(np.isfinite(values).sum())
+        mean = np.nanmean(values) if n_ok else np.nan
+        std = np.nanstd(values) if n_ok else np.nan
+        print(f"{key:20s} {mean:12.5g} ± {std:10.3g}  ({n_ok}/{n_curves} curves)")
+    write_table({key: result[key] for key in ('file',) + RESULT_KEYS}, name='afm_map')
+    if args.save:
+        np.savez_compressed(args.save, **maps)
+        print(f"Maps written to {args.save}")
+
+    if plots_enabled():
+        plt = pyplot()
+        fig, axes = plt.subplots(1, 3, figsize=(15, 4.5))
+        for ax, key in zip(axes, ('contact_approach', 'setpoint_approach', 'setpoint_offset')):
+            image = ax.imshow(maps[key], origin='lower', interpolation='nearest')
+            fig.colorbar(image, ax=ax)
+            ax.set_title(key)
+        fig.tight_layout()
+        show('afm_map')
+    return 0 if n_curves else 1
+
+
+def _add_common(parser, help_paths):
+    parser.add_argument('paths', nargs='+', help=help_paths)
+    parser.add_argument('--plots', choices=('show', 'save', 'none'), default='none',
+                        help="show figures, save them to --outdir, or skip plotting (default)")
+    parser.add_argument('--outdir', default='.', help="directory for figures and the JSON/CSV results")
+
+
+def build_parser():
+    from nanolab import afm, impedance, mott_schottky, transfer
+
+    parser = argparse.ArgumentParser(prog='nanolab', description="NanoLab batch analyses")
+    areas = parser.add_subparsers(dest='area', required=True)
+
+    dc = areas.add_parser('dc', help="DC transistor characterization").add_subparsers(dest='analysis', required=True)
+    p = dc.add_parser('transfer', help="linear-regime mobility and V_t from transfer scans")
+    _add_common(p, f"files, globs or directories (searched for {TRANSFER_GLOB})")
+    p.add_argument('--window', nargs=2, type=float, default=(3, 9), metavar=('V_LO', 'V_HI'),
+                   help="V_SG fit window (default: 3 9)")
+    p.add_argument('--auto-window', action='store_true',
+                   help="pick the steepest linear V_SG window of each sweep automatically")
+    p.add_argument('--saturation', action='store_true',
+                   help="also fit sqrt(I_D) for the saturation mobility and V_t (same window)")
+    p.add_argument('--L', type=float, default=transfer.L, help="channel length")
+    p.add_argument('--W', type=float, default=transfer.W, help="channel width")
+    p.add_argument('--C', type=float, default=transfer.C, help="gate capacitance per area (F/cm²)")
+    p.add_argument('--vsd', type=float, default=transfer.V_SD, help="source-drain voltage (V)")
+    p.set_defaults(func=cmd_dc_transfer)
+
+    p = dc.add_parser('hysteresis', help="forward/backward V_t shift, loop area and max current difference")
+    _add_common(p, f"files, globs or directories (searched for {TRANSFER_GLOB})")
+    p.add_argument('--window', nargs=2, type=float, default=(3, 9), metavar=('V_LO', 'V_HI'),
+                   help="V_SG window of the V_t fits (default: 3 9)")
+    p.add_argument('--auto-window', action='store_true',
+                   help="pick the steepest linear V_SG window of each sweep automatically")
+    p.add_argument('--grid', type=int, default=200, help="points of the common V_SG grid")
+    p.add_argument('--L', type=float, default=transfer.L, help="channel length")
+    p.add_argument('--W', type=float, default=transfer.W, help="channel width")
+    p.add_argument('--C', type=float, default=transfer.C, help="gate capacitance per area (F/cm²)")
+    p.add_argument('--vsd', type=float, default=transfer.V_SD, help="source-drain voltage (V)")
+    p.set_defaults(func=cmd_dc_hysteresis)
+
+    noise = areas.add_parser('noise', help="thermal noise").add_subparsers(dest='analysis', required=True)
+    p = noise.add_parser('kb', help="Boltzmann constant from Johnson noise traces")
+    _add_common(p, f"files, globs or directories (searched for {NOISE_GLOB})")
+    p.add_argument('--G0', type=float, default=964, help="amplifier gain")
+    p.add_argument('--T', type=float, default=297.0, help="temperature (K)")
+    p.add_argument('--Rt', type=float, default=200.0, help="series resistance R2 + R4 (Ohm)")
+    p.add_argument('--Rbias', type=float, default=200000.0, help="bias resistance R3 + R5 (Ohm)")
+    p.add_argument('--band', nargs=2, type=float, default=(1000.0, 9000.0), metavar=('F_LO', 'F_HI'),
+                   help="flat band for the v_n² average (Hz)")
+    p.add_argument('--nperseg', type=int, default=4096, help="Welch segment length")
+    p.add_argument('--noverlap', type=int, default=None, help="Welch overlap (default: nperseg/2)")
+    p.add_argument('--window', default='hann', help="Welch window")
+    p.add_argument('--weights', choices=('relative', 'absolute'), default=None,
+                   help="weight the k_B fit by 1/err² of v_n² (default: unweighted)")
+    p.add_argument('--stream', action='store_true', help="read traces chunk by chunk")
+    p.add_argument('--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    p.set_defaults(func=cmd_noise_kb)
+
+    ac = areas.add_parser('ac', help="AC / C-V measurements").add_subparsers(dest='analysis', required=True)
+    p = ac.add_parser('mott-schottky', help="N_d and V_fb versus frequency from 1/C² vs V")
+    _add_common(p, f"files, globs or directories (searched for {CV_GLOB})")
+    p.add_argument('--vrange', nargs=2, type=float, default=None, metavar=('V_LO', 'V_HI'),
+                   help="bias window for the fit (default: all points)")
+    p.add_argument('--auto-window', action='store_true',
+                   help="fit the linear depletion region of each curve, found automatically")
+    p.add_argument('--area', type=float, default=mott_schottky.A, help="diode area (m²)")
+    p.add_argument('--eps-r', type=float, default=mott_schottky.epsilon_si, help="relative permittivity")
+    p.add_argument('--T', type=float, default=mott_schottky.T, help="temperature (K)")
+    p.add_argument('--freq', nargs=2, action='append', metavar=('FILE', 'HZ'),
+                   help="measurement frequency of FILE, for names that do not state it literally (repeatable)")
+    p.set_defaults(func=cmd_ac_mott_schottky)
+
+    p = ac.add_parser('doping-profile', help="depth profile N(W) from the local slope of 1/C²")
+    _add_common(p, f"files, globs or directories (searched for {CV_GLOB})")
+    p.add_argument('--points', type=int, default=mott_schottky.PROFILE_WINDOW,
+                   help="points of the local d(1/C²)/dV fits (odd)")
+    p.add_argument('--area', type=float, default=mott_schottky.A, help="diode area (m²)")
+    p.add_argument('--eps-r', type=float, default=mott_schottky.epsilon_si, help="relative permittivity")
+    p.add_argument('--freq', nargs=2, action='append', metavar=('FILE', 'HZ'),
+                   help="measurement frequency of FILE, for names that do not state it literally (repeatable)")
+    p.set_defaults(func=cmd_ac_doping_profile)
+
+    p = ac.add_parser('convert', help="impedance and capacitance from raw Vin/Vout/Gain files")
+    p.add_argument('paths', nargs='+', help=f"files, globs or directories (searched for {INPUT_GLOB})")
+    p.add_argument('--freq', type=float, default=None,
+                   help="frequency (Hz) for every file (default: frequency column or file name)")
+    p.add_argument('--vin', type=float, default=impedance.V_IN,
+                   help="excitation amplitude (V) for files without a Vin column")
+    p.add_argument('--save', default=None, metavar='FILE.npz', help="write the converted columns to FILE.npz")
+    p.set_defaults(func=cmd_ac_convert, plots='none', outdir='.')
+
+    p = ac.add_parser('eis', help="equivalent-circuit fits of impedance spectra (z-freq/phase-freq points)")
+    _add_common(p, f"z-freq files, globs or directories (searched for {Z_GLOB})")
+    p.add_argument('--circuit', choices=tuple(CIRCUITS), default='randles',
+                   help="equivalent circuit (default: randles)")
+    p.set_defaults(func=cmd_ac_eis)
+
+    pedot = areas.add_parser('pedot', help="PEDOT:PSS electrodeposition").add_subparsers(dest='analysis', required=True)
+    p = pedot.add_parser('cv', help="per-cycle peak potentials/currents, peak separation and charge")
+    _add_common(p, f"files, globs or directories (searched for {CV_EXPORT_GLOB})")
+    p.add_argument('--tol', type=float, default=0.0,
+                   help="potential steps up to this size keep the previous sweep direction (V)")
+    p.set_defaults(func=cmd_pedot_cv)
+
+    spm = areas.add_parser('afm', help="AFM spectroscopy").add_subparsers(dest='analysis', required=True)
+    p = spm.add_parser('map', help="contact point, set-point crossing and approach/retract offsets per curve")
+    _add_common(p, f"curve files, globs or directories (searched for {CURVE_GLOB}), "
+                   "or one stacked .npz/.npy file")
+    p.add_argument('--shape', nargs=2, type=int, default=None, metavar=('ROWS', 'COLS'),
+                   help="map shape (default: from the stacked file, else square or one row)")
+    p.add_argument('--serpentine', action='store_true', help="every other map row was acquired backwards")
+    p.add_argument('--setpoint', type=float, default=afm.SETPOINT,
+                   help="set-point as a fraction of the free amplitude")
+    p.add_argument('--tol', type=float, default=afm.HEIGHT_TOL,
+                   help="height steps up to this size keep the sweep direction")
+    p.add_argument('--save', default=None, metavar='FILE.npz', help="write the 2-D maps to FILE.npz")
+    p.set_defaults(func=cmd_afm_map)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    set_plot_mode(args.plots, args.outdir)
+    return args.func(args)
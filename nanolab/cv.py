@@ -0,0 +1,270 @@
+"""Cyclic-voltammetry exports and PEDOT:PSS film-growth charge.
+
+The cycles of an export are indexed once by :func:`index_cycles` (one pass
+over the Scan column); each cycle is then the slice
+``starts[i]:stops[i]`` of the data, and :func:`analyze_cycles` gets the
+per-cycle peaks and charge with segment reductions over the whole file
+instead of a loop over cycles.
+"""
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from nanolab.exports import read_export
+from nanolab.sweeps import iter_branches, step_directions
+
+# Column names of the potentiostat export
+potential_col = 'Potential applied (V)'
+current_col = 'WE(1).Current (A)'
+scan_col = 'Scan'
+time_col = 'Time (s)'
+
+CV_EXPORT_GLOB = '*cyclicVoltammetry*.txt'
+
+# Rows integrated per block by the charge integrators
+CHARGE_CHUNK = 1 << 20
+
+# PEDOT:PSS deposition parameters
+M = 142.19      # g/mol (molar mass of EDOT)
+rho = 1.3       # g/cm^3 (density of PEDOT:PSS)
+N_A = 6.022e23  # mol^-1 (Avogadro's number)
+e = 1.602e-19   # C (elementary charge)
+A = 1           # cm^2 (exposed electrode area)
+
+
+def load_cv(path, cache=False):
+    """Columns of a potentiostat CV export as a dict of float arrays.
+
+    The dialect (';' or ',' separated, decimal comma or point) is sniffed
+    by :func:`nanolab.exports.read_export`; ``cache=True`` keeps a parsed
+    sidecar next to the file.
+    """
+    return read_export(path, cache=cache)
+
+
+def iter_cycles(scan, *arrays):
+    """Yield ``(scan_number, *array_slices)`` for each run of equal Scan values.
+
+    One pass over the Scan column; the slices are views of the inputs.
+    """
+    scan = np.asarray(scan)
+    bounds = np.concatenate(([0], np.flatnonzero(scan[1:] != scan[:-1]) + 1, [len(scan)]))
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        yield (scan[start],) + tuple(a[start:stop] for a in arrays)
+
+
+CycleIndex = namedtuple('CycleIndex', 'scans starts stops order')
+CycleIndex.__doc__ = """Cycle ``i`` is rows ``starts[i]:stops[i]`` and has Scan ``scans[i]``.
+
+``order`` is None when every cycle is one contiguous run of the file;
+otherwise it is the row permutation that groups them (see
+:func:`group_cycles`)."""
+
+
+def _run_bounds(scan):
+    return np.concatenate(([0], np.flatnonzero(scan[1:] != scan[:-1]) + 1, [len(scan)]))
+
+
+def index_cycles(scan):
+    """:class:`CycleIndex` of a Scan column, built in one pass.
+
+    Rows with the same Scan value that are not contiguous (an interrupted
+    and resumed cycle) are grouped with one stable sort.
+    """
+    scan = np.asarray(scan)
+    if scan.size == 0:
+        empty = np.zeros(0, dtype=np.intp)
+        return CycleIndex(scan[:0], empty, empty, None)
+    bounds = _run_bounds(scan)
+    order = None
+    if np.unique(scan[bounds[:-1]]).size < bounds.size - 1:
+        order = np.argsort(scan, kind='stable')
+        scan = scan[order]
+        bounds = _run_bounds(scan)
+    return CycleIndex(scan[bounds[:-1]], bounds[:-1], bounds[1:], order)
+
+
+def group_cycles(index, *arrays):
+    """The data arrays with their rows in cycle order (the inputs if already grouped)."""
+    if index.order is None:
+        return arrays
+    return tuple(np.asarray(a)[index.order] for a in arrays)
+
+
+def cycle_slice(index, i):
+    """Row slice of cycle ``i`` in the grouped data."""
+    return slice(int(index.starts[i]), int(index.stops[i]))
+
+
+def _cycle_steps(index, n):
+    """Mask of the n - 1 steps between two rows of the same cycle."""
+    within = np.ones(max(n - 1, 0), dtype=bool)
+    within[index.stops[:-1] - 1] = False
+    if index.order is not None:
+        within &= np.diff(index.order) == 1
+    return within
+
+
+def _cycle_extreme(index, values, ufunc):
+    """Per-cycle ``ufunc`` (np.fmax/np.fmin) of ``values`` and the first row reaching it (-1 if all NaN)."""
+    extreme = ufunc.reduceat(values, index.starts)
+    hits = np.flatnonzero(values == np.repeat(extreme, index.stops - index.starts))
+    pos = np.searchsorted(hits, index.starts)
+    first = hits[np.minimum(pos, hits.size - 1)] if hits.size else np.zeros_like(index.starts)
+    return extreme, np.where((pos < hits.size) & (first < index.stops), first, -1)
+
+
+def cycle_charge(index, current, time):
+    """Trapezoidal charge (C) of every cycle; steps across cycles are not counted."""
+    current = np.asarray(current, dtype=np.float64)
+    time = np.asarray(time, dtype=np.float64)
+    dq = 0.5 * (current[1:] + current[:-1]) * np.diff(time)
+    dq[~_cycle_steps(index, current.size)] = 0.0
+    return np.add.reduceat(np.append(dq, 0.0), index.starts)
+
+
+def analyze_cycles(potential, current, scan, time=None, tol=0.0):
+    """Per-cycle peak potentials and currents, peak separation and charge.
+
+    The anodic peak is the largest current on the rising-potential part of
+    a cycle, the cathodic peak the smallest on the falling part; ``tol`` is
+    passed to :func:`nanolab.sweeps.step_directions`.  Returns a dict of
+    arrays, one entry per cycle: scan, n_points, E_pa, I_pa, E_pc, I_pc,
+    dE_p (E_pa - E_pc) and, if ``time`` is given, Q_C.
+    """
+    index = index_cycles(scan)
+    arrays = (potential, current) if time is None else (potential, current, time)
+    potential, current, *time = (np.asarray(a, dtype=np.float64) for a in group_cycles(index, *arrays))
+    out = {'scan': index.scans, 'n_points': index.stops - index.starts}
+    if potential.size == 0:
+        return out
+    # Sweep direction of every row: that of the step arriving at it
+    steps = step_directions(potential, tol)
+    direction = np.concatenate((steps[:1], steps))
+    for peak, sign, ufunc in (('pa', 1, np.fmax), ('pc', -1, np.fmin)):
+        I_peak, row = _cycle_extreme(index, np.where(direction == sign, current, np.nan), ufunc)
+        out[f'E_{peak}'] = np.where(row >= 0, potential[row], np.nan)
+        out[f'I_{peak}'] = I_peak
+    out['dE_p'] = out['E_pa'] - out['E_pc']
+    if time:
+        out['Q_C'] = cycle_charge(index, current, time[0])
+    return out
+
+
+def analyze_cv(path, tol=0.0):
+    """:func:`analyze_cycles` of one CV export, with the ``file`` name."""
+    cols = load_cv(path)
+    return {'file': os.fspath(path),
+            **analyze_cycles(cols[potential_col], cols[current_col], cols[scan_col], cols.get(time_col), tol)}
+
+
+def iter_potential_sweeps(potential, *arrays, tol=0.0):
+    """Yield ``(kind, cycle, E, *array_slices)`` for every potential sweep.
+
+    ``kind`` is 'anodic' for a rising potential and 'cathodic' for a falling
+    one; the sweeps are split at the potential turning points and are views
+    of the inputs.
+    """
+    for seg, E, *rest in iter_branches(potential, *arrays, tol=tol, min_points=2):
+        kind = 'anodic' if seg.direction > 0 else 'cathodic'
+        yield (kind, seg.cycle, E) + tuple(rest)
+
+
+def total_charge(current, time, chunk=None):
+    """Trapezoidal integral of current over time (C), along the last axis.
+
+    With ``chunk``, 1-D inputs are summed block by block (``chunk`` steps at
+    a time), so long or memory-mapped logs need no full-length temporaries.
+    """
+    if chunk is not None:
+        Q = 0.0
+        for start in range(0, len(current) - 1, chunk):
+            stop = min(start + chunk, len(current) - 1)
+            Q += total_charge(current[start:stop + 1], time[start:stop + 1])
+        return Q
+    current = np.asarray(current, dtype=np.float64)
+    time = np.asarray(time, dtype=np.float64)
+    return 0.5 * np.sum((current[..., 1:] + current[..., :-1]) * np.diff(time, axis=-1), axis=-1)
+
+
+def cumulative_charge(current, time, out=None, chunk=CHARGE_CHUNK):
+    """Running trapezoidal charge Q(t) (C) with Q[0] = 0.
+
+    One cumsum pass, done block by block in ``out`` (allocated if None):
+    only a ``chunk``-sized time-step buffer is created, so ``current`` and
+    ``time`` may be memory-mapped (``load_cv(path, cache=True)``).
+    """
+    n = len(current)
+    if out is None:
+        out = np.empty(n, dtype=np.float64)
+    if n == 0:
+        return out
+    out[0] = 0.0
+    carry = 0.0
+    for start in range(0, n - 1, chunk):
+        stop = min(start + chunk, n - 1)
+        block = out[start + 1:stop + 1]
+        np.add(current[start + 1:stop + 1], current[start:stop], out=block)
+        block *= np.subtract(time[start + 1:stop + 1], time[start:stop])
+        block *= 0.5
+        np.cumsum(block, out=block)
+        block += carry
+        carry = block[-1]
+    return out
+
+
+def deposition_charge(current, time, scan, chunk=CHARGE_CHUNK):
+    """Oxidative, reductive and net charge (C) of every cycle.
+
+    Streams over the rows in blocks of ``chunk`` steps.  Each trapezoid step
+    is split into its oxidative (I > 0) and reductive (I < 0) parts, so
+    Q_ox + Q_red = Q_net; steps between rows of different scans are not
+    counted.  Returns a dict of per-cycle arrays in increasing scan order:
+    scan, Q_ox, Q_red, Q_net.
+    """
+    sums = {}
+    for start in range(0, len(current) - 1, chunk):
+        stop = min(start + chunk, len(current) - 1)
+        I0, I1 = current[start:stop], current[start + 1:stop + 1]
+        half_dt = np.subtract(time[start + 1:stop + 1], time[start:stop])
+        half_dt *= 0.5
+        half_dt[scan[start:stop] != scan[start + 1:stop + 1]] = 0.0
+        labels, inverse = np.unique(scan[start:stop], return_inverse=True)
+        ox = np.bincount(inverse, weights=(np.maximum(I0, 0) + np.maximum(I1, 0)) * half_dt,
+                         minlength=labels.size)
+        red = np.bincount(inverse, weights=(np.minimum(I0, 0) + np.minimum(I1, 0)) * half_dt,
+                          minlength=labels.size)
+        for label, q_ox, q_red in zip(labels.tolist(), ox, red):
+            acc = sums.setdefault(label, [0.0, 0.0])
+            acc[0] += q_ox
+            acc[1] += q_red
+    scans = sorted(sums)
+    Q_ox = np.array([sums[s][0] for s in scans], dtype=np.float64)
+    Q_red = np.array([sums[s][1] for s in scans], dtype=np.float64)
+    return {'scan': np.array(scans, dtype=np.float64), 'Q_ox': Q_ox, 'Q_red': Q_red, 'Q_net': Q_ox + Q_red}
+
+
+def deposition_profile(current, time, scan, M=M, rho=rho, area=A, chunk=CHARGE_CHUNK):
+    """Per-cycle deposited charge and PEDOT:PSS thickness.
+
+    :func:`deposition_charge` plus the thickness deposited in each cycle
+    (from its net charge, the oxidation that is not given back on the
+    reverse sweep) and the cumulative charge and thickness after it.
+    """
+    out = deposition_charge(current, time, scan, chunk)
+    out['thickness_nm'] = film_thickness_nm(out['Q_net'], M, rho, area)
+    out['Q_cum'] = np.cumsum(out['Q_net'])
+    out['thickness_cum_nm'] = film_thickness_nm(out['Q_cum'], M, rho, area)
+    return out
+
+
+def monomer_units(Q):
+    """Number of deposited monomer units for a charge Q."""
+    return Q / e
+
+
+def film_thickness_nm(Q, M=M, rho=rho, area=A):
+    """PEDOT:PSS film thickness (nm) for a deposition charge Q (C)."""
+    l_cm = (M * monomer_units(Q)) / (rho * N_A * area)
+    return l_cm * 1e7
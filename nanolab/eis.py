@@ -0,0 +1,304 @@
+"""Equivalent-circuit fits of impedance spectra (PEDOT/ITO electrodes).
+
+The spectra come as pairs of point files exported by the potentiostat,
+z-freq_*points*.txt (|Z|) and phase-freq_*points*.txt (-phase), which
+:func:`load_spectrum` merges into one complex Z(f).  Whole stacks of spectra
+(one row each, NaN-padded) are fitted together by a batched
+Levenberg-Marquardt loop: the circuit impedances and their analytic
+Jacobians are evaluated for every spectrum in one NumPy call, and each step
+solves all the (p, p) normal equations at once.
+
+Circuits (parameters in SI units, in this order):
+
+    'series_rc'      Rs + 1/(jwC)                              Rs, C
+    'simplified_rc'  Rs + (Rp || C)                            Rs, Rp, C
+    'randles'        Rs + (C || (Rct + Warburg sigma (1-j)/sqrt(w)))  Rs, Rct, C, sigma
+"""
+import glob
+import os
+
+import numpy as np
+
+from nanolab.exports import read_export
+from nanolab.transfer import stack_curves
+
+Z_GLOB = 'z-freq_*points*.txt'
+
+FREQ_COL = 'Frequency (Hz)'
+Z_COL = 'Z (Ω)'
+PHASE_COL = '-Phase (°)'
+
+MAX_ITER = 200
+# Relative decrease of the cost below which a spectrum counts as converged
+FIT_TOL = 1e-10
+
+CIRCUITS = {
+    'series_rc': ('Rs', 'C'),
+    'simplified_rc': ('Rs', 'Rp', 'C'),
+    'randles': ('Rs', 'Rct', 'C', 'sigma'),
+}
+
+
+def spectrum_files(directory, pattern=Z_GLOB):
+    """Sorted |Z| point files in ``directory``."""
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+
+def phase_path_for(z_path):
+    """The phase-freq file that goes with a z-freq file."""
+    head, name = os.path.split(z_path)
+    return os.path.join(head, name.replace('z-freq', 'phase-freq', 1))
+
+
+def _read_points(path, column):
+    cols = read_export(path)
+    return cols[FREQ_COL], cols[column]
+
+
+def load_spectrum(z_path, phase_path=None):
+    """Complex impedance ``(freq, Z)`` from a z-freq / phase-freq pair of point files.
+
+    ``phase_path`` defaults to :func:`phase_path_for`.  If the two files do
+    not share the frequency grid, the phase is interpolated (in log f) onto
+    the |Z| frequencies.  Points are returned in increasing frequency.
+    """
+    freq, z_abs = _read_points(z_path, Z_COL)
+    f_phase, minus_phase = _read_points(phase_path or phase_path_for(z_path), PHASE_COL)
+    order = np.argsort(freq)
+    freq, z_abs = freq[order], z_abs[order]
+    if f_phase.shape != freq.shape or not np.allclose(np.sort(f_phase), freq):
+        o = np.argsort(f_phase)
+        minus_phase = np.interp(np.log(freq), np.log(f_phase[o]), minus_phase[o])
+    else:
+        minus_phase = minus_phase[np.argsort(f_phase)]
+    return freq, z_abs * np.exp(-1j * np.deg2rad(minus_phase))
+
+
+def circuit_impedance(circuit, freq, params, jacobian=False):
+    """Impedance of ``circuit`` at ``freq`` for parameters ``params`` (..., p).
+
+    ``freq`` broadcasts against ``params[..., :1]``.  With ``jacobian=True``
+    also returns dZ/dp with shape (..., n, p).
+    """
+    params = np.asarray(params, dtype=np.float64)
+    w = 2 * np.pi * np.asarray(freq, dtype=np.float64)
+    p = [params[..., i, None] for i in range(params.shape[-1])]
+    one = np.ones(np.broadcast(w, p[0]).shape, dtype=np.complex128)
+    if circuit == 'series_rc':
+        Rs, C = p
+        Z = Rs + 1 / (1j * w * C)
+        grads = (one, 1j / (w * C**2) * one)
+    elif circuit == 'simplified_rc':
+        Rs, Rp, C = p
+        d = 1 + 1j * w * Rp * C
+        Z = Rs + Rp / d
+        grads = (one, 1 / d**2, -1j * w * Rp**2 / d**2)
+    elif circuit == 'randles':
+        Rs, Rct, C, sigma = p
+        Zf = Rct + sigma * (1 - 1j) / np.sqrt(w)
+        Y = 1j * w * C + 1 / Zf
+        Z = Rs + 1 / Y
+        dZ_dZf = 1 / (Y * Zf)**2
+        grads = (one, dZ_dZf, -1j * w / Y**2, dZ_dZf * (1 - 1j) / np.sqrt(w))
+    else:
+        raise ValueError(f"Unknown circuit {circuit!r}; choose from {sorted(CIRCUITS)}")
+    if not jacobian:
+        return Z
+    return Z, np.stack(np.broadcast_arrays(*grads), axis=-1)
+
+
+def initial_guess(circuit, freq, Z):
+    """Starting parameters (N, p) read off the spectra (N, n).
+
+    Rs is the smallest real part (high-frequency limit) and the parallel
+    resistance the spread of the real part.  C is, for 'series_rc', the
+    capacitance at the lowest frequency, for 'simplified_rc' the one at the
+    relaxation peak (largest -Im Z) and for 'randles' the high-frequency
+    limit of 1/(w (-Im Z)), which the Warburg tail does not affect; Rct is
+    read off the top of the arc (Re Z = Rs + Rct/2) and sigma off the
+    low-frequency -Im Z.
+    """
+    freq = np.broadcast_to(np.asarray(freq, dtype=np.float64), Z.shape)
+    w = 2 * np.pi * freq
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.nanmax(np.abs(Z), axis=-1)
+        Rs = np.maximum(np.nanmin(Z.real, axis=-1), 1e-3 * scale)
+        Rp = np.maximum(np.nanmax(Z.real, axis=-1) - Rs, Rs)
+        minus_im = np.where(np.isfinite(Z.imag), -Z.imag, -np.inf)
+        peak = np.argmax(minus_im, axis=-1)[:, None]
+        w_peak = np.take_along_axis(w, peak, axis=-1)[:, 0]
+        low = np.argmin(np.where(np.isfinite(freq), freq, np.inf), axis=-1)[:, None]
+        w_low = np.take_along_axis(w, low, axis=-1)[:, 0]
+        minus_im_low = -np.take_along_axis(Z.imag, low, axis=-1)[:, 0]
+        C_low = 1 / (w_low * minus_im_low)
+        C_peak = 1 / (w_peak * Rp)
+    if circuit == 'series_rc':
+        return np.stack((Rs, np.abs(C_low)), axis=-1)
+    if circuit == 'simplified_rc':
+        return np.stack((Rs, Rp, C_peak), axis=-1)
+    if circuit != 'randles':
+        raise ValueError(f"Unknown circuit {circuit!r}; choose from {sorted(CIRCUITS)}")
+    with np.errstate(divide='ignore', invalid='ignore'):
+        C_hf = np.nanmin(np.where(minus_im > 0, 1 / (w * minus_im), np.nan), axis=-1)
+        # Top of the arc: w Rct C = 1 where Re Z - Rs = Rct / 2
+        mismatch = np.abs(np.log(2 * w * C_hf[:, None] * (Z.real - Rs[:, None])))
+        arc_top = np.argmin(np.where(np.isfinite(mismatch), mismatch, np.inf), axis=-1)[:, None]
+        Rct = np.maximum(2 * (np.take_along_axis(Z.real, arc_top, axis=-1)[:, 0] - Rs), 1e-3 * scale)
+        # A 45° Warburg tail gives -Im Z = sigma / sqrt(w) at low frequency
+        sigma = np.maximum(minus_im_low * np.sqrt(w_low), 0.01 * Rp * np.sqrt(w_low))
+    return np.stack((Rs, Rct, C_hf, sigma), axis=-1)
+
+
+def _residuals(circuit, freq, Z, valid, log_params):
+    params = np.exp(log_params)
+    model, dZ = circuit_impedance(circuit, freq, params, jacobian=True)
+    # Modulus weighting: every frequency counts alike whatever |Z| is
+    scale = np.where(valid, 1 / np.abs(np.where(valid, Z, 1)), 0.0)
+    r = np.where(valid, model - np.where(valid, Z, 0), 0) * scale
+    J = dZ * (params[..., None, :] * scale[..., None])  # d/d(log p)
+    return (np.concatenate((r.real, r.imag), axis=-1),
+            np.concatenate((J.real, J.imag), axis=-2))
+
+
+def _solve(A, b):
+    try:
+        return np.linalg.solve(A, b[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        return (np.linalg.pinv(A) @ b[..., None])[..., 0]
+
+
+def _levenberg_marquardt(circuit, freq, Z, valid, theta, max_iter, tol):
+    """Batched LM on log-parameters; returns ``(theta, cost, J, n_iter, active)``."""
+    n_par = theta.shape[-1]
+    lam = np.full(Z.shape[0], 1e-3)
+    with np.errstate(invalid='ignore', over='ignore', divide='ignore'):
+        r, J = _residuals(circuit, freq, Z, valid, theta)
+    cost = np.einsum('ij,ij->i', r, r)
+    active = np.isfinite(cost) & np.isfinite(J).all(axis=(-2, -1))
+    n_iter = np.zeros(Z.shape[0], dtype=int)
+    for _ in range(max_iter):
+        # Only the spectra still being fitted are evaluated
+        idx = np.flatnonzero(active)
+        if idx.size == 0:
+            break
+        Ji, ri, lami = J[idx], r[idx], lam[idx]
+        H = np.einsum('nki,nkj->nij', Ji, Ji)
+        g = np.einsum('nki,nk->ni', Ji, ri)
+        diag = np.einsum('nii->ni', H)
+        A = H + (lami[:, None] * np.maximum(diag, 1e-12))[..., None] * np.eye(n_par)
+        with np.errstate(invalid='ignore', over='ignore', divide='ignore'):
+            trial = theta[idx] + _solve(A, -g)
+            r_new, J_new = _residuals(circuit, freq[idx], Z[idx], valid[idx], trial)
+            cost_new = np.einsum('ij,ij->i', r_new, r_new)
+        better = np.isfinite(cost_new) & (cost_new < cost[idx]) & np.isfinite(J_new).all(axis=(-2, -1))
+        done = better & (cost[idx] - cost_new <= tol * cost[idx])
+        acc = idx[better]
+        theta[acc], r[acc], J[acc], cost[acc] = trial[better], r_new[better], J_new[better], cost_new[better]
+        lam[idx] = np.where(better, lami / 10, lami * 10)
+        n_iter[idx] += 1
+        # A spectrum also stops when no step can lower its cost any more
+        active[idx] = ~done & (lam[idx] < 1e12)
+    return theta, cost, J, n_iter, active
+
+
+def starting_points(circuit, freq, Z):
+    """Starting parameters (K, N, p) for the multi-start fit.
+
+    The Randles fit has local minima with the Warburg term traded against
+    Rct, so besides :func:`initial_guess` it also starts from scaled
+    Rct/sigma; the other circuits start from the guess alone.
+    """
+    guess = initial_guess(circuit, freq, Z)
+    if circuit != 'randles':
+        return guess[None]
+    factors = np.array([[1, 1, 1, 1], [1, 1, 1, 0.1], [1, 1, 1, 10], [1, 0.3, 1, 0.1], [1, 0.3, 1, 1]])
+    return guess[None] * factors[:, None, :]
+
+
+def fit_spectra(freq, Z, circuit='randles', p0=None, max_iter=MAX_ITER, tol=FIT_TOL):
+    """Least-squares fit of ``circuit`` to many impedance spectra at once.
+
+    ``freq`` (n,) or (N, n) and complex ``Z`` (N, n) may be NaN-padded.
+    The residuals are (Z_model - Z) / |Z| (real and imaginary parts); the
+    parameters are fitted as logarithms, so they stay positive.  ``p0``
+    (N, p) defaults to the :func:`starting_points`, all run in the same
+    batch, keeping the best fit of each spectrum.  The errors come from the
+    Jacobian at the optimum, scaled by the reduced chi².
+
+    Returns a dict with one array per parameter and its ``*_err``, plus
+    ``chi2_red``, ``n_iter`` and ``converged``.
+    """
+    if circuit not in CIRCUITS:
+        raise ValueError(f"Unknown circuit {circuit!r}; choose from {sorted(CIRCUITS)}")
+    names = CIRCUITS[circuit]
+    Z = np.atleast_2d(np.asarray(Z, dtype=np.complex128))
+    freq = np.broadcast_to(np.asarray(freq, dtype=np.float64), Z.shape)
+    N, n = Z.shape
+    if p0 is None:
+        starts = starting_points(circuit, freq, Z)
+    else:
+        starts = np.broadcast_to(np.asarray(p0, dtype=np.float64), (N, len(names)))[None]
+    K = starts.shape[0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        theta = np.log(starts.reshape(K * N, len(names)))
+    Zk = np.broadcast_to(Z, (K, N, n)).reshape(K * N, n)
+    fk = np.broadcast_to(freq, (K, N, n)).reshape(K * N, n)
+    valid = np.isfinite(fk) & np.isfinite(Zk)
+    theta, cost, J, n_iter, active = _levenberg_marquardt(circuit, fk, Zk, valid, theta.copy(),
+                                                          max_iter, tol)
+
+    # Best start of every spectrum
+    cost = np.where(np.isfinite(cost), cost, np.inf).reshape(K, N)
+    best = np.argmin(cost, axis=0)
+    pick = best * N + np.arange(N)
+    theta, cost, J = theta[pick], cost[best, np.arange(N)], J[pick]
+    n_iter, active = n_iter.reshape(K, N).sum(axis=0), active[pick]
+
+    dof = 2 * valid[:N].sum(axis=-1) - len(names)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        chi2_red = np.where((dof > 0) & np.isfinite(cost), cost / dof, np.nan)
+        H = np.einsum('nki,nkj->nij', J, J)
+        ok = np.isfinite(H).all(axis=(-2, -1)) & np.isfinite(chi2_red)
+        cov = np.linalg.pinv(np.where(ok[:, None, None], H, np.eye(len(names))))
+        cov = np.where(ok[:, None, None], cov * chi2_red[:, None, None], np.nan)
+        params = np.exp(theta)
+        errors = params * np.sqrt(np.einsum('nii->ni', cov))
+    out = {}
+    for i, name in enumerate(names):
+        out[name] = params[:, i]
+        out[f'{name}_err'] = errors[:, i]
+    # Spectra still active ran out of iterations
+    out.update({'chi2_red': chi2_red, 'n_iter': n_iter, 'converged': ~active & np.isfinite(chi2_red)})
+    return out
+
+
+def load_spectra(paths):
+    """Read z-freq point files (with their phase files) into ``(files, freq, Z)``.
+
+    ``paths`` is a list of z-freq files or a directory (searched for
+    Z_GLOB).  ``freq`` and ``Z`` are NaN-padded (N, n_max); unreadable
+    pairs are reported and skipped.
+    """
+    if isinstance(paths, (str, os.PathLike)) and os.path.isdir(paths):
+        paths = spectrum_files(paths)
+    files, freqs, spectra = [], [], []
+    for path in paths:
+        try:
+            f, Z = load_spectrum(path)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        files.append(os.fspath(path))
+        freqs.append(f)
+        spectra.append(Z)
+    Z = stack_curves([z.real for z in spectra]) + 1j * stack_curves([z.imag for z in spectra])
+    return files, stack_curves(freqs), Z
+
+
+def analyze_spectra(paths, circuit='randles'):
+    """Fit ``circuit`` to every spectrum of a list or directory of z-freq files.
+
+    Returns a dict of columns: file plus the :func:`fit_spectra` results.
+    """
+    files, freq, Z = load_spectra(paths)
+    return {'file': files, **fit_spectra(freq, Z, circuit)}
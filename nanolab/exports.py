@@ -0,0 +1,154 @@
+"""Reader for the potentiostat text exports (CV, EIS points, chronoamperometry).
+
+The exports are delimited text with a one-line header, usually ';' separated
+with ',' as the decimal mark.  :func:`read_export` reads the file into memory,
+sniffs the dialect from the header and the data lines and parses the body
+with NumPy's C reader straight into one float64 array; every column comes
+back as a view of it.  A body that reader cannot parse is an error.
+
+Parsed tables are cached by a hash of the file contents: in memory for the
+running process and, with ``cache=True``, in a binary sidecar
+(``path + CACHE_SUFFIX``) that later runs memory-map instead of parsing.
+"""
+import hashlib
+import io
+import json
+import os
+import struct
+from collections import OrderedDict
+
+import numpy as np
+
+# Binary sidecar: fixed header, the column names as JSON, then the columns
+# one after the other as little-endian float64.
+# magic, content hash, n_rows, n_cols, length of the names block
+CACHE_SUFFIX = '.nlcsv'
+_CACHE_MAGIC = b'NLCSV001'
+_CACHE_HEADER = struct.Struct('<8s16sqqq')
+
+# Parsed tables kept in memory, most recently used last
+MEMORY_CACHE_SIZE = 8
+_memory_cache = OrderedDict()
+
+HASH_BLOCK = 1 << 24
+
+
+def sniff_dialect(head):
+    """``(delimiter, decimal)`` of an export from its bytes (the whole file or its start).
+
+    The delimiter is the first of ';', tab and ',' found in the header
+    line; with a non-comma delimiter, a comma in any of the data lines
+    given means decimal commas (the first rows may hold integers only).
+    """
+    newline = head.find(b'\n')
+    header = head if newline < 0 else head[:newline]
+    for delimiter in (b';', b'\t', b','):
+        if delimiter in header:
+            break
+    else:
+        delimiter = None  # whitespace
+    comma = newline >= 0 and head.find(b',', newline + 1) >= 0
+    decimal = b',' if delimiter != b',' and comma else b'.'
+    return delimiter, decimal
+
+
+def file_hash(path, block=HASH_BLOCK):
+    """Content hash (16 bytes) used as the cache key, read ``block`` bytes at a time."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(block), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _parse(data):
+    newline = data.find(b'\n')
+    header, body = (data, b'') if newline < 0 else (data[:newline], data[newline + 1:])
+    delimiter, decimal = sniff_dialect(data)
+    names = [name.strip().decode('utf-8-sig', errors='replace')
+             for name in (header.split(delimiter) if delimiter else header.split())]
+    if decimal == b',':
+        body = body.replace(b',', b'.')
+    sep = delimiter.decode() if delimiter else None
+    try:
+        values = np.loadtxt(io.BytesIO(body), delimiter=sep, dtype=np.float64, ndmin=2)
+    except ValueError as e:
+        # Text cells, missing values or ragged rows: not a numeric export
+        raise ValueError(f"cannot parse the data lines: {e}") from None
+    if values.size == 0:
+        values = np.empty((0, len(names)))
+    if values.shape[1] != len(names):
+        raise ValueError(f"{len(names)} column names for {values.shape[1]} columns")
+    return names, np.ascontiguousarray(values.T)
+
+
+def _read_cache(cache_path, digest):
+    try:
+        with open(cache_path, 'rb') as f:
+            raw = f.read(_CACHE_HEADER.size)
+            if len(raw) != _CACHE_HEADER.size:
+                return None
+            magic, stored, n_rows, n_cols, names_len = _CACHE_HEADER.unpack(raw)
+            if magic != _CACHE_MAGIC or stored != digest:
+                return None
+            names = json.loads(f.read(names_len).decode('utf-8'))
+    except (OSError, ValueError):
+        return None
+    offset = _CACHE_HEADER.size + names_len
+    if os.path.getsize(cache_path) != offset + 8 * n_rows * n_cols:
+        return None
+    columns = np.memmap(cache_path, dtype='<f8', mode='r', offset=offset, shape=(n_cols, n_rows))
+    return names, columns
+
+
+def _write_cache(cache_path, digest, names, columns):
+    block = json.dumps(names).encode('utf-8')
+    # Pad the names so the data starts 8-byte aligned
+    block += b' ' * (-(_CACHE_HEADER.size + len(block)) % 8)
+    header = _CACHE_HEADER.pack(_CACHE_MAGIC, digest, columns.shape[1], columns.shape[0], len(block))
+    tmp_path = cache_path + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(header + block)
+            np.ascontiguousarray(columns, dtype='<f8').tofile(f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Could not write export cache {cache_path}: {e}")
+
+
+def read_export(path, cache=False):
+    """Columns of a potentiostat export as a dict ``{name: float64 array}``.
+
+    The content hash, computed block by block, is looked up in the
+    in-memory cache and, with ``cache=True``, in the sidecar; only on a
+    miss is the file read whole and parsed (and the sidecar written).  The
+    arrays are read-only views of one (n_cols, n_rows) block, memory-mapped
+    when they come from the sidecar.
+    """
+    path = os.fspath(path)
+    digest = file_hash(path)
+    hit = _memory_cache.get(digest)
+    if hit is None and cache:
+        hit = _read_cache(path + CACHE_SUFFIX, digest)
+    if hit is None:
+        with open(path, 'rb') as f:
+            data = f.read()
+        try:
+            hit = _parse(data)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}") from None
+        hit[1].flags.writeable = False
+        if cache:
+            _write_cache(path + CACHE_SUFFIX, digest, *hit)
+    _memory_cache[digest] = hit
+    _memory_cache.move_to_end(digest)
+    while len(_memory_cache) > MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+    names, columns = hit
+    return dict(zip(names, columns))
+
+
+def build_cache(path):
+    """Create (or refresh) the sidecar of an export; returns the number of rows."""
+    columns = read_export(path, cache=True)
+    return len(next(iter(columns.values()), ()))
@@ -0,0 +1,189 @@
+"""Straight-line fits shared by the DC, noise and C-V analyses.
+
+The models are linear in their parameters, so the least-squares solutions are
+written in closed form.  Everything goes through :func:`line_regression`, a
+vectorized kernel that fits whole batches of datasets (weighted or not, with
+or without intercept) in one call and gives the same parameters and
+covariances as ``scipy.optimize.curve_fit`` without importing scipy.
+"""
+import numpy as np
+
+# all_window_fits holds several (..., n + 1, n + 1) arrays: it refuses inputs
+# with more than this many (start, stop) pairs (2M: about 16 MB per array)
+ALL_WINDOWS_MAX_ELEMENTS = 1 << 21
+
+
+def linear_model(x, m, q):
+    return m * x + q
+
+
+def proportional_model(x, slope):
+    return slope * x
+
+
+def line_regression(x, y, sigma=None, mask=None, through_origin=False, absolute_sigma=True):
+    """Weighted or unweighted straight-line least squares for many datasets at once.
+
+    ``x``, ``y`` (and ``sigma``) have shape ``(..., n)``; every dataset is
+    fitted over its last axis using the points where ``mask`` is True and
+    all values are finite, so NaN padding is ignored.  The model is
+    ``y = m x + q``, or ``y = slope * x`` with ``through_origin=True``.
+
+    The covariance follows ``curve_fit``: scaled by chi²/dof when ``sigma``
+    is None or ``absolute_sigma`` is False, absolute otherwise.  Returns
+    ``(params, cov, residuals, n_points)`` with params ``(..., p)`` ([m, q]
+    or [slope]), cov ``(..., p, p)``, residuals ``y - fit`` ``(..., n)``
+    (NaN at excluded points).  Datasets without degrees of freedom get NaN
+    where the result is undefined.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    w = np.ones_like(y) if sigma is None else 1.0 / np.asarray(sigma, dtype=np.float64)**2
+    x, y, w = np.broadcast_arrays(x, y, w)
+    valid = np.isfinite(x) & np.isfinite(y) & np.isfinite(w)
+    if mask is not None:
+        valid &= mask
+    w = np.where(valid, w, 0.0)
+    xv = np.where(valid, x, 0.0)
+    yv = np.where(valid, y, 0.0)
+    n = valid.sum(axis=-1)
+    p = 1 if through_origin else 2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if through_origin:
+            Sxx = (w * xv * xv).sum(axis=-1)
+            slope = (w * xv * yv).sum(axis=-1) / Sxx
+            params = slope[..., None]
+            cov = (1.0 / Sxx)[..., None, None]
+            fit = slope[..., None] * xv
+        else:
+            # Centred moments keep the sums well conditioned for small currents
+            Sw = w.sum(axis=-1)
+            x_mean = (w * xv).sum(axis=-1) / Sw
+            y_mean = (w * yv).sum(axis=-1) / Sw
+            dx = np.where(valid, xv - x_mean[..., None], 0.0)
+            dy = np.where(valid, yv - y_mean[..., None], 0.0)
+            Sxx = (w * dx * dx).sum(axis=-1)
+            m = (w * dx * dy).sum(axis=-1) / Sxx
+            q = y_mean - m * x_mean
+            params = np.stack((m, q), axis=-1)
+            cov = np.stack((np.stack((1.0 / Sxx, -x_mean / Sxx), axis=-1),
+                            np.stack((-x_mean / Sxx, 1.0 / Sw + x_mean**2 / Sxx), axis=-1)), axis=-2)
+            fit = m[..., None] * xv + q[..., None]
+        residuals = np.where(valid, yv - fit, np.nan)
+        if sigma is None or not absolute_sigma:
+            chi2 = (w * np.where(valid, residuals, 0.0)**2).sum(axis=-1)
+            s2 = np.where(n > p, chi2 / (n - p), np.nan)
+            cov = cov * s2[..., None, None]
+    return params, cov, residuals, n
+
+
+def _param_errors(cov):
+    return np.sqrt(np.diagonal(cov, axis1=-2, axis2=-1))
+
+
+def linear_fit(x, y, sigma=None):
+    """Fit ``y = m x + q``; returns ``(m, q, m_err, q_err)``."""
+    params, cov, _, _ = line_regression(x, y, sigma)
+    m_err, q_err = _param_errors(cov)
+    return params[0], params[1], m_err, q_err
+
+
+def proportional_fit(x, y, sigma=None, absolute_sigma=True):
+    """Fit ``y = slope * x`` through the origin; returns ``(slope, slope_err)``.
+
+    ``sigma`` and ``absolute_sigma`` as in :func:`line_regression`.
+    """
+    params, cov, _, _ = line_regression(x, y, sigma, through_origin=True, absolute_sigma=absolute_sigma)
+    return params[0], _param_errors(cov)[0]
+
+
+def weighted_linear_fit(x, y, y_err):
+    """Fit with weights 1/y_err and chi²-scaled covariance (as ``np.polyfit(..., cov=True)``).
+
+    Returns ``(m, b, m_err, b_err)``.
+    """
+    params, cov, _, _ = line_regression(x, y, y_err, absolute_sigma=False)
+    m_err, b_err = _param_errors(cov)
+    return params[0], params[1], m_err, b_err
+
+
+def batch_linear_fit(x, y, mask=None, sigma=None):
+    """``y = m x + q`` fits of many datasets at once.
+
+    Thin wrapper around :func:`line_regression`: ``x`` and ``y`` have shape
+    ``(..., n)`` and only the finite points where ``mask`` is True are used.
+    Returns arrays ``(m, q, m_err, q_err, n_points)`` with the same errors as
+    :func:`linear_fit`; datasets with fewer than three points get NaN errors.
+    """
+    params, cov, _, n = line_regression(x, y, sigma, mask)
+    errors = _param_errors(cov)
+    return params[..., 0], params[..., 1], errors[..., 0], errors[..., 1], n
+
+
+def _prefix_moments(x, y):
+    """Curve means and prefix sums (..., n + 1) of the centred moments of ``x``, ``y``."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.isfinite(x) & np.isfinite(y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n_valid = valid.sum(axis=-1, keepdims=True)
+        x_mean = np.where(valid, x, 0.0).sum(axis=-1, keepdims=True) / n_valid
+        y_mean = np.where(valid, y, 0.0).sum(axis=-1, keepdims=True) / n_valid
+    xc = np.where(valid, x - x_mean, 0.0)
+    yc = np.where(valid, y - y_mean, 0.0)
+    moments = (valid.astype(np.float64), xc, yc, xc * xc, xc * yc, yc * yc)
+    prefix = []
+    for a in moments:
+        c = np.cumsum(a, axis=-1)
+        prefix.append(np.concatenate((np.zeros(c.shape[:-1] + (1,)), c), axis=-1))
+    return x_mean, y_mean, prefix
+
+
+def _line_from_sums(n, Sx, Sy, Sxx, Sxy, Syy, x_mean, y_mean):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        det = n * Sxx - Sx**2
+        cov = n * Sxy - Sx * Sy
+        m = cov / det
+        q = (Sy - m * Sx) / n + y_mean - m * x_mean
+        r2 = cov**2 / (det * (n * Syy - Sy**2))
+    return m, q, r2
+
+
+def sliding_linear_fit(x, y, k):
+    """Least-squares line over every run of ``k`` consecutive points.
+
+    Uses prefix sums of the (curve-centred) moments, so all ``n - k + 1``
+    windows of a curve cost O(n).  ``x`` and ``y`` have shape ``(..., n)``;
+    returns ``(m, q, r2)`` of shape ``(..., n - k + 1)``.  Windows that
+    contain non-finite points are NaN.
+    """
+    x_mean, y_mean, prefix = _prefix_moments(x, y)
+    n, Sx, Sy, Sxx, Sxy, Syy = (c[..., k:] - c[..., :-k] for c in prefix)
+    m, q, r2 = _line_from_sums(n, Sx, Sy, Sxx, Sxy, Syy, x_mean, y_mean)
+    full = n == k
+    return np.where(full, m, np.nan), np.where(full, q, np.nan), np.where(full, r2, np.nan)
+
+
+def all_window_fits(x, y):
+    """Least-squares line over every run ``[start:stop]`` of consecutive points.
+
+    One set of prefix sums serves all the runs: ``x`` and ``y`` have shape
+    ``(..., n)``; returns ``(m, q, r2)`` of shape ``(..., n + 1, n + 1)``
+    indexed by ``[start, stop]``.  Empty, reversed or non-finite runs are NaN.
+
+    Time and memory grow as n²: inputs with more than
+    :data:`ALL_WINDOWS_MAX_ELEMENTS` pairs in total (about 1400 points for
+    one curve, fewer per curve in a batch) raise ValueError; use
+    :func:`sliding_linear_fit` on selected lengths for dense sweeps.
+    """
+    shape = np.broadcast_shapes(np.shape(x), np.shape(y))
+    pairs = int(np.prod(shape[:-1])) * (shape[-1] + 1)**2
+    if pairs > ALL_WINDOWS_MAX_ELEMENTS:
+        raise ValueError(f"{pairs} windows exceed ALL_WINDOWS_MAX_ELEMENTS ({ALL_WINDOWS_MAX_ELEMENTS})")
+    x_mean, y_mean, prefix = _prefix_moments(x, y)
+    n, Sx, Sy, Sxx, Sxy, Syy = (c[..., None, :] - c[..., :, None] for c in prefix)
+    m, q, r2 = _line_from_sums(n, Sx, Sy, Sxx, Sxy, Syy, x_mean[..., None], y_mean[..., None])
+    length = np.arange(n.shape[-1])[None, :] - np.arange(n.shape[-1])[:, None]
+    full = (n == length) & (length > 0)
+    return np.where(full, m, np.nan), np.where(full, q, np.nan), np.where(full, r2, np.nan)
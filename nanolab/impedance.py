@@ -0,0 +1,127 @@
+"""Lock-in / transimpedance readings to complex impedance and capacitance.
+
+The raw AC files (input_*) hold the excitation Vin, the amplifier output Vout
+and its transimpedance gain, plus either a bias column (Voff, constant
+frequency: the frequency is in the file name) or a frequency column
+(constant bias).  :func:`convert_input` turns one file into Z and C in
+memory, :func:`convert_batch` a whole set of files into NaN-padded arrays;
+the Mott-Schottky and capacitance analyses consume these directly.  Results
+are written only on request, by :func:`save_converted`, as one compressed
+``.npz`` of columns.
+"""
+import glob
+import os
+import re
+
+import numpy as np
+
+from nanolab.transfer import stack_curves
+
+INPUT_GLOB = 'input_*'
+
+# Excitation amplitude (V) for files without a Vin column
+V_IN = 0.01
+# Phase of Z assumed when only |Z| is measured: a pure capacitance
+CAPACITIVE_PHASE = -90.0
+
+_FREQ_UNITS = {'hz': 1.0, 'khz': 1e3, 'mhz': 1e6}
+
+
+def input_files(directory, pattern=INPUT_GLOB):
+    """Sorted raw AC files in ``directory``."""
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+
+def frequency_from_name(path):
+    """Measurement frequency (Hz) from a name like output_Cdiode_constF_1kHz, NaN if absent."""
+    match = re.search(r"(\d+(?:\.\d+)?)\s*([kKmM]?Hz)", os.path.basename(path))
+    if not match:
+        return np.nan
+    return float(match.group(1)) * _FREQ_UNITS[match.group(2).lower()]
+
+
+def read_columns(path, delimiter=','):
+    """Columns of a delimited text file with a one-line header, as a dict of float arrays."""
+    with open(path) as f:
+        names = [name.strip() for name in f.readline().split(delimiter)]
+        data = np.loadtxt(f, delimiter=delimiter, dtype=np.float64, ndmin=2)
+    if data.shape[1] != len(names):
+        raise ValueError(f"{path}: {len(names)} column names for {data.shape[1]} columns")
+    return {name: data[:, i] for i, name in enumerate(names)}
+
+
+def is_raw_input(path):
+    """True if the header of ``path`` has the Vout and Gain columns of a raw AC file."""
+    with open(path) as f:
+        header = f.readline()
+    return 'Vout' in header and 'Gain' in header
+
+
+def impedance_from_gain(vin, vout, gain, phase_deg=CAPACITIVE_PHASE):
+    """Complex impedance from a transimpedance reading: |Z| = Vin * Gain / Vout."""
+    magnitude = np.asarray(vin, dtype=np.float64) * gain / np.asarray(vout, dtype=np.float64)
+    return magnitude * np.exp(1j * np.deg2rad(phase_deg))
+
+
+def capacitance_from_impedance(Z, freq):
+    """Series capacitance C = -1 / (2 pi f Im Z)."""
+    return -1 / (2 * np.pi * np.asarray(freq, dtype=np.float64) * np.imag(Z))
+
+
+def convert_input(path, freq=None, vin=V_IN, phase_deg=CAPACITIVE_PHASE):
+    """Z and C of every row of one raw AC file.
+
+    The frequency is, in order: ``freq`` if given, the 'Frequency (Hz)'
+    column, the frequency in the file name.  ``vin`` is used when there is
+    no Vin column.  Returns a dict of equal-length arrays (Voff is NaN for
+    constant-bias files) plus the ``file`` name.
+    """
+    cols = read_columns(path)
+    vout, gain = cols['Vout'], cols['Gain']
+    if freq is None:
+        freq = cols.get('Frequency (Hz)', frequency_from_name(path))
+    freq = np.broadcast_to(np.asarray(freq, dtype=np.float64), vout.shape)
+    if not np.isfinite(freq).all():
+        raise ValueError(f"No frequency column or frequency in the file name: {path}")
+    vin = np.broadcast_to(np.asarray(cols.get('Vin', vin), dtype=np.float64), vout.shape)
+    Z = impedance_from_gain(vin, vout, gain, phase_deg)
+    return {'file': os.fspath(path), 'Voff': cols.get('Voff', np.full(vout.shape, np.nan)),
+            'freq_Hz': freq, 'Vin': vin, 'Vout': vout, 'Gain': gain,
+            'Z': Z, 'C': capacitance_from_impedance(Z, freq)}
+
+
+def convert_batch(paths, freq=None, vin=V_IN, phase_deg=CAPACITIVE_PHASE):
+    """:func:`convert_input` for a list (or directory) of raw AC files.
+
+    Returns ``file`` (list) and the columns as NaN-padded (N, n_max) arrays,
+    one row per readable file; unreadable files are reported and skipped.
+    """
+    if isinstance(paths, (str, os.PathLike)) and os.path.isdir(paths):
+        paths = input_files(paths)
+    results = []
+    for path in paths:
+        try:
+            results.append(convert_input(path, freq, vin, phase_deg))
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Skipping {path}: {e}")
+    out = {'file': [r['file'] for r in results]}
+    for key in ('Voff', 'freq_Hz', 'Vin', 'Vout', 'Gain', 'C'):
+        out[key] = stack_curves([r[key] for r in results])
+    out['Z'] = stack_curves([r['Z'].real for r in results]) + 1j * stack_curves([r['Z'].imag for r in results])
+    return out
+
+
+def save_converted(converted, path):
+    """Write a :func:`convert_input`/:func:`convert_batch` result to a compressed ``.npz``."""
+    # 'file' is the first parameter of np.savez_compressed, so the names go in as 'source'
+    arrays = {('source' if key == 'file' else key): np.asarray(value) for key, value in converted.items()}
+    np.savez_compressed(path, **arrays)
+    return path
+
+
+def load_converted(path):
+    """Read back :func:`save_converted` output as a dict of arrays."""
+    with np.load(path) as data:
+        out = {('file' if key == 'source' else key): data[key] for key in data.files}
+    out['file'] = out['file'].tolist()
+    return out
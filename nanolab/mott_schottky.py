@@ -0,0 +1,299 @@
+"""Mott-Schottky (1/C² vs V) analysis of diode C-V curves.
+
+A frequency series (one constant-frequency C-V file per frequency) is held as
+NaN-padded 2-D arrays, one row per file sorted by frequency, so the depletion
+windows and the weighted fits of all frequencies run in single calls.
+"""
+import glob
+import os
+
+import numpy as np
+
+from nanolab.fits import ALL_WINDOWS_MAX_ELEMENTS, all_window_fits, line_regression, sliding_linear_fit
+from nanolab.impedance import convert_input, frequency_from_name, is_raw_input
+from nanolab.transfer import stack_curves
+
+# --- Costanti fisiche ---
+epsilon_0 = 8.854e-12  # F/m
+epsilon_si = 11.7      # costante dielettrica silicio
+q = 1.602e-19          # C
+A = 2.89e-6            # m²
+k_B = 1.380649e-23     # J/K
+T = 293                # Temperatura in K
+
+CV_GLOB = 'input_*constF*'
+
+# The depletion region is the longest run of at least DEPLETION_MIN_POINTS
+# bias points on which 1/C² is a straight line with R² >= DEPLETION_R2_MIN
+DEPLETION_MIN_POINTS = 5
+DEPLETION_R2_MIN = 0.998
+# Run lengths tried on curves too long to score every run (see find_depletion_window)
+DEPLETION_MAX_LENGTHS = 64
+
+# Points of the local fits that give d(1/C²)/dV in doping_profile (odd)
+PROFILE_WINDOW = 5
+
+
+def cv_files(directory, pattern=CV_GLOB):
+    """Sorted constant-frequency C-V files in ``directory``."""
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+
+def file_frequency(path, freq=None):
+    """Measurement frequency (Hz) of a C-V file.
+
+    ``freq`` is a number (every file), a dict from file name (basename) to
+    frequency, or None; files it does not cover take the frequency in
+    their name (:func:`nanolab.impedance.frequency_from_name`).
+    """
+    if isinstance(freq, dict):
+        freq = freq.get(os.path.basename(path))
+    return frequency_from_name(path) if freq is None else float(freq)
+
+
+def load_data(file_path, freq=None):
+    """Read a constant-frequency C-V file.
+
+    Raw lock-in files (input_Cdiode_constF_*: Voff, Vout, Gain) are
+    converted in memory by :func:`nanolab.impedance.convert_input` at
+    :func:`file_frequency`; converted files (output_Cdiode_constF_*) are
+    read as tab-separated Voff/Capacitance.  Returns ``(voff, capacitance,
+    inv_c2, inv_c2_err)`` where the error on 1/C² is 2% with an absolute
+    floor of 1e16 F⁻².
+    """
+    if is_raw_input(file_path):
+        conv = convert_input(file_path, file_frequency(file_path, freq))
+        voff, capacitance = conv['Voff'], conv['C']
+    else:
+        data = np.loadtxt(file_path, delimiter='\t', skiprows=1, ndmin=2)
+        voff = data[:, 0]
+        capacitance = data[:, 1]
+    inv_c2 = 1 / (capacitance ** 2)
+    inv_c2_err = np.maximum(0.02 * inv_c2, 1e16)  # 2% o minimo assoluto
+    return voff, capacitance, inv_c2, inv_c2_err
+
+
+def extract_Nd_cm3(m, m_err, area=A, eps_r=epsilon_si):
+    nd_m3 = 2 / (q * eps_r * epsilon_0 * area**2 * m)
+    nd_m3_err = abs(nd_m3 * m_err / m)
+    return nd_m3 / 1e6, nd_m3_err / 1e6  # cm^-3
+
+
+def extract_flatband(m, b, m_err, b_err, T=T):
+    vfb = -b / m - k_B * T / q
+    vfb_err = np.sqrt((b_err / m)**2 + (b * m_err / m**2)**2)
+    return vfb, vfb_err
+
+
+def analyze_cv_file(path, v_range=None, area=A, eps_r=epsilon_si, T=T):
+    """Weighted 1/C² fit of one constant-frequency C-V file.
+
+    ``v_range=(v_lo, v_hi)`` restricts the fit to that bias window,
+    ``'auto'`` picks the depletion region (see :func:`fit_mott_schottky`).
+    """
+    voff, cap, inv_c2, inv_c2_err = load_data(path)
+    fit = fit_mott_schottky(voff, inv_c2, inv_c2_err, v_range, area, eps_r, T)
+    return {'file': os.fspath(path), **{key: float(fit[key]) for key in (
+            'm', 'b', 'm_err', 'b_err', 'Nd_cm3', 'Nd_err', 'Vfb', 'Vfb_err')}}
+
+
+def load_frequency_series(paths, freq=None):
+    """Read constant-frequency C-V files into ``(files, freq, voff, cap, inv_c2, inv_c2_err)``.
+
+    ``paths`` is a list of files or a directory (searched for CV_GLOB).
+    Rows are sorted by :func:`file_frequency` (``freq`` as there; files
+    without a frequency go last); the per-point arrays are NaN-padded
+    (N, n_max).  Unreadable files are reported and skipped.
+    """
+    if isinstance(paths, (str, os.PathLike)) and os.path.isdir(paths):
+        paths = cv_files(paths)
+    rows = []
+    for path in paths:
+        try:
+            f = file_frequency(path, freq)
+            rows.append((f, os.fspath(path)) + load_data(path, f))
+        except (OSError, ValueError) as e:
+            print(f"Skipping {path}: {e}")
+    rows.sort(key=lambda r: (np.isnan(r[0]), r[0]))
+    freq = np.array([r[0] for r in rows], dtype=np.float64)
+    files = [r[1] for r in rows]
+    return (files, freq) + tuple(stack_curves([r[i] for r in rows]) for i in range(2, 6))
+
+
+def find_depletion_window(voff, inv_c2, min_points=DEPLETION_MIN_POINTS, r2_min=DEPLETION_R2_MIN):
+    """Bias window of the linear depletion region of 1/C² vs V.
+
+    Every run of consecutive points (bias in increasing order) is scored
+    from one set of prefix sums (:func:`nanolab.fits.all_window_fits`);
+    the longest run with positive slope and R² >= ``r2_min`` wins, ties
+    going to the higher R².  Without one, the straightest run of
+    ``min_points`` is used.  Works on one curve or on (N, n) NaN-padded
+    curves; returns the closed window ``(lo, hi)`` (NaN if a curve is too
+    short).
+
+    Scoring every run costs memory as N·n²; above
+    :data:`nanolab.fits.ALL_WINDOWS_MAX_ELEMENTS` (a few hundred points
+    per curve in a batch, ~1400 for one curve) only up to
+    :data:`DEPLETION_MAX_LENGTHS` evenly spaced run lengths are scored,
+    with :func:`nanolab.fits.sliding_linear_fit`, so the window of a dense
+    sweep is the longest passing run among those lengths.
+    """
+    voff = np.asarray(voff, dtype=np.float64)
+    V2, y2 = np.atleast_2d(voff, inv_c2)
+    rows = np.arange(V2.shape[0])
+    lo = np.full(V2.shape[0], np.nan)
+    hi = np.full(V2.shape[0], np.nan)
+    n = V2.shape[-1]
+    if n >= min_points:
+        if V2.shape[0] * (n + 1)**2 <= ALL_WINDOWS_MAX_ELEMENTS:
+            best_start, best_k, found = _score_all_runs(V2, y2, min_points, r2_min)
+        else:
+            best_start, best_k, found = _score_run_lengths(V2, y2, min_points, r2_min)
+        lo = np.where(found, V2[rows, best_start], np.nan)
+        hi = np.where(found, V2[rows, best_start + best_k - 1], np.nan)
+    if voff.ndim == 1:
+        return lo[0], hi[0]
+    return lo, hi
+
+
+def _score_all_runs(V2, y2, min_points, r2_min):
+    """``(start, length, found)`` of the best run of every curve, from all runs at once."""
+    m, _, r2 = all_window_fits(V2, y2)
+    n1 = V2.shape[-1] + 1
+    length = np.arange(n1)[None, :] - np.arange(n1)[:, None]
+    r2 = np.where(length >= min_points, r2, np.nan)
+    with np.errstate(invalid='ignore'):
+        passed = (m > 0) & (r2 >= r2_min)
+    # Longest passing run first, then the highest R² (0 <= R² <= 1)
+    score = np.where(passed, length + 0.5 * r2, -np.inf).reshape(V2.shape[0], -1)
+    shortest = np.where(length == min_points, r2, np.nan)
+    straight = np.where(np.isfinite(shortest), shortest, -np.inf).reshape(V2.shape[0], -1)
+    found = np.isfinite(straight).any(axis=-1)
+    best = np.where(np.isfinite(score).any(axis=-1), np.argmax(score, axis=-1), np.argmax(straight, axis=-1))
+    best_start, best_stop = np.divmod(best, n1)
+    return best_start, best_stop - best_start, found
+
+
+def _score_run_lengths(V2, y2, min_points, r2_min):
+    """As :func:`_score_all_runs`, over at most DEPLETION_MAX_LENGTHS run lengths (O(N·n) memory)."""
+    n = V2.shape[-1]
+    lengths = np.arange(min_points, n + 1)
+    if lengths.size > DEPLETION_MAX_LENGTHS:
+        lengths = np.unique(np.linspace(min_points, n, DEPLETION_MAX_LENGTHS).round().astype(int))
+    rows = np.arange(V2.shape[0])
+    _, _, r2 = sliding_linear_fit(V2, y2, min_points)
+    found = np.isfinite(r2).any(axis=-1)
+    best_k = np.full(V2.shape[0], min_points)
+    best_start = np.argmax(np.where(np.isfinite(r2), r2, -np.inf), axis=-1)
+    for k in lengths:
+        m, _, r2 = sliding_linear_fit(V2, y2, k)
+        with np.errstate(invalid='ignore'):
+            score = np.where((m > 0) & (r2 >= r2_min), r2, -np.inf)
+        start = np.argmax(score, axis=-1)
+        # Longer runs are scanned later, so a passing one always wins
+        passed = np.isfinite(score[rows, start])
+        best_k = np.where(passed, k, best_k)
+        best_start = np.where(passed, start, best_start)
+    return best_start, best_k, found
+
+
+def fit_mott_schottky(voff, inv_c2, inv_c2_err, window=None, area=A, eps_r=epsilon_si, T=T):
+    """Weighted 1/C² fits, N_d and V_fb of many C-V curves in one call.
+
+    ``voff``, ``inv_c2`` and ``inv_c2_err`` are (..., n) arrays (NaN
+    padding allowed).  ``window`` is None (all points), a closed bias
+    window ``(lo, hi)`` (scalars or per-curve arrays) or ``'auto'`` for
+    :func:`find_depletion_window`.  The errors are those of
+    :func:`nanolab.fits.weighted_linear_fit`.  Returns a dict of arrays.
+    """
+    voff = np.asarray(voff, dtype=np.float64)
+    if isinstance(window, str) and window == 'auto':
+        window = find_depletion_window(voff, inv_c2)
+    if window is None:
+        lo = np.nanmin(voff, axis=-1)
+        hi = np.nanmax(voff, axis=-1)
+    else:
+        lo = np.broadcast_to(np.asarray(window[0], dtype=np.float64), voff.shape[:-1])
+        hi = np.broadcast_to(np.asarray(window[1], dtype=np.float64), voff.shape[:-1])
+    with np.errstate(invalid='ignore'):
+        mask = (voff >= lo[..., None]) & (voff <= hi[..., None])
+    params, cov, _, n = line_regression(voff, inv_c2, inv_c2_err, mask, absolute_sigma=False)
+    m, b = params[..., 0], params[..., 1]
+    errors = np.sqrt(np.diagonal(cov, axis1=-2, axis2=-1))
+    m_err, b_err = errors[..., 0], errors[..., 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        nd, nd_err = extract_Nd_cm3(m, m_err, area, eps_r)
+        vfb, vfb_err = extract_flatband(m, b, m_err, b_err, T)
+    return {'m': m, 'b': b, 'm_err': m_err, 'b_err': b_err,
+            'Nd_cm3': nd, 'Nd_err': nd_err, 'Vfb': vfb, 'Vfb_err': vfb_err,
+            'n_points': n, 'window_lo': lo, 'window_hi': hi}
+
+
+def analyze_frequency_series(paths, window='auto', area=A, eps_r=epsilon_si, T=T, freq=None):
+    """N_d and V_fb versus frequency for a set of constant-frequency C-V files.
+
+    ``freq`` overrides the frequencies in the file names (see
+    :func:`file_frequency`).  Returns a dict of columns, one row per file
+    sorted by frequency: file, freq_Hz and the :func:`fit_mott_schottky`
+    results.
+    """
+    files, freq, voff, _, inv_c2, inv_c2_err = load_frequency_series(paths, freq)
+    fit = fit_mott_schottky(voff, inv_c2, inv_c2_err, window, area, eps_r, T)
+    return {'file': files, 'freq_Hz': freq, **fit}
+
+
+def depletion_width(capacitance, area=A, eps_r=epsilon_si):
+    """Depletion width W = eps A / C (m) of a one-sided junction."""
+    return eps_r * epsilon_0 * area / np.asarray(capacitance, dtype=np.float64)
+
+
+def local_slope(x, y, window=PROFILE_WINDOW):
+    """Noise-robust dy/dx at every point from least-squares lines over ``window`` points.
+
+    The centred ``window``-point line has the first-derivative weights of a
+    Savitzky-Golay filter of order 1 or 2, but also copes with uneven
+    spacing: it is evaluated for all curves of a (N, n) NaN-padded batch
+    with :func:`nanolab.fits.sliding_linear_fit`.  The first and last
+    ``window // 2`` points of each curve take the slope of the nearest full
+    window (Savitzky-Golay 'interp' edges); windows that contain a missing
+    point give NaN, and so does the padding.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    x2, y2 = np.atleast_2d(x, y)
+    slope = np.full(x2.shape, np.nan)
+    if x2.shape[-1] >= window:
+        m, _, _ = sliding_linear_fit(x2, y2, window)
+        valid = np.isfinite(x2) & np.isfinite(y2)
+        first = np.argmax(valid, axis=-1)[:, None]
+        last = x2.shape[-1] - 1 - np.argmax(valid[:, ::-1], axis=-1)[:, None]
+        start = np.arange(x2.shape[-1]) - window // 2
+        start = np.clip(start, first, np.maximum(last - window + 1, first))
+        slope = np.where(valid, np.take_along_axis(m, start, axis=-1), np.nan)
+    return slope.reshape(x.shape)
+
+
+def doping_profile(voff, capacitance, window=PROFILE_WINDOW, area=A, eps_r=epsilon_si):
+    """Depth-resolved doping N(W) from the local slope of 1/C² vs V.
+
+    ``N = 2 / (q eps A² d(1/C²)/dV)`` with the derivative from
+    :func:`local_slope`, at the depletion width W = eps A / C of every
+    bias point.  Works on one curve or on (N, n) NaN-padded curves sorted
+    by bias; returns ``(W_m, N_cm3)`` with the shape of the input.
+    """
+    capacitance = np.asarray(capacitance, dtype=np.float64)
+    slope = local_slope(voff, 1 / capacitance**2, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        nd_m3 = 2 / (q * eps_r * epsilon_0 * area**2 * slope)
+    return depletion_width(capacitance, area, eps_r), nd_m3 / 1e6
+
+
+def analyze_doping_profiles(paths, window=PROFILE_WINDOW, area=A, eps_r=epsilon_si, freq=None):
+    """N(W) profiles of a set (or directory) of constant-frequency C-V files.
+
+    Returns a dict with ``file`` and ``freq_Hz`` (one entry per curve, as in
+    :func:`load_frequency_series`, which also takes ``freq``) and the
+    NaN-padded (N, n_max) arrays ``Voff``, ``W_m`` and ``N_cm3``.
+    """
+    files, freq, voff, cap, _, _ = load_frequency_series(paths, freq)
+    W, N = doping_profile(voff, cap, window, area, eps_r)
+    return {'file': files, 'freq_Hz': freq, 'Voff': voff, 'W_m': W, 'N_cm3': N}
@@ -0,0 +1,117 @@
+"""Per-file thermal-noise pipeline and a process-pool batch driver."""
+import glob
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from nanolab.fits import proportional_fit
+from nanolab.psd import welch_psd, welch_psd_stream
+from nanolab.traces import open_trace, stream_trace
+
+NOISE_GLOB = 'FFT_*kohm_noise_filter.txt'
+
+
+def noise_files(directory, pattern=NOISE_GLOB):
+    """Sorted noise traces in ``directory``."""
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+
+def resistance_from_name(path):
+    """Resistance in Ohm parsed from a name like FFT_220.9kohm_noise_filter.txt."""
+    match = re.search(r'(\d+\.?\d*)kohm', os.path.basename(path))
+    if not match:
+        raise ValueError(f"No resistance found in file name: {path}")
+    return float(match.group(1)) * 1e3
+
+
+def equivalent_resistance(r_ohms, Rt=200.0, Rbias=200000.0):
+    """(R + Rt) in parallel with Rbias."""
+    r_ohms = np.asarray(r_ohms, dtype=np.float64)
+    return ((r_ohms + Rt) * Rbias) / (r_ohms + Rt + Rbias)
+
+
+def file_spectrum(path, G0=964, nperseg=4096, noverlap=None, window='hann', stream=False):
+    """Gain-corrected Welch PSD ``(freqs, psd)`` of one trace file."""
+    if stream:
+        dt, _, chunks = stream_trace(path)
+        freqs, psd = welch_psd_stream(chunks, dt, nperseg, noverlap, window)
+    else:
+        v, dt, _ = open_trace(path)
+        freqs, psd = welch_psd(v, dt, nperseg, noverlap, window)
+    psd /= G0**2
+    return freqs, psd
+
+
+def file_vn2(path, G0=964, band=(1000.0, 9000.0), **psd_kwargs):
+    """Return ``(R, v_n², err)`` for one file.
+
+    v_n² is the mean PSD over ``band`` (V²/Hz) and ``err`` its standard error
+    over the frequency bins of the band.
+    """
+    freqs, psd = file_spectrum(path, G0, **psd_kwargs)
+    mask = (freqs >= band[0]) & (freqs <= band[1])
+    psd_band = psd[mask]
+    err = np.std(psd_band, ddof=1) / np.sqrt(psd_band.size) if psd_band.size > 1 else np.nan
+    return resistance_from_name(path), np.mean(psd_band), err
+
+
+def run_batch(func, paths, workers=None, **kwargs):
+    """Apply ``func(path, **kwargs)`` to every path, results in input order.
+
+    ``workers=1`` runs in-process; otherwise a process pool with ``workers``
+    processes is used (``None`` = one per CPU).  ``func`` must be importable
+    at module level so that it can be sent to the workers.
+    """
+    paths = list(paths)
+    job = partial(func, **kwargs)
+    if workers == 1 or len(paths) <= 1:
+        return [job(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(job, paths))
+
+
+def batch_vn2(paths, workers=None, **kwargs):
+    """Run :func:`file_vn2` over ``paths`` and return arrays ``(R, vn2, err)``."""
+    results = run_batch(file_vn2, paths, workers, **kwargs)
+    r_ohms, vn2, err = (np.array(col, dtype=np.float64) for col in zip(*results))
+    return r_ohms, vn2, err
+
+
+FIT_WEIGHTS = (None, 'relative', 'absolute')
+
+
+def fit_boltzmann(r_eq_ohms, vn2, vn2_err=None, T=297.0, weights=None):
+    """Fit ``v_n² = 4 k_B T R_eq`` through the origin; returns ``(k_B, k_B_err, slope, slope_err)``.
+
+    The fit is unweighted by default, with the error from the scatter of
+    the points.  ``weights='relative'`` weights the points by 1/vn2_err²
+    and still scales the error by chi²; ``weights='absolute'`` takes
+    ``vn2_err`` as absolute.  The :func:`file_vn2` errors come from
+    overlapping Welch bins, which are correlated, so they are too small to
+    be used as absolute.
+    """
+    if weights not in FIT_WEIGHTS:
+        raise ValueError(f"weights must be one of {FIT_WEIGHTS}, got {weights!r}")
+    sigma = None if weights is None else vn2_err
+    slope, slope_err = proportional_fit(r_eq_ohms, vn2, sigma, absolute_sigma=weights == 'absolute')
+    return slope / (4 * T), slope_err / (4 * T), slope, slope_err
+
+
+def analyze_kb(paths, T=297.0, Rt=200.0, Rbias=200000.0, workers=None, weights=None, **kwargs):
+    """k_B from a set of noise traces, or from every trace in a directory.
+
+    ``weights`` is passed to :func:`fit_boltzmann`; ``kwargs`` go to
+    :func:`file_vn2` (G0, band and the Welch settings).
+    Returns a dict with the per-file values and the fit result.
+    """
+    if isinstance(paths, (str, os.PathLike)) and os.path.isdir(paths):
+        paths = noise_files(paths)
+    paths = [os.fspath(p) for p in paths]
+    r_ohms, vn2, vn2_err = batch_vn2(paths, workers, **kwargs)
+    r_eq = equivalent_resistance(r_ohms, Rt, Rbias)
+    k_B, k_B_err, slope, slope_err = fit_boltzmann(r_eq, vn2, vn2_err, T, weights)
+    return {'files': paths, 'R_eq_ohm': r_eq, 'vn2_V2_per_Hz': vn2, 'vn2_err': vn2_err,
+            'slope': slope, 'slope_err': slope_err, 'k_B': k_B, 'k_B_err': k_B_err}
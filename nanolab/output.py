@@ -0,0 +1,118 @@
+"""TFT output characteristics: I_D(V_D) families at fixed gate voltage.
+
+A family is held as one NaN-padded 2-D array per quantity, one row per gate
+voltage (sorted), so quadrant filtering and the per-curve fits run over the
+whole family at once.
+"""
+import glob
+import os
+import re
+
+import numpy as np
+
+from nanolab.fits import batch_linear_fit
+from nanolab.noise import run_batch
+from nanolab.transfer import stack_curves
+
+OUTPUT_GLOB = 'scan_output_*.dat'
+
+# Fractions of the largest V_D that bound the linear (below LIN_FRACTION) and
+# saturation (above SAT_FRACTION) regions used by output_parameters
+LIN_FRACTION = 0.1
+SAT_FRACTION = 0.7
+# A point counts as saturated once it is within SAT_TOL * I_sat of the saturation line
+SAT_TOL = 0.01
+
+
+def output_files(directory, pattern=OUTPUT_GLOB):
+    """Sorted output scans in ``directory``."""
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+
+def gate_voltage_from_name(path):
+    """Gate voltage parsed from a name like scan_output_5_25953812.dat."""
+    match = re.search(r"scan_output_(-?\d+(?:\.\d+)?)_", os.path.basename(path))
+    if not match:
+        raise ValueError(f"No gate voltage found in file name: {path}")
+    return float(match.group(1))
+
+
+def load_output(path, v_col=3, i_col=4):
+    """Return ``(V_D, I_D)`` from a scan_output_*.dat file (two header lines + column names)."""
+    data = np.loadtxt(path, skiprows=3, usecols=(v_col, i_col), ndmin=2)
+    return data[:, 0], data[:, 1]
+
+
+def _load_labelled(path):
+    try:
+        return (gate_voltage_from_name(path),) + load_output(path)
+    except (OSError, ValueError) as e:
+        print(f"Skipping {path}: {e}")
+        return None
+
+
+def load_output_family(paths, workers=None):
+    """Read a whole V_G family, in parallel, into ``(V_G, V_D, I_D)``.
+
+    ``paths`` is a list of files or a directory (searched for OUTPUT_GLOB).
+    The files are parsed by a process pool (see
+    :func:`nanolab.noise.run_batch`); unreadable ones are reported and
+    skipped.  Returns the sorted gate voltages (N,) and the NaN-padded
+    (N, n_max) drain voltage and current arrays.
+    """
+    if isinstance(paths, (str, os.PathLike)) and os.path.isdir(paths):
+        paths = output_files(paths)
+    curves = [c for c in run_batch(_load_labelled, [os.fspath(p) for p in paths], workers)
+              if c is not None]
+    curves.sort(key=lambda c: c[0])
+    V_G = np.array([c[0] for c in curves], dtype=np.float64)
+    return V_G, stack_curves([c[1] for c in curves]), stack_curves([c[2] for c in curves])
+
+
+def first_quadrant(V_D, I_D):
+    """Copies of ``V_D`` and ``I_D`` with every point outside V_D >= 0, I_D >= 0 set to NaN."""
+    keep = (V_D >= 0) & (I_D >= 0)
+    return np.where(keep, V_D, np.nan), np.where(keep, I_D, np.nan)
+
+
+def output_parameters(V_D, I_D, lin_fraction=LIN_FRACTION, sat_fraction=SAT_FRACTION,
+                      sat_tol=SAT_TOL):
+    """Linear conductance, output conductance, I_sat and V_D,sat of every curve.
+
+    Straight lines are fitted to each curve (rows of NaN-padded arrays,
+    ideally first-quadrant data) below ``lin_fraction`` and above
+    ``sat_fraction`` of its largest V_D.  The low-V_D line gives the channel
+    conductance g_lin, the saturation line the output conductance
+    g_out = dI_D/dV_D and I_sat (its value at the largest V_D).  The
+    linear/saturation boundary V_D,sat is the largest V_D at which the curve
+    is still more than ``sat_tol * I_sat`` below the saturation line.
+    Returns a dict of arrays.
+    """
+    V_D = np.asarray(V_D, dtype=np.float64)
+    I_D = np.asarray(I_D, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        V_max = np.nanmax(np.where(np.isfinite(I_D), V_D, np.nan), axis=-1)
+        lin = V_D <= lin_fraction * V_max[..., None]
+        sat = V_D >= sat_fraction * V_max[..., None]
+    g_lin, _, g_lin_err, _, n_lin = batch_linear_fit(V_D, I_D, lin)
+    g_out, q_sat, g_out_err, _, n_sat = batch_linear_fit(V_D, I_D, sat)
+    I_sat = g_out * V_max + q_sat
+    with np.errstate(invalid='ignore'):
+        deficit = g_out[..., None] * V_D + q_sat[..., None] - I_D
+        below = deficit > sat_tol * np.abs(I_sat)[..., None]
+    V_Dsat = np.where(below, V_D, -np.inf).max(axis=-1)
+    V_Dsat = np.where(np.isfinite(V_Dsat), V_Dsat, np.nan)
+    return {'g_lin': g_lin, 'g_lin_err': g_lin_err, 'g_out': g_out, 'g_out_err': g_out_err,
+            'I_sat': I_sat, 'V_Dsat': V_Dsat, 'V_D_max': V_max,
+            'n_lin': n_lin, 'n_sat': n_sat}
+
+
+def analyze_output_family(paths, workers=None, lin_fraction=LIN_FRACTION, sat_fraction=SAT_FRACTION,
+                          sat_tol=SAT_TOL):
+    """Load a V_G family and extract :func:`output_parameters` from its first quadrant.
+
+    Returns a dict of columns with one row per gate voltage.
+    """
+    V_G, V_D, I_D = load_output_family(paths, workers)
+    params = output_parameters(*first_quadrant(V_D, I_D), lin_fraction, sat_fraction, sat_tol)
+    return {'V_G': V_G, **params}
@@ -0,0 +1,134 @@
+"""Interactive vs. headless plotting for the analysis scripts.
+
+The mode is read from the environment so the scripts keep running unchanged:
+
+    NANOLAB_PLOTS   'show' (default) opens the usual windows,
+                    'save' renders with the non-GUI Agg backend and writes
+                    every figure to NANOLAB_OUTDIR,
+                    'none' skips plotting altogether.
+    NANOLAB_OUTDIR  where figures and summaries go (default: current dir).
+
+In the headless modes :func:`write_summary` and :func:`write_table` also
+store the numeric results (JSON / CSV) next to the figures.
+"""
+import csv
+import itertools
+import json
+import os
+import sys
+
+import numpy as np
+
+PLOT_MODES = ('show', 'save', 'none')
+
+_fig_counter = itertools.count(1)
+
+
+def plot_mode():
+    mode = os.environ.get('NANOLAB_PLOTS', 'show').lower()
+    if mode not in PLOT_MODES:
+        raise ValueError(f"NANOLAB_PLOTS must be one of {PLOT_MODES}, got {mode!r}")
+    return mode
+
+
+def set_plot_mode(mode, outdir=None):
+    """Select the plot mode from code (e.g. the command line) instead of the environment."""
+    if mode not in PLOT_MODES:
+        raise ValueError(f"plot mode must be one of {PLOT_MODES}, got {mode!r}")
+    os.environ['NANOLAB_PLOTS'] = mode
+    if outdir is not None:
+        os.environ['NANOLAB_OUTDIR'] = os.fspath(outdir)
+
+
+def output_dir():
+    outdir = os.environ.get('NANOLAB_OUTDIR', '.')
+    os.makedirs(outdir, exist_ok=True)
+    return outdir
+
+
+def plots_enabled():
+    return plot_mode() != 'none'
+
+
+def pyplot():
+    """Import matplotlib.pyplot, on the Agg backend unless plots are shown."""
+    import matplotlib
+    if plot_mode() != 'show':
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _script_name():
+    return os.path.splitext(os.path.basename(sys.argv[0] or 'nanolab'))[0] or 'nanolab'
+
+
+def show(name=None, dpi=150):
+    """Replacement for ``plt.show()`` that honours the plot mode.
+
+    In 'save' mode every open figure is written to
+    ``<NANOLAB_OUTDIR>/<name>_fig<N>.png`` and closed; in 'none' mode open
+    figures are just closed.  ``name`` defaults to the running script.
+    """
+    plt = sys.modules.get('matplotlib.pyplot')
+    if plt is None:
+        return []
+    mode = plot_mode()
+    if mode == 'show':
+        plt.show()
+        return []
+    saved = []
+    if mode == 'save':
+        name = name or _script_name()
+        outdir = output_dir()
+        for num in plt.get_fignums():
+            path = os.path.join(outdir, f"{name}_fig{next(_fig_counter)}.png")
+            plt.figure(num).savefig(path, dpi=dpi)
+            saved.append(path)
+    plt.close('all')
+    return saved
+
+
+def _to_builtin(value):
+    if isinstance(value, dict):
+        return {str(k): _to_builtin(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_builtin(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return _to_builtin(value.tolist())
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def write_summary(results, name=None):
+    """Write ``results`` (a dict of numbers/arrays) to ``<name>_summary.json``.
+
+    Only done in the headless modes; returns the path written or None.
+    """
+    if plot_mode() == 'show':
+        return None
+    name = name or _script_name()
+    path = os.path.join(output_dir(), f"{name}_summary.json")
+    with open(path, 'w') as f:
+        json.dump(_to_builtin(results), f, indent=2)
+    return path
+
+
+def write_table(columns, name=None):
+    """Write a dict of equal-length columns to ``<name>_table.csv``.
+
+    Like :func:`write_summary` this only happens in the headless modes;
+    returns the path written or None.
+    """
+    if plot_mode() == 'show':
+        return None
+    name = name or _script_name()
+    path = os.path.join(output_dir(), f"{name}_table.csv")
+    header = list(columns)
+    rows = zip(*(_to_builtin(columns[key]) for key in header))
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return path
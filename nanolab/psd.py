@@ -0,0 +1,112 @@
+"""One-sided power spectral densities (V²/Hz) of uniformly sampled traces."""
+import numpy as np
+
+
+def compute_power_spectrum(v_sig, dt):
+    """Single full-length periodogram, one-sided and normalized to V²/Hz."""
+    n_pts = len(v_sig)
+    fft_v = np.fft.rfft(v_sig)
+    psd = (2.0 / (n_pts * (1 / dt))) * np.abs(fft_v)**2
+    psd[0] /= 2  # DC
+    if n_pts % 2 == 0:
+        psd[-1] /= 2  # Nyquist
+    return psd
+
+
+# Periodic (DFT-even) windows built with NumPy, so that the common cases do not
+# pay the import time of scipy.signal.
+_COSINE_WINDOWS = {
+    'boxcar': (1.0,),
+    'hann': (0.5, 0.5),
+    'hamming': (0.54, 0.46),
+    'blackman': (0.42, 0.5, 0.08),
+}
+
+
+def _window(window, nperseg):
+    if isinstance(window, str):
+        coeffs = _COSINE_WINDOWS.get(window.lower())
+        if coeffs is None:
+            from scipy.signal import get_window
+            return get_window(window, nperseg)
+        phase = 2 * np.pi * np.arange(nperseg) / nperseg
+        return sum((-1)**k * a * np.cos(k * phase) for k, a in enumerate(coeffs))
+    win = np.asarray(window, dtype=np.float64)
+    if win.shape != (nperseg,):
+        raise ValueError(f"window must have length {nperseg}, got {win.shape}")
+    return win
+
+
+def _segment_power(segments, win, detrend, batch):
+    acc = np.zeros(len(win) // 2 + 1)
+    for start in range(0, len(segments), batch):
+        block = np.array(segments[start:start + batch], dtype=np.float64)
+        if detrend:
+            block -= block.mean(axis=1, keepdims=True)
+        block *= win
+        acc += np.sum(np.abs(np.fft.rfft(block, axis=1))**2, axis=0)
+    return acc
+
+
+def welch_psd_stream(chunks, dt, nperseg=4096, noverlap=None, window='hann', detrend=False, batch=64):
+    """Welch-averaged PSD accumulated over an iterable of sample chunks.
+
+    Only the tail of each chunk that is still needed by the next segment
+    (fewer than ``nperseg`` samples) is carried over, so memory stays flat no
+    matter how long the stream is.  Chunk boundaries do not change the
+    segmentation: the result equals :func:`welch_psd` on the concatenated
+    trace.  Returns ``(freqs, psd)``.
+    """
+    if noverlap is None:
+        noverlap = nperseg // 2
+    step = nperseg - noverlap
+    if step <= 0:
+        raise ValueError("noverlap must be smaller than nperseg")
+
+    win = _window(window, nperseg)
+    acc = np.zeros(nperseg // 2 + 1)
+    n_seg = 0
+    carry = np.empty(0)
+    for chunk in chunks:
+        buf = chunk if carry.size == 0 else np.concatenate((carry, chunk))
+        if len(buf) < nperseg:
+            carry = np.array(buf, dtype=np.float64)
+            continue
+        segments = np.lib.stride_tricks.sliding_window_view(buf, nperseg)[::step]
+        acc += _segment_power(segments, win, detrend, batch)
+        n_seg += len(segments)
+        carry = np.array(buf[len(segments) * step:], dtype=np.float64)
+
+    if n_seg == 0:
+        # Trace shorter than one segment: use it whole, as a single segment.
+        # A named window is rebuilt at that length; an array window cannot be.
+        if carry.size < 2:
+            raise ValueError("trace too short for a power spectrum")
+        if not isinstance(window, str):
+            raise ValueError(f"trace of {carry.size} samples is shorter than the "
+                             f"{nperseg}-sample window array; pass a shorter window or nperseg")
+        return welch_psd_stream([carry], dt, carry.size, 0, window, detrend, batch)
+
+    psd = acc * (2.0 * dt / (np.sum(win**2) * n_seg))
+    psd[0] /= 2  # DC
+    if nperseg % 2 == 0:
+        psd[-1] /= 2  # Nyquist
+    return np.fft.rfftfreq(nperseg, dt), psd
+
+
+def welch_psd(v_sig, dt, nperseg=4096, noverlap=None, window='hann', detrend=False, batch=64):
+    """Welch-averaged PSD, returned as ``(freqs, psd)``.
+
+    Segments are read as strided views of ``v_sig`` (which may be a memory
+    map) and transformed ``batch`` at a time, so working memory is bounded by
+    ``batch * nperseg`` samples regardless of the trace length.  The
+    normalization matches :func:`compute_power_spectrum`: with a rectangular
+    window and ``nperseg == len(v_sig)`` both return the same spectrum.
+    """
+    return welch_psd_stream([np.asarray(v_sig)], dt, nperseg, noverlap, window, detrend, batch)
+
+
+def band_average(freqs, psd, f_lo=1000.0, f_hi=9000.0):
+    """Mean spectral density over the flat band ``f_lo <= f <= f_hi``."""
+    mask = (freqs >= f_lo) & (freqs <= f_hi)
+    return np.mean(psd[mask])
@@ -0,0 +1,85 @@
+"""Split swept measurements into monotonic branches at their turning points.
+
+A transfer scan (V_SG up and down), an AFM approach/retract curve (Height)
+or a cyclic voltammogram (applied potential) is a sequence of monotonic
+branches.  :func:`sweep_segments` finds them in one O(n) pass over the
+control variable, however many cycles there are and whatever the number of
+steps per branch; :func:`iter_branches` then hands out slices, i.e.
+zero-copy views of the data arrays.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+Segment = namedtuple('Segment', 'start stop direction cycle')
+Segment.__doc__ = """Branch ``x[start:stop]``; direction +1 (rising) or -1 (falling);
+cycle counts pairs of branches from 0."""
+
+
+def step_directions(x, tol=0.0):
+    """Direction (+1/-1) of every step of ``x``.
+
+    Steps no larger than ``tol`` (repeated set-points, noise) take the
+    direction of the step before them, or of the first real step at the
+    start of the sweep.  Returns an int array of length ``len(x) - 1``; all
+    zero if ``x`` never moves.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    d = np.diff(x)
+    sign = np.where(np.abs(d) > tol, np.sign(d), 0).astype(np.int8)
+    moving = np.flatnonzero(sign)
+    if moving.size == 0:
+        return sign
+    # Forward-fill the flat steps with the last real direction
+    last = np.where(sign != 0, np.arange(sign.size), 0)
+    np.maximum.accumulate(last, out=last)
+    last[:moving[0]] = moving[0]
+    return sign[last]
+
+
+def turning_points(x, tol=0.0):
+    """Indices of the points where ``x`` reverses direction.
+
+    On a plateau at the turning point (e.g. the end voltage measured twice)
+    the index is that of the first point of the new branch.
+    """
+    direction = step_directions(x, tol)
+    return np.flatnonzero(direction[1:] != direction[:-1]) + 1
+
+
+def sweep_segments(x, tol=0.0, include_turn=False, min_points=1):
+    """Monotonic branches of the swept variable ``x`` as :class:`Segment` tuples.
+
+    Branches are contiguous and cover ``x``: each new branch starts at a
+    turning point.  With ``include_turn=True`` every branch also keeps the
+    turning point that starts the next one (the point is then shared, like
+    an approach/retract split at the minimum).  Branches with fewer than
+    ``min_points`` points are dropped.
+    """
+    n = len(x)
+    if n == 0:
+        return []
+    direction = step_directions(x, tol)
+    bounds = np.concatenate(([0], turning_points(x, tol), [n]))
+    segments = []
+    for i, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        start, stop = int(start), int(stop)
+        if include_turn and stop < n:
+            stop += 1
+        if stop - start < min_points:
+            continue
+        step = min(start, len(direction) - 1)
+        sign = int(direction[step]) if step >= 0 else 0
+        segments.append(Segment(start, stop, sign, i // 2))
+    return segments
+
+
+def iter_branches(x, *arrays, tol=0.0, include_turn=False, min_points=1):
+    """Yield ``(segment, x_branch, *array_branches)`` for every branch of ``x``.
+
+    The branches are slices of the inputs (views for NumPy arrays), so
+    arbitrarily long multi-cycle recordings are walked without copying.
+    """
+    for seg in sweep_segments(x, tol, include_turn, min_points):
+        branch = slice(seg.start, seg.stop)
+        yield (seg, x[branch]) + tuple(a[branch] for a in arrays)
@@ -0,0 +1,118 @@
+"""Readers for the oscilloscope noise traces (FFT_*kohm_noise_filter.txt)."""
+import os
+import struct
+
+import numpy as np
+
+# Binary sidecar: fixed header followed by the raw little-endian float64 samples.
+# magic, dt, t0, n_samples, source mtime (ns), source size (bytes)
+CACHE_SUFFIX = '.nltrace'
+_CACHE_MAGIC = b'NLTRACE1'
+_CACHE_HEADER = struct.Struct('<8sddqqq')
+_CACHE_OFFSET = 64  # header padded so the samples start 8-byte aligned
+
+
+def load_trace(path, skiprows=2):
+    """Load a two-column time/voltage trace as float64 arrays.
+
+    The body is parsed by NumPy's C reader in a single pass straight into one
+    (n, 2) float64 array; ``t`` and ``v`` are column views of it, so peak
+    memory stays at the size of the parsed data.
+    """
+    data = np.loadtxt(path, skiprows=skiprows, usecols=(0, 1), dtype=np.float64, ndmin=2)
+    return data[:, 0], data[:, 1]
+
+
+def _read_cache_header(cache_path, st):
+    try:
+        with open(cache_path, 'rb') as f:
+            raw = f.read(_CACHE_HEADER.size)
+    except OSError:
+        return None
+    if len(raw) != _CACHE_HEADER.size:
+        return None
+    magic, dt, t0, n, mtime_ns, size = _CACHE_HEADER.unpack(raw)
+    if magic != _CACHE_MAGIC or mtime_ns != st.st_mtime_ns or size != st.st_size:
+        return None
+    if os.path.getsize(cache_path) != _CACHE_OFFSET + 8 * n:
+        return None
+    return dt, t0, n
+
+
+def _write_cache(cache_path, v, dt, t0, st):
+    header = _CACHE_HEADER.pack(_CACHE_MAGIC, dt, t0, len(v), st.st_mtime_ns, st.st_size)
+    tmp_path = cache_path + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(header.ljust(_CACHE_OFFSET, b'\0'))
+            np.ascontiguousarray(v, dtype='<f8').tofile(f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Could not write trace cache {cache_path}: {e}")
+
+
+def open_trace(path, skiprows=2, cache=True):
+    """Return ``(v, dt, t0)`` for a uniformly sampled trace.
+
+    On first use the ASCII file is parsed and ``v`` is written to a binary
+    sidecar (``path + CACHE_SUFFIX``) together with dt, t0 and the sample
+    count.  Later calls memory-map that sidecar read-only, as long as the
+    source file's mtime and size still match the values stored in its header.
+    """
+    if not cache:
+        t, v = load_trace(path, skiprows)
+        return v, t[1] - t[0], t[0]
+
+    cache_path = os.fspath(path) + CACHE_SUFFIX
+    st = os.stat(path)
+    header = _read_cache_header(cache_path, st)
+    if header is not None:
+        dt, t0, n = header
+        v = np.memmap(cache_path, dtype='<f8', mode='r', offset=_CACHE_OFFSET, shape=(n,))
+        return v, dt, t0
+
+    t, v = load_trace(path, skiprows)
+    dt, t0 = float(t[1] - t[0]), float(t[0])
+    _write_cache(cache_path, v, dt, t0, st)
+    return v, dt, t0
+
+
+def _read_block(f, chunk_bytes):
+    lines = f.readlines(chunk_bytes)
+    if not lines:
+        return None
+    return np.loadtxt(lines, usecols=(0, 1), dtype=np.float64, ndmin=2)
+
+
+def stream_trace(path, skiprows=2, chunk_bytes=1 << 24):
+    """Read a trace chunk by chunk without loading it whole.
+
+    Returns ``(dt, t0, chunks)`` where ``chunks`` is a generator of voltage
+    arrays covering roughly ``chunk_bytes`` of text each.  dt and t0 come
+    from the first two samples; the generator opens the file itself and
+    closes it when it is exhausted or closed.
+    """
+    with open(path, 'r') as f:
+        for _ in range(skiprows):
+            f.readline()
+        head = [f.readline(), f.readline()]
+    head = np.loadtxt(head, usecols=(0, 1), dtype=np.float64, ndmin=2)
+    if len(head) < 2:
+        raise ValueError(f"{path}: trace has fewer than two samples")
+
+    def chunks():
+        with open(path, 'r') as f:
+            for _ in range(skiprows):
+                f.readline()
+            block = _read_block(f, chunk_bytes)
+            while block is not None:
+                yield block[:, 1]
+                block = _read_block(f, chunk_bytes)
+
+    return head[1, 0] - head[0, 0], head[0, 0], chunks()
+
+
+def build_cache(path, skiprows=2):
+    """Create (or refresh) the binary sidecar of ``path``; returns the sample count."""
+    v, _, _ = open_trace(path, skiprows)
+    return len(v)
@@ -0,0 +1,467 @@
+"""TFT transfer-curve analysis (linear-regime mobility, threshold voltage and
+subthreshold parameters).
+
+Fit windows can be given by hand or found automatically: :func:`find_linear_window`
+picks the steepest straight stretch of I_D(V_SG) for the mobility and
+:func:`find_subthreshold_window` the steepest decade of log10(I_D) for S.
+"""
+import os
+
+import numpy as np
+
+from nanolab.fits import batch_linear_fit, linear_fit, sliding_linear_fit
+from nanolab.sweeps import iter_branches
+
+# Default device parameters (scan_transfer_0.1 device)
+L = 15 * 500e-6   # Channel length
+W = 9.5 * 500e-6  # Channel width
+C = 54e-9         # Gate capacitance per unit area (F/cm²)
+V_SD = 0.1        # Source-drain voltage (V)
+
+# Automatic window search: width of the sliding window (V) and the minimum R²
+# a window needs before its slope is considered
+LINEAR_WIDTH = 4.0
+LINEAR_R2_MIN = 0.995
+SUBTHRESHOLD_WIDTH = 1.0
+SUBTHRESHOLD_R2_MIN = 0.99
+
+# Used in place of non-positive currents when a curve has no positive one (A)
+CURRENT_FLOOR = 1e-15
+
+
+def load_transfer(path, v_col=0, i_col=4):
+    """Return ``(V_SG, I_D)`` in V and A from a scan_transfer_*.dat file."""
+    data = np.loadtxt(path, usecols=(v_col, i_col), ndmin=2)
+    return data[:, 0], data[:, 1]
+
+
+def iter_sweeps(V_SG, I_D):
+    """Yield ``(sweep, cycle, V_branch, I_branch)`` for every branch of a scan.
+
+    Branches are split at the V_SG turning points (see
+    :mod:`nanolab.sweeps`) and are views of the inputs; the first branch of
+    each cycle is the 'forward' sweep, the second the 'backward' one.
+    """
+    for i, (seg, V, I) in enumerate(iter_branches(V_SG, I_D, min_points=2)):
+        yield ('forward' if i % 2 == 0 else 'backward'), seg.cycle, V, I
+
+
+def split_sweep(V_SG, I_D):
+    """Forward and backward branch of the first cycle of a transfer scan.
+
+    A missing branch (single sweep) comes back empty.
+    """
+    branches = [(V, I) for _, _, V, I in iter_sweeps(V_SG, I_D)][:2]
+    empty = (V_SG[len(V_SG):], I_D[len(I_D):])
+    return tuple(branches + [empty] * (2 - len(branches)))
+
+
+def threshold_voltage(m, q, m_err, q_err):
+    """x-intercept ``-q/m`` of the linear fit with propagated error."""
+    Vt = -q / m
+    dVt = np.sqrt((q_err / m)**2 + (q * m_err / m**2)**2)
+    return Vt, dVt
+
+
+def linear_mobility(m, m_err, L=L, W=W, C=C, V_SD=V_SD):
+    """Linear-regime mobility (cm²/Vs) from the slope dI_D/dV_SG in A/V."""
+    factor = L / (W * C * V_SD)
+    return m * factor, m_err * factor
+
+
+def _voltage_step(V_SG):
+    with np.errstate(invalid='ignore'):
+        steps = np.abs(np.diff(V_SG, axis=-1))
+    steps = steps[np.isfinite(steps) & (steps > 0)]
+    return np.median(steps) if steps.size else np.nan
+
+
+def _find_window(V_SG, y, width, r2_min):
+    """Steepest rising window of ``width`` volts whose fit has R² >= ``r2_min``.
+
+    Falls back to the most linear window when none passes the R² cut.
+    Returns ``(lo, hi)`` widened by half a voltage step, so the open window
+    ``lo < V_SG < hi`` selects exactly the chosen points.
+    """
+    V_SG = np.asarray(V_SG, dtype=np.float64)
+    V2, y2 = np.atleast_2d(V_SG, y)
+    step = _voltage_step(V2)
+    k = max(3, int(round(width / step)) + 1) if np.isfinite(step) else 3
+    lo = np.full(V2.shape[0], np.nan)
+    hi = np.full(V2.shape[0], np.nan)
+    if V2.shape[-1] >= k:
+        m, _, r2 = sliding_linear_fit(V2, y2, k)
+        ok = (r2 >= r2_min) & (m > 0)
+        with np.errstate(invalid='ignore'):
+            best = np.argmax(np.where(ok, m, -np.inf), axis=-1)
+        fallback = np.argmax(np.where(np.isfinite(r2), r2, -np.inf), axis=-1)
+        start = np.where(ok.any(axis=-1), best, fallback)
+        found = np.isfinite(r2).any(axis=-1)
+
+        points = np.take_along_axis(V2, start[:, None] + np.arange(k), axis=-1)
+        lo = np.where(found, points.min(axis=-1) - step / 2, np.nan)
+        hi = np.where(found, points.max(axis=-1) + step / 2, np.nan)
+    if V_SG.ndim == 1:
+        return lo[0], hi[0]
+    return lo, hi
+
+
+def find_linear_window(V_SG, I_D, width=LINEAR_WIDTH, r2_min=LINEAR_R2_MIN):
+    """Fit window for the linear-regime mobility, chosen automatically.
+
+    Slides a ``width``-volt window along I_D(V_SG) with prefix-sum
+    statistics (O(n) per curve) and keeps the steepest one that is still
+    straight (R² >= ``r2_min``).  Works on one curve or on stacked (N, n)
+    curves; returns ``(lo, hi)`` for use as ``window`` in the fits.
+    """
+    return _find_window(V_SG, I_D, width, r2_min)
+
+
+def clip_current(I_D, floor=None):
+    """Replace non-positive currents by ``floor`` so they can go through log10.
+
+    ``floor`` defaults to the smallest positive current of each curve (last
+    axis), or CURRENT_FLOOR for a curve without one.  Missing values (NaN
+    padding) stay NaN.
+    """
+    I_D = np.asarray(I_D, dtype=np.float64)
+    if floor is None:
+        floor = np.where(I_D > 0, I_D, np.inf).min(axis=-1, keepdims=True)
+        floor = np.where(np.isfinite(floor), floor, CURRENT_FLOOR)
+    return np.where(np.isnan(I_D), np.nan, np.maximum(I_D, floor))
+
+
+def log_current(I_D, floor=None):
+    """log10(I_D) with non-positive currents clipped by :func:`clip_current`."""
+    return np.log10(clip_current(I_D, floor))
+
+
+def find_subthreshold_window(V_SG, I_D, width=SUBTHRESHOLD_WIDTH, r2_min=SUBTHRESHOLD_R2_MIN):
+    """Fit window for the subthreshold swing: the steepest decade of log10(I_D).
+
+    Same search as :func:`find_linear_window` on :func:`log_current`.
+    """
+    return _find_window(V_SG, log_current(I_D), width, r2_min)
+
+
+def fit_linear_regime(V_SG, I_D, window=(3, 9), L=L, W=W, C=C, V_SD=V_SD):
+    """Fit I_D vs V_SG inside the open ``window`` and extract mu and V_t.
+
+    ``window='auto'`` uses :func:`find_linear_window`.  Returns a dict with
+    the fit parameters (A/V, A), the derived values and the window used.
+    """
+    if isinstance(window, str) and window == 'auto':
+        window = find_linear_window(V_SG, I_D)
+    mask = (V_SG > window[0]) & (V_SG < window[1])
+    m, q, m_err, q_err = linear_fit(V_SG[mask], I_D[mask])
+    mu, dmu = linear_mobility(m, m_err, L, W, C, V_SD)
+    Vt, dVt = threshold_voltage(m, q, m_err, q_err)
+    return {'m': m, 'q': q, 'm_err': m_err, 'q_err': q_err,
+            'mu': mu, 'mu_err': dmu, 'Vt': Vt, 'Vt_err': dVt,
+            'window': tuple(window)}
+
+
+def analyze_transfer_file(path, window=(3, 9), L=L, W=W, C=C, V_SD=V_SD):
+    """Forward and backward linear-regime fits of one transfer scan."""
+    V_SG, I_D = load_transfer(path)
+    fwd, bwd = split_sweep(V_SG, I_D)
+    return {'file': os.fspath(path),
+            'forward': fit_linear_regime(*fwd, window, L, W, C, V_SD),
+            'backward': fit_linear_regime(*bwd, window, L, W, C, V_SD)}
+
+
+def stack_curves(curves):
+    """Stack 1-D arrays of different lengths into an (N, n_max) array padded with NaN."""
+    n_max = max((len(c) for c in curves), default=0)
+    out = np.full((len(curves), n_max), np.nan)
+    for row, c in zip(out, curves):
+        row[:len(c)] = c
+    return out
+
+
+def _as_limits(window, shape):
+    lo = np.broadcast_to(np.asarray(window[0], dtype=np.float64), shape)
+    hi = np.broadcast_to(np.asarray(window[1], dtype=np.float64), shape)
+    return lo, hi
+
+
+def _batch_window_fit(V_SG, y, window):
+    """Straight-line fits of y vs V_SG inside the open ``window`` of every curve."""
+    if isinstance(window, str) and window == 'auto':
+        window = find_linear_window(V_SG, y)
+    lo, hi = _as_limits(window, V_SG.shape[:-1])
+    mask = (V_SG > lo[..., None]) & (V_SG < hi[..., None])
+    m, q, m_err, q_err, n_points = batch_linear_fit(V_SG, y, mask)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Vt, dVt = threshold_voltage(m, q, m_err, q_err)
+    return {'Vt': Vt, 'Vt_err': dVt, 'm': m, 'q': q, 'm_err': m_err, 'q_err': q_err,
+            'n_points': n_points, 'window_lo': lo.copy(), 'window_hi': hi.copy()}
+
+
+def batch_fit_linear_regime(V_SG, I_D, window=(3, 9), L=L, W=W, C=C, V_SD=V_SD):
+    """Vectorized :func:`fit_linear_regime` over stacked curves of shape (N, n).
+
+    All N fits are done in closed form in one pass; NaN padding is ignored.
+    ``window`` is a pair of limits, a pair of length-N arrays (one window
+    per curve) or ``'auto'`` to search each curve with
+    :func:`find_linear_window`.  Returns a dict of length-N arrays,
+    including the window limits used.
+    """
+    fit = _batch_window_fit(V_SG, I_D, window)
+    mu, dmu = linear_mobility(fit['m'], fit['m_err'], L, W, C, V_SD)
+    return {'mu': mu, 'mu_err': dmu, **fit}
+
+
+def sqrt_current(I_D):
+    """sqrt(|I_D|), the quantity that is linear in V_SG in saturation."""
+    return np.sqrt(np.abs(np.asarray(I_D, dtype=np.float64)))
+
+
+def saturation_mobility(m, m_err, L=L, W=W, C=C):
+    """Saturation-regime mobility (cm²/Vs) from the slope of sqrt(I_D) vs V_SG in A^0.5/V."""
+    factor = 2 * L / (W * C)
+    return factor * m**2, 2 * factor * np.abs(m) * m_err
+
+
+def fit_saturation_regime(V_SG, I_D, window=(3, 9), L=L, W=W, C=C):
+    """Fit sqrt(I_D) vs V_SG inside the open ``window`` and extract mu_sat and V_t.
+
+    ``window='auto'`` uses :func:`find_linear_window` on sqrt(I_D).
+    Returns a dict like :func:`fit_linear_regime` (slopes in A^0.5/V).
+    """
+    sqrt_I = sqrt_current(I_D)
+    if isinstance(window, str) and window == 'auto':
+        window = find_linear_window(V_SG, sqrt_I)
+    mask = (V_SG > window[0]) & (V_SG < window[1])
+    m, q, m_err, q_err = linear_fit(V_SG[mask], sqrt_I[mask])
+    mu, dmu = saturation_mobility(m, m_err, L, W, C)
+    Vt, dVt = threshold_voltage(m, q, m_err, q_err)
+    return {'m': m, 'q': q, 'm_err': m_err, 'q_err': q_err,
+            'mu': mu, 'mu_err': dmu, 'Vt': Vt, 'Vt_err': dVt,
+            'window': tuple(window)}
+
+
+def batch_fit_saturation_regime(V_SG, I_D, window=(3, 9), L=L, W=W, C=C):
+    """Vectorized :func:`fit_saturation_regime` over stacked curves of shape (N, n).
+
+    Same fit path and ``window`` options as :func:`batch_fit_linear_regime`;
+    returns the same keys with the saturation mobility.
+    """
+    fit = _batch_window_fit(V_SG, sqrt_current(I_D), window)
+    mu, dmu = saturation_mobility(fit['m'], fit['m_err'], L, W, C)
+    return {'mu': mu, 'mu_err': dmu, **fit}
+
+
+def analyze_transfer_batch(paths, window=(3, 9), L=L, W=W, C=C, V_SD=V_SD, sat_window=None):
+    """Linear-regime fits of many transfer scans, one table row per branch.
+
+    Every forward/backward branch of every cycle is fitted.  With
+    ``sat_window`` (limits or ``'auto'``) the same stacked branches also get
+    the sqrt(I_D) saturation fit, added as ``sat_*`` columns, so the files
+    are read only once.  Files that cannot be read are reported and skipped.
+    Returns a dict of equal-length columns: ``file``, ``sweep``, ``cycle``
+    and the fit results.
+    """
+    files, sweeps, cycles, V_branches, I_branches = [], [], [], [], []
+    for path in paths:
+        try:
+            V_SG, I_D = load_transfer(path)
+        except (OSError, ValueError) as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        for sweep, cycle, V, I in iter_sweeps(V_SG, I_D):
+            files.append(os.fspath(path))
+            sweeps.append(sweep)
+            cycles.append(cycle)
+            V_branches.append(V)
+            I_branches.append(I)
+
+    V_stack, I_stack = stack_curves(V_branches), stack_curves(I_branches)
+    table = {'file': files, 'sweep': sweeps, 'cycle': cycles,
+             **batch_fit_linear_regime(V_stack, I_stack, window, L, W, C, V_SD)}
+    if sat_window is not None:
+        sat = batch_fit_saturation_regime(V_stack, I_stack, sat_window, L, W, C)
+        table.update({'sat_' + key: value for key, value in sat.items()})
+    return table
+
+
+def _row_gradient(y):
+    """``np.gradient`` along the last axis of rows with NaN padding at the end.
+
+    Central differences inside each row, one-sided at its first and last
+    finite point; NaN where a row has fewer than two points.
+    """
+    d = np.diff(y, axis=-1)
+    pad = np.full(y.shape[:-1] + (1,), np.nan)
+    fwd = np.concatenate((d, pad), axis=-1)
+    bwd = np.concatenate((pad, d), axis=-1)
+    grad = (fwd + bwd) / 2
+    grad = np.where(np.isnan(fwd), bwd, grad)
+    return np.where(np.isnan(bwd), fwd, grad)
+
+
+def subthreshold_parameters(V_SG, I_D, window='auto', von_window=None, off_below=-8.0, floor=None):
+    """S, V_on, I_on, I_off and on/off ratio of stacked log-scale transfer curves.
+
+    ``V_SG`` and ``I_D`` have shape (N, n) (or (n,) for one curve), NaN
+    padded as from :func:`stack_curves`.  All curves are processed together:
+
+    * S = 1/slope of log10(I_D) vs V_SG inside the closed ``window`` (a pair
+      of limits, per-curve arrays, or ``'auto'`` for
+      :func:`find_subthreshold_window`), in V/dec with its fit error;
+    * V_on is where d log10(I_D) / d(point), differentiated over the points
+      inside ``von_window`` (whole curve if None), peaks;
+    * I_on is the maximum current and I_off the mean current for
+      V_SG < ``off_below``, both from the measured currents.
+
+    Non-positive currents are clipped (see :func:`clip_current`) for the
+    logs only.  Returns a dict of arrays.
+    """
+    V_SG = np.asarray(V_SG, dtype=np.float64)
+    I_clip = clip_current(I_D, floor)
+    log_I = np.log10(I_clip)
+
+    if isinstance(window, str) and window == 'auto':
+        window = find_subthreshold_window(V_SG, I_clip)
+    lo, hi = _as_limits(window, V_SG.shape[:-1])
+    mask = (V_SG >= lo[..., None]) & (V_SG <= hi[..., None])
+    m, q, m_err, q_err, n_points = batch_linear_fit(V_SG, log_I, mask)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        S = 1 / m
+        S_err = m_err / m**2
+
+    # V_on: steepest point of the log curve, differentiated inside von_window only
+    in_von = np.isfinite(V_SG) & np.isfinite(log_I)
+    if von_window is not None:
+        von_lo, von_hi = _as_limits(von_window, V_SG.shape[:-1])
+        in_von &= (V_SG >= von_lo[..., None]) & (V_SG <= von_hi[..., None])
+    # Windowed points moved to the front of each row, NaN after them
+    order = np.argsort(~in_von, axis=-1, kind='stable')
+    V_von = np.where(np.take_along_axis(in_von, order, axis=-1), np.take_along_axis(V_SG, order, axis=-1), np.nan)
+    grad = _row_gradient(np.where(np.isfinite(V_von), np.take_along_axis(log_I, order, axis=-1), np.nan))
+    valid = np.isfinite(grad)
+    idx = np.argmax(np.where(valid, grad, -np.inf), axis=-1)
+    V_on = np.where(valid.any(axis=-1),
+                    np.take_along_axis(V_von, idx[..., None], axis=-1)[..., 0], np.nan)
+
+    # I_on and I_off from the measured currents; the clipping is only for the logs
+    I_D = np.asarray(I_D, dtype=np.float64)
+    finite = np.isfinite(V_SG) & np.isfinite(I_D)
+    I_on = np.where(finite, I_D, -np.inf).max(axis=-1)
+    off = finite & (V_SG < off_below)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        I_off = np.where(off, I_D, 0.0).sum(axis=-1) / off.sum(axis=-1)
+        on_off = I_on / I_off
+
+    return {'S': S, 'S_err': S_err, 'V_on': V_on, 'I_on': I_on, 'I_off': I_off,
+            'on_off': on_off, 'slope': m, 'slope_err': m_err, 'intercept': q,
+            'intercept_err': q_err, 'n_points': n_points,
+            'window_lo': lo.copy(), 'window_hi': hi.copy()}
+
+
+def _interp_rows(x, y, xq):
+    """Row-wise ``np.interp`` for stacked curves.
+
+    ``x`` (N, n) increasing along each row with NaN padding at the end,
+    ``xq`` (N, m).  The rows are shifted apart so a single searchsorted over
+    the flattened array serves all of them.
+    """
+    N, n = x.shape
+    n_valid = np.isfinite(x).sum(axis=1)
+    lo = np.nanmin(x, axis=1, keepdims=True)
+    span = np.nanmax(x, axis=1, keepdims=True) - lo
+    span[~(span > 0)] = 1.0
+    offset = 3.0 * np.arange(N)[:, None]
+    xs = (np.where(np.isfinite(x), (x - lo) / span, 2.0) + offset).ravel()
+    qs = (xq - lo) / span + offset
+
+    row_start = (np.arange(N) * n)[:, None]
+    j = np.searchsorted(xs, qs.ravel(), side='right').reshape(qs.shape) - 1
+    j = np.clip(j, row_start, row_start + np.maximum(n_valid - 2, 0)[:, None])
+    y = y.ravel()
+    x0, x1 = xs[j], xs[np.minimum(j + 1, xs.size - 1)]
+    y0, y1 = y[j], y[np.minimum(j + 1, y.size - 1)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(x1 > x0, (qs - x0) / (x1 - x0), 0.0)
+    return y0 + np.clip(t, 0.0, 1.0) * (y1 - y0)
+
+
+def _sorted_rows(V, I):
+    order = np.argsort(V, axis=-1, kind='stable')
+    return np.take_along_axis(V, order, axis=-1), np.take_along_axis(I, order, axis=-1)
+
+
+def hysteresis_loop(V_fwd, I_fwd, V_bwd, I_bwd, n_grid=200):
+    """Loop metrics between the forward and backward branches of transfer curves.
+
+    Both branches are interpolated onto a common grid of ``n_grid`` V_SG
+    points spanning their overlap.  Inputs are single curves or NaN-padded
+    (N, n) stacks; all devices are handled together.  Returns a dict with
+    the grid limits ``V_lo``/``V_hi``, the signed ``loop_area`` (integral of
+    I_bwd - I_fwd over V_SG, A·V), ``abs_loop_area``, and the largest
+    |I_bwd - I_fwd| (``max_dI``) with its position ``V_max_dI``.
+    """
+    single = np.ndim(V_fwd) == 1
+    Vf, If, Vb, Ib = (np.atleast_2d(np.asarray(a, dtype=np.float64))
+                      for a in (V_fwd, I_fwd, V_bwd, I_bwd))
+    Vf, If = _sorted_rows(Vf, If)
+    Vb, Ib = _sorted_rows(Vb, Ib)
+
+    V_lo = np.maximum(np.nanmin(Vf, axis=1), np.nanmin(Vb, axis=1))
+    V_hi = np.minimum(np.nanmax(Vf, axis=1), np.nanmax(Vb, axis=1))
+    grid = V_lo[:, None] + (V_hi - V_lo)[:, None] * np.linspace(0.0, 1.0, n_grid)
+    dI = _interp_rows(Vb, Ib, grid) - _interp_rows(Vf, If, grid)
+
+    dV = np.diff(grid, axis=1)
+    loop_area = 0.5 * np.sum((dI[:, 1:] + dI[:, :-1]) * dV, axis=1)
+    abs_dI = np.abs(dI)
+    abs_loop_area = 0.5 * np.sum((abs_dI[:, 1:] + abs_dI[:, :-1]) * dV, axis=1)
+    k = np.argmax(abs_dI, axis=1)
+    rows = np.arange(len(k))
+    res = {'V_lo': V_lo, 'V_hi': V_hi, 'loop_area': loop_area, 'abs_loop_area': abs_loop_area,
+           'max_dI': abs_dI[rows, k], 'V_max_dI': grid[rows, k]}
+    if single:
+        res = {key: value[0] for key, value in res.items()}
+    return res
+
+
+def analyze_hysteresis_batch(paths, window=(3, 9), n_grid=200, L=L, W=W, C=C, V_SD=V_SD):
+    """Forward/backward hysteresis of many transfer scans, one row per device and cycle.
+
+    ΔV_t = V_t(backward) - V_t(forward) comes from
+    :func:`batch_fit_linear_regime` on both branches (``window`` as there),
+    the loop metrics from :func:`hysteresis_loop`.  Unreadable files and
+    cycles without a backward branch are skipped.  Returns a dict of
+    equal-length columns.
+    """
+    files, cycles, fwd, bwd = [], [], [], []
+    for path in paths:
+        try:
+            V_SG, I_D = load_transfer(path)
+        except (OSError, ValueError) as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        branches = {}
+        for sweep, cycle, V, I in iter_sweeps(V_SG, I_D):
+            branches.setdefault(cycle, {})[sweep] = (V, I)
+        for cycle, pair in branches.items():
+            if len(pair) < 2:
+                continue
+            files.append(os.fspath(path))
+            cycles.append(cycle)
+            fwd.append(pair['forward'])
+            bwd.append(pair['backward'])
+
+    Vf, If = (stack_curves([b[i] for b in fwd]) for i in (0, 1))
+    Vb, Ib = (stack_curves([b[i] for b in bwd]) for i in (0, 1))
+    fit_f = batch_fit_linear_regime(Vf, If, window, L, W, C, V_SD)
+    fit_b = batch_fit_linear_regime(Vb, Ib, window, L, W, C, V_SD)
+    if files:
+        loop = hysteresis_loop(Vf, If, Vb, Ib, n_grid)
+    else:
+        loop = {key: np.empty(0) for key in ('V_lo', 'V_hi', 'loop_area', 'abs_loop_area',
+                                             'max_dI', 'V_max_dI')}
+    return {'file': files, 'cycle': cycles,
+            'Vt_fwd': fit_f['Vt'], 'Vt_bwd': fit_b['Vt'],
+            'dVt': fit_b['Vt'] - fit_f['Vt'], 'dVt_err': np.hypot(fit_f['Vt_err'], fit_b['Vt_err']),
+            'mu_fwd': fit_f['mu'], 'mu_bwd': fit_b['mu'], **loop}
@@ -0,0 +1,137 @@
+"""Bootstrap and Monte-Carlo uncertainties for any vectorized extraction.
+
+An extraction ("statistic") is a function of the measured arrays that
+accepts them with an extra leading resample axis, shape (B, n), and returns
+an array of shape (B,) or (B, k), or a dict of such arrays.  The batch fits
+of this package already work that way, so :func:`resample` can evaluate
+thousands of resampled datasets per NumPy call:
+
+    >>> from functools import partial
+    >>> stat = partial(transfer_statistic, window=(3, 9))
+    >>> res = resample(stat, (V_SG, I_D), n_resamples=10000, seed=1)
+    >>> res['mu']['std'], res['Vt']['ci']
+
+The statistics below cover mobility/V_t, k_B, N_d/V_fb and the PEDOT film
+thickness; any other vectorized function can be passed the same way.
+"""
+import numpy as np
+
+from nanolab import cv, mott_schottky, transfer
+from nanolab.fits import line_regression
+from nanolab.noise import run_batch
+
+RESAMPLE_METHODS = ('bootstrap', 'montecarlo')
+DEFAULT_BATCH = 1000
+
+
+def _draw(data, sigma, method, rng, size):
+    """``size`` resampled copies of the 1-D arrays in ``data``, each (size, n)."""
+    if method == 'bootstrap':
+        n = len(data[0])
+        idx = rng.integers(0, n, size=(size, n))
+        return [a[idx] for a in data]
+    return [np.broadcast_to(a, (size,) + a.shape) if s is None
+            else a + rng.standard_normal((size,) + a.shape) * s
+            for a, s in zip(data, sigma)]
+
+
+def _as_dict(result):
+    if isinstance(result, dict):
+        return {key: np.asarray(value, dtype=np.float64) for key, value in result.items()}
+    return {None: np.asarray(result, dtype=np.float64)}
+
+
+def _resample_chunk(job, statistic, data, sigma, method):
+    seed, size = job
+    rng = np.random.default_rng(seed)
+    return _as_dict(statistic(*_draw(data, sigma, method, rng, size)))
+
+
+def _summary(estimate, samples, ci):
+    # Degenerate resamples (e.g. all points at one bias) give inf or NaN
+    samples = np.where(np.isfinite(samples), samples, np.nan)
+    tail = (100 - ci) / 2
+    with np.errstate(invalid='ignore'):
+        lo, hi = np.nanpercentile(samples, [tail, 100 - tail], axis=0)
+        return {'estimate': estimate, 'mean': np.nanmean(samples, axis=0),
+                'std': np.nanstd(samples, axis=0, ddof=1), 'ci': (lo, hi),
+                'n_valid': np.isfinite(samples).sum(axis=0), 'samples': samples}
+
+
+def resample(statistic, data, n_resamples=10000, method='bootstrap', sigma=None, seed=None,
+             batch=DEFAULT_BATCH, workers=1, ci=95):
+    """Distribution of ``statistic(*data)`` under resampling of the data.
+
+    ``data`` is a tuple of equal-length 1-D arrays (one dataset).
+    ``method='bootstrap'`` draws the points with replacement (pairs
+    bootstrap); ``'montecarlo'`` adds Gaussian noise of standard deviation
+    ``sigma`` (one entry per array: scalar, per-point array or None for no
+    noise).  Draws are made ``batch`` resamples at a time; with
+    ``workers != 1`` the batches are spread over a process pool, in which
+    case ``statistic`` must be picklable (a module-level function or a
+    ``functools.partial`` of one).  Every batch gets its own stream spawned
+    from ``seed``, so the result does not depend on ``workers``.
+
+    Returns, for each output of the statistic (keyed like its dict, or a
+    single entry for an array), a dict with the ``estimate`` on the
+    original data, the resampled ``mean`` and ``std``, the central ``ci``
+    percent interval, ``n_valid`` and the ``samples``.
+    """
+    if method not in RESAMPLE_METHODS:
+        raise ValueError(f"method must be one of {RESAMPLE_METHODS}, got {method!r}")
+    data = [np.asarray(a, dtype=np.float64) for a in data]
+    if method == 'montecarlo':
+        if sigma is None:
+            raise ValueError("Monte-Carlo resampling needs sigma")
+        sigma = [None if s is None else np.asarray(s, dtype=np.float64) for s in sigma]
+
+    sizes = [batch] * (n_resamples // batch) + ([n_resamples % batch] if n_resamples % batch else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    chunks = run_batch(_resample_chunk, list(zip(seeds, sizes)), workers,
+                       statistic=statistic, data=data, sigma=sigma, method=method)
+
+    estimate = _as_dict(statistic(*(a[None] for a in data)))
+    out = {key: _summary(estimate[key][0], np.concatenate([c[key] for c in chunks]), ci)
+           for key in estimate}
+    return out[None] if list(out) == [None] else out
+
+
+# ---- statistics for the standard extractions ----
+
+def transfer_statistic(V_SG, I_D, window=(3, 9), regime='linear', L=transfer.L, W=transfer.W,
+                       C=transfer.C, V_SD=transfer.V_SD):
+    """Mobility and V_t of a transfer branch (``regime`` 'linear' or 'saturation').
+
+    Use a fixed ``window``: the automatic search needs ordered points.
+    """
+    if regime == 'linear':
+        fit = transfer.batch_fit_linear_regime(V_SG, I_D, window, L, W, C, V_SD)
+    else:
+        fit = transfer.batch_fit_saturation_regime(V_SG, I_D, window, L, W, C)
+    return {'mu': fit['mu'], 'Vt': fit['Vt']}
+
+
+def boltzmann_statistic(r_eq, vn2, vn2_err=None, T=297.0):
+    """k_B from ``v_n² = 4 k_B T R_eq`` (weighted when ``vn2_err`` is given)."""
+    params, _, _, _ = line_regression(r_eq, vn2, vn2_err, through_origin=True)
+    return params[..., 0] / (4 * T)
+
+
+def mott_schottky_statistic(voff, inv_c2, inv_c2_err=None, area=mott_schottky.A,
+                            eps_r=mott_schottky.epsilon_si, T=mott_schottky.T):
+    """N_d (cm⁻³) and V_fb (V) from the weighted 1/C² vs V line."""
+    params, _, _, _ = line_regression(voff, inv_c2, inv_c2_err, absolute_sigma=False)
+    m, b = params[..., 0], params[..., 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        nd, _ = mott_schottky.extract_Nd_cm3(m, 0.0, area, eps_r)
+        vfb, _ = mott_schottky.extract_flatband(m, b, 0.0, 0.0, T)
+    return {'Nd_cm3': nd, 'Vfb': vfb}
+
+
+def thickness_statistic(current, time, M=cv.M, rho=cv.rho, area=cv.A):
+    """PEDOT:PSS film thickness (nm) from the deposition current.
+
+    Meant for Monte-Carlo resampling of the current (time-ordered data).
+    """
+    return cv.film_thickness_nm(cv.total_charge(current, time), M, rho, area)
+